@@ -42,7 +42,8 @@ class DefaultSettings:
 			"column_width_4" : 150,
 			"column_width_5" : 320,
 			"column_width_6" : 70,
-			"column_width_7" : 240
+			"column_width_7" : 240,
+			"column_width_8" : 150
 		}
 		config["DriveList"]={
 			"sorting": 1,
@@ -53,6 +54,16 @@ class DefaultSettings:
 			"column_width_3": 150,
 			"column_width_4": 480
 		}
+		config["SizeReportList"]={
+			"sorting": 1,
+			"descending": 1,
+			"column_width_0" : "330",
+			"column_width_1" : "150",
+			"column_width_2" : "320",
+			"column_width_3" : "320",
+			"column_width_4" : "70",
+			"column_width_5" : "240"
+		}
 		config["SearchResultList"]={
 			"sorting": 0,
 			"descending": 0,
@@ -71,17 +82,31 @@ class DefaultSettings:
 		config["view"]={
 			"font": "bold 'ＭＳ ゴシック' 22 windows-932",
 			"colorMode":"normal",
-			"header_title_length":20
+			"header_title_length":20,
+			"virtual_list":True
 		}
 		config["mainView"]={
 			"sizeX": "800",
 			"sizeY": "600",
 		}
 		config["browse"]={
-			"startPath": ""
+			"startPath": "",
+			"incremental_update": True,
+			"watch_directory": True,
+			"watch_interval_ms": 200,
+			"watch_polling_interval_ms": 2000
 		}
 		config["search"]={
 			"history_count": 20,
+			"walker_threads": 4,
+			"walker_queue_size": 10000,
+			"batch_interval_ms": 50,
+			"batch_size": 500,
+			"grep_processes": 0,
+			"name_index": True,
+			"name_index_max_roots": 32,
+			"fulltext_index": True,
+			"fulltext_max_text_mb": 16
 		}
 		config["sounds"]={
 			"startup" : "tip.ogg",
@@ -92,6 +117,8 @@ class DefaultSettings:
 		config["preview"]={
 			"header_line_count": 10,
 			"footer_line_count": 10,
+			"max_kb": 1024,
+			"latency_budget_ms": 300,
 			"audio_volume": 100
 		}
 		config["on_list_moved"]={
@@ -99,6 +126,27 @@ class DefaultSettings:
 			"read_directory_name": True,
 			"read_item_count": True
 		}
+		config["cache"]={
+			"filetype_max_entries": 512,
+			"text_max_mb": 256,
+			"dirsize_threads": 4,
+			"dirsize_max_entries": 100000
+		}
+		config["file_operation"]={
+			"copy_threads": 1,
+			"copy_max_threads": 32,
+			"copy_small_file_kb": 1024,
+			"copy_large_file_mb": 64,
+			"copy_unbuffered_mb": 256,
+			"copy_verify": False,#確かめるときは CopyFileEx を使わないので、代替データストリームはコピーされない
+			"copy_verify_algorithm": "sha1"
+		}
+		config["size_report"]={
+			"top_count": 100,
+			"count_hardlinks_once": False,
+			"persist": True,
+			"max_roots": 8
+		}
 		return config
 
 initialValues={}
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#Falcon Aho-Corasick automaton
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+たくさんの文字列を、1回の走査でまとめて探すための Aho-Corasick オートマトンです。
+探す文字列の数が増えても、1文字あたりの処理は、状態遷移1回で変わりません。
+状態遷移は、失敗関数をたどった結果を、初めて使ったときに表に書き込んでおきます。
+初期状態では、どの文字列の先頭にもならない文字を、正規表現でまとめて読み飛ばします。
+このモジュールは、標準ライブラリだけで動きます。
+"""
+
+import collections
+import re
+
+class Automaton(object):
+	def __init__(self,words):
+		"""words は、探す文字列のリスト。空の文字列は無視する。大文字と小文字は区別するので、同一視する場合は、小文字にして渡すこと。"""
+		self.words=list(words)
+		self.lengths=[len(w) for w in self.words]
+		self.delta=[{}]		#状態→{文字: 次の状態}
+		self.fail=[0]
+		self.out=[-1]		#状態→そこで終わる文字列のインデックス。なければ-1
+		for i,word in enumerate(self.words):
+			if not word: continue
+			s=0
+			for ch in word:
+				t=self.delta[s].get(ch)
+				if t is None:
+					t=len(self.delta)
+					self.delta.append({})
+					self.fail.append(0)
+					self.out.append(-1)
+					self.delta[s][ch]=t
+				#end 新しい状態
+				s=t
+			#end for
+			if self.out[s]<0: self.out[s]=i
+		#end for
+		self.tree=[dict(d) for d in self.delta]#失敗関数をたどるときに使う、元の木
+		queue=collections.deque(self.tree[0].values())
+		while queue:
+			s=queue.popleft()
+			for ch,t in self.tree[s].items():
+				queue.append(t)
+				f=self.fail[s]
+				while f and ch not in self.tree[f]: f=self.fail[f]
+				f=self.tree[f].get(ch,0)
+				self.fail[t]=f if f!=t else 0
+				if self.out[t]<0: self.out[t]=self.out[self.fail[t]]#短い文字列が、途中で終わっている
+			#end for
+		#end while
+		first="".join(sorted(self.tree[0]))
+		self.skip=re.compile("["+re.escape(first)+"]" if first else "(?!)")
+
+	def __len__(self):
+		return len(self.words)
+
+	def _transition(self,s,ch):
+		"""表にない遷移を、失敗関数をたどって求め、表に書き込む。"""
+		t=s
+		while True:
+			nxt=self.tree[t].get(ch)
+			if nxt is not None: break
+			if t==0:
+				nxt=0
+				break
+			#end 初期状態
+			t=self.fail[t]
+		#end while
+		self.delta[s][ch]=nxt
+		return nxt
+
+	def Search(self,text,start=0):
+		"""text の start から後で、最初に見つかった文字列の (開始位置, インデックス) を返す。見つからなければ None 。"""
+		delta=self.delta
+		out=self.out
+		skip=self.skip.search
+		s=0
+		i=start
+		n=len(text)
+		while i<n:
+			if s==0:#どれかの文字列の先頭になる文字まで、読み飛ばす
+				m=skip(text,i)
+				if m is None: return None
+				i=m.start()
+			#end 初期状態
+			ch=text[i]
+			t=delta[s].get(ch)
+			if t is None: t=self._transition(s,ch)
+			s=t
+			i+=1
+			w=out[s]
+			if w>=0: return i-self.lengths[w],w
+		#end while
+		return None
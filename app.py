@@ -11,7 +11,15 @@ from simpleDialog import *
 
 import AppBase
 import constants
+import directorySize
+import fileNameIndex
+import fileTypeCache
+import fullTextIndex
+import grepEngine
 import misc
+import previewService
+import sizeTree
+import textCache
 import workerThreads
 
 class falconAppMain(AppBase.MaiｎBase):
@@ -29,6 +37,7 @@ class falconAppMain(AppBase.MaiｎBase):
 		self.LoadUserExtentionSettings()
 		self.InitCaches()
 		workerThreads.Start()
+		self.previewService=previewService.PreviewService()
 
 		# 起動サウンドの再生
 		self.PlaySound(self.config["sounds"]["startup"])
@@ -90,7 +99,26 @@ class falconAppMain(AppBase.MaiｎBase):
 
 	def InitCaches(self):
 		"""起動中に使用するキャッシュデータを初期化する。"""
-		self.filetypes_cach={}#これほんとに使うかどうか検討中
+		self.filetypes_cach=fileTypeCache.FileTypeCache(self.config.getint("cache","filetype_max_entries",512,16,65536))
+		maxBytes=self.config.getint("cache","text_max_mb",256,0,65536)*1024*1024
+		self.textCache=textCache.TextCache(constants.TEXT_CACHE_DIRECTORY,maxBytes) if maxBytes>0 else None
+		if self.config.getboolean("search","name_index",True):
+			self.nameIndexStore=fileNameIndex.FileNameIndexStore(constants.FILE_NAME_INDEX_DIRECTORY,self.config.getint("search","name_index_max_roots",32,1,1024))
+		else:
+			self.nameIndexStore=None
+		#end ファイル名の索引
+		if self.config.getboolean("search","fulltext_index",True):
+			self.fullTextIndex=fullTextIndex.FullTextIndex(constants.FULL_TEXT_INDEX_FILE_NAME,self.config.getint("search","fulltext_max_text_mb",16,1,1024)*1024*1024)
+		else:
+			self.fullTextIndex=None
+		#end 転置索引
+		self.grepEngine=grepEngine.GrepEngine(self.config.getint("search","grep_processes",0,0,64),self.textCache)#0ならCPUの数
+		if self.config.getboolean("size_report","persist",True):
+			self.sizeTreeStore=sizeTree.SizeTreeStore(constants.SIZE_TREE_DIRECTORY,self.config.getint("size_report","max_roots",8,1,256))
+		else:
+			self.sizeTreeStore=None
+		#end 容量の木を保存する
+		self.directorySizeEngine=directorySize.DirectorySizeEngine(self.config.getint("cache","dirsize_threads",4,1,64),self.config.getint("cache","dirsize_max_entries",100000,0,10000000))
 
 	def PlaySound(self,path,custom_location=False,volume=-1):
 		"""サウンドファイルを再生する。"""
@@ -115,6 +143,12 @@ class falconAppMain(AppBase.MaiｎBase):
 
 	def OnExit(self):
 		workerThreads.Stop()
+		self.previewService.Stop()
+		self.grepEngine.Shutdown()
+		self.log.debug("File type cache: %(hits)d hits, %(misses)d misses, %(evictions)d evictions, %(entries)d entries" % self.filetypes_cach.GetStatistics())
+		self.filetypes_cach.Clear()
+		self.log.debug("Directory size cache: %(hits)d hits, %(misses)d misses (hit rate %(hitRate).2f), %(evictions)d evictions, %(entries)d entries" % self.directorySizeEngine.GetStatistics())
+		if self.textCache is not None: self.log.debug("Text cache: %(hits)d hits, %(misses)d misses (hit rate %(hitRate).2f), %(stores)d stores, %(evictions)d evictions, %(entries)d entries, %(bytes)d bytes" % self.textCache.GetStatistics())
 
 		#UserCommandManagerの内容をconfigに反映し、この後の保存処理に備える
 		del self.config["favorite_directories"]
@@ -146,8 +146,8 @@ class SearchedFolder(Folder):
 			return (self.basename, misc.ConvertBytesTo(self.size,misc.UNIT_AUTO,True), self.fullpath, misc.PTime2string(self.modDate), self.attributesString, self.typeString)
 
 class GrepItem(File):
-	def Initialize(self,ln,preview,fileobject):
-		"""grepの結果は、ファイルの情報に加えて、行数・プレビュー・ヒット数を含む。ヒット数は、後から設定する。ファイル名などは、与えられたファイルオブジェクトからとる。"""
+	def Initialize(self,ln,preview,fileobject,pattern=""):
+		"""grepの結果は、ファイルの情報に加えて、行数・プレビュー・ヒットしたキーワード・ヒット数を含む。ヒット数は、後から設定する。ファイル名などは、与えられたファイルオブジェクトからとる。"""
 		self.directory=fileobject.directory
 		self.basename=fileobject.basename
 		self.fullpath=fileobject.fullpath
@@ -161,6 +161,7 @@ class GrepItem(File):
 		self.typeString=fileobject.typeString
 		self.ln=ln
 		self.preview=preview
+		self.pattern=pattern
 		self.hits=0#とりあえず入れておく
 		self.hIcon=fileobject.hIcon
 
@@ -173,7 +174,7 @@ class GrepItem(File):
 
 	def GetListTuple(self):
 		"""表示に必要なタプルを返す。"""
-		return (self.basename, self.ln, self.preview, self.hits, misc.ConvertBytesTo(self.size,misc.UNIT_AUTO,True), misc.PTime2string(self.modDate), self.attributesString, self.typeString)
+		return (self.basename, self.ln, self.preview, self.hits, misc.ConvertBytesTo(self.size,misc.UNIT_AUTO,True), misc.PTime2string(self.modDate), self.attributesString, self.typeString, self.pattern)
 
 class Drive(FalconBrowsableBase):
 	"""ドライブを表す。"""
@@ -303,6 +304,8 @@ class PastProgressHeader(PastProgressItem):
 	def __init__(self):
 		PastProgressItem.__init__(self)
 		self.percentage=0
+		self.bytesPerSecond=0
+		self.eta=None
 
 	def Initialize(self,basename="",fullpath="",status="",details="", percentage=0):
 		PastProgressItem.Initialize(self,basename,fullpath,status,details)
@@ -311,6 +314,15 @@ class PastProgressHeader(PastProgressItem):
 	def SetPercentage(self,percentage):
 		self.percentage=percentage
 
+	def SetProgress(self,percentage,bytesPerSecond,eta):
+		"""進捗率と、速度(バイト毎秒)、残り秒数(分からなければNone)を設定する。"""
+		self.percentage=percentage
+		self.bytesPerSecond=bytesPerSecond
+		self.eta=eta
+
 	def GetListTuple(self):
 		"""表示に必要なタプルを返す。"""
-		return (self.fullpath, self.status, "%s(%s%%)" % (self.details,self.percentage))
+		details="%s(%s%%)" % (self.details,self.percentage)
+		if self.bytesPerSecond>0: details+=" %s/s" % misc.ConvertBytesTo(self.bytesPerSecond,misc.UNIT_AUTO,True)
+		if self.eta is not None: details+=_(" 残り%(min)d分%(sec)02d秒") % {"min": self.eta//60, "sec": self.eta%60}
+		return (self.fullpath, self.status, details)
@@ -20,6 +20,10 @@ LOG_PREFIX="falcon"
 LOG_FILE_NAME="falcon.log"
 KEYMAP_FILE_NAME="keymap.ini"
 HISTORY_FILE_NAME="history.dat"
+TEXT_CACHE_DIRECTORY="textcache"
+FILE_NAME_INDEX_DIRECTORY="fileindex"
+FULL_TEXT_INDEX_FILE_NAME="fulltext.db"
+SIZE_TREE_DIRECTORY="sizetree"
 
 FONT_MIN_SIZE=5
 FONT_MAX_SIZE=35
@@ -137,6 +141,42 @@ SUPPORTED_DOCUMENT_FORMATS={
 	'gitignore',
 }
 
+#SUPPORTED_DOCUMENT_FORMATS のうち、テキストをそのまま読めばよいもの。xd2txlib を通さずに検索する
+PLAIN_TEXT_FORMATS={
+	'txt',
+	'tex',
+	'csv',
+	'tsv',
+	'yaml',
+	'md',
+	'c',
+	'h',
+	'cpp',
+	'cs',
+	'java',
+	'py',
+	'hsp',
+	'as',
+	'js',
+	'rb',
+	'cgi',
+	'php',
+	'sql',
+	'manifest',
+	'ini',
+	'conf',
+	'url',
+	'log',
+	'json',
+	"css",
+	"htaccess",
+	'bat',
+	"ps1",
+	"sh",
+	'gitconfig',
+	'gitignore',
+}
+
 SUPPORTED_AUDIO_FORMATS={
 	'wav',
 	'mp3',
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+#Falcon large file copy engine
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+大きなファイルのコピーと、コピーの進捗(バイト数、速度、残り時間)の管理をします。
+CopyFile は、ファイルを大きな塊(セクタの大きさの倍数)ごとに読み書きし、塊ごとに進捗を通知し、キャンセルを確かめます。
+unbuffered を指定すると、ページキャッシュを通さずに読み書きします(Linux の O_DIRECT)。とても大きなファイルをコピーしても、キャッシュに載っている他のファイルが追い出されません。Windows では、読み込みだけを FILE_FLAG_NO_BUFFERING で行います。どちらも使えない環境では、普通に読み書きします。
+CopyFile は、内容と日時のほかに、Windows の属性(読み取り専用、隠し、システムなど)もコピーします。代替データストリームとアクセス権はコピーしません(アクセス権は、CopyFileEx と同じくコピー先のフォルダから継承します)。
+CopyAndVerify は、コピーしながらコピー元のハッシュを計算し、コピー先だけを読み直して比べます。コピー元を読み直さないので、コピーした後で両方のハッシュを計算するより速く確かめられます。ハッシュは、書き込みと並行して別のスレッドで計算します(hashlib は計算中に GIL を離します)。
+Windows の貼り付けでは、同じことを CopyFileEx の進捗ルーチンと COPY_FILE_NO_BUFFERING で行い、進捗は ProgressTracker に集めます。
+このモジュールは、標準ライブラリだけで動きます。
+"""
+
+import ctypes
+import hashlib
+import io
+import mmap
+import os
+import shutil
+import threading
+import time
+
+#読み書きする塊の大きさと、その境界。unbuffered のときは、塊の位置と大きさが境界の倍数でなければならない
+ALIGNMENT=4096
+CHUNK_SIZE=8*1024*1024
+#コピーの確認に使えるハッシュの種類
+HASH_ALGORITHMS=("md5","sha1","sha256","sha512","blake2b","blake2s")
+DEFAULT_HASH_ALGORITHM="sha1"
+#Windows の CreateFile と SetFileAttributes で使う値
+GENERIC_READ=0x80000000
+FILE_SHARE_READ=0x1
+FILE_SHARE_WRITE=0x2
+OPEN_EXISTING=3
+FILE_FLAG_NO_BUFFERING=0x20000000
+FILE_FLAG_SEQUENTIAL_SCAN=0x08000000
+FILE_ATTRIBUTE_NORMAL=0x80
+#SetFileAttributes で設定できる属性(読み取り専用、隠し、システム、アーカイブ、一時、オフライン、インデックスなし)
+SETTABLE_ATTRIBUTES=0x1|0x2|0x4|0x20|0x100|0x1000|0x2000
+
+class CopyCanceled(Exception):
+	"""コピーがキャンセルされたことを表す。"""
+	pass
+
+class VerificationError(Exception):
+	"""コピー先の内容が、コピー元と一致しなかったことを表す。"""
+	def __init__(self,src,dest,expected,actual):
+		super().__init__("%s does not match %s (%s, expected %s)" % (dest,src,actual,expected))
+		self.src=src
+		self.dest=dest
+		self.expected=expected
+		self.actual=actual
+
+class ProgressTracker(object):
+	"""
+		複数のスレッドでコピーしたバイト数を集めて、進捗率、速度、残り時間を計算する。
+		速度は、interval 秒ごとに測り、指数移動平均で均す。
+	"""
+	def __init__(self,total=0,interval=0.5,smoothing=0.3):
+		self.total=total
+		self.current=0
+		self.interval=interval
+		self.smoothing=smoothing
+		self.bytesPerSecond=0.0
+		self.lock=threading.Lock()
+		self.lastTime=time.perf_counter()
+		self.lastBytes=0
+
+	def SetTotal(self,total):
+		"""合計バイト数を設定する。合計が後から分かる場合は、分かるたびに呼ぶ。"""
+		self.total=total
+
+	def Add(self,count):
+		"""count バイトコピーしたことを記録する。どのスレッドから呼んでもよい。"""
+		with self.lock:
+			self.current+=count
+			now=time.perf_counter()
+			elapsed=now-self.lastTime
+			if elapsed>=self.interval:
+				rate=(self.current-self.lastBytes)/elapsed
+				self.bytesPerSecond=rate if self.bytesPerSecond==0 else self.bytesPerSecond+(rate-self.bytesPerSecond)*self.smoothing
+				self.lastTime=now
+				self.lastBytes=self.current
+			#end 速度を測り直す
+		#end lock
+
+	def GetPercentage(self):
+		if self.total<=0: return 0
+		return min(100,int(self.current*100/self.total))
+
+	def GetBytesPerSecond(self):
+		return self.bytesPerSecond
+
+	def GetETA(self):
+		"""残り時間を秒で返す。まだ速度が分からなければ None 。"""
+		if self.bytesPerSecond<=0: return None
+		return max(0,self.total-self.current)/self.bytesPerSecond
+
+def CopyFile(src,dest,overwrite=False,progress=None,taskState=None,chunkSize=CHUNK_SIZE,unbuffered=False,hasher=None):
+	"""
+		src を dest にコピーする。overwrite が False なら、 dest があるときに FileExistsError を送出する。
+		塊を1つ書くごとに、 progress(書いたバイト数) を呼ぶ。taskState.canceled が True になったら、書きかけの dest を消して CopyCanceled を送出する。
+		hasher (hashlib のオブジェクト) を渡すと、読んだ内容をそれに足していく。
+		失敗したら OSError を送出する。更新日時と Windows の属性は、src と同じにする。代替データストリームとアクセス権はコピーしない。
+	"""
+	chunkSize=max(ALIGNMENT,chunkSize//ALIGNMENT*ALIGNMENT)
+	direct=getattr(os,"O_DIRECT",0) if unbuffered else 0
+	binary=getattr(os,"O_BINARY",0)
+	flags=os.O_WRONLY|os.O_CREAT|os.O_TRUNC|binary|(0 if overwrite else os.O_EXCL)
+	fin=_openRead(src,unbuffered)
+	try:
+		fout=_open(dest,flags,direct)
+	except OSError:
+		os.close(fin)
+		raise
+	#end except
+	try:
+		try:
+			_copy(fin,fout,progress,taskState,chunkSize,direct,hasher)
+		finally:
+			os.close(fout)
+			os.close(fin)
+		#end finally
+	except BaseException:
+		try:#書きかけを消す
+			os.remove(dest)
+		except OSError:
+			pass
+		#end except
+		raise
+	#end except
+	shutil.copystat(src,dest)
+	_copyAttributes(src,dest)
+
+def CopyAndVerify(src,dest,algorithm=DEFAULT_HASH_ALGORITHM,overwrite=False,progress=None,taskState=None,chunkSize=CHUNK_SIZE,unbuffered=False,verifyProgress=None):
+	"""
+		src を dest にコピーし、コピーしながら計算した src のハッシュと、コピーした後で読み直した dest のハッシュを比べる。
+		progress はコピーの、 verifyProgress は読み直しの進捗を受け取る。
+		一致しなければ VerificationError を送出する(dest は消さない)。一致すれば、ハッシュを16進数の文字列で返す。
+		dest は、できればキャッシュを通さずに読み直すので、ディスクに書かれた内容を比べられる。Windows では、FILE_FLAG_NO_BUFFERING で開くと、キャッシュに残っている書き込みはディスクに書き出されてから読まれる。
+	"""
+	hasher=hashlib.new(algorithm)
+	CopyFile(src,dest,overwrite,progress,taskState,chunkSize,unbuffered,hasher)
+	expected=hasher.hexdigest()
+	actual=HashFile(dest,algorithm,taskState,chunkSize,True,verifyProgress)
+	if actual!=expected: raise VerificationError(src,dest,expected,actual)
+	return expected
+
+def HashFile(path,algorithm=DEFAULT_HASH_ALGORITHM,taskState=None,chunkSize=CHUNK_SIZE,unbuffered=False,progress=None):
+	"""
+		path のハッシュを、16進数の文字列で返す。次の塊を読む間に、前の塊のハッシュを計算する。
+		塊を1つ読むごとに、 progress(読んだバイト数) を呼ぶ。taskState.canceled が True になったら、 CopyCanceled を送出する。
+	"""
+	chunkSize=max(ALIGNMENT,chunkSize//ALIGNMENT*ALIGNMENT)
+	hasher=hashlib.new(algorithm)
+	fd=_openRead(path,unbuffered)
+	bufs=[mmap.mmap(-1,chunkSize),mmap.mmap(-1,chunkSize)]
+	views=[memoryview(buf) for buf in bufs]
+	reader=io.FileIO(fd,"rb",closefd=False)
+	hashing=None
+	current=0
+	try:
+		while True:
+			if taskState is not None and taskState.canceled: raise CopyCanceled()
+			n=reader.readinto(views[current])
+			if hashing is not None: hashing.join()
+			hashing=None
+			if not n: break
+			hashing=_startHashing(hasher,views[current][:n])
+			if progress is not None: progress(n)
+			current^=1#次は、もう一方の領域に読む
+		#end while
+	finally:
+		if hashing is not None: hashing.join()
+		os.close(fd)
+		for view in views: view.release()
+		for buf in bufs: buf.close()
+	#end finally
+	return hasher.hexdigest()
+
+def _startHashing(hasher,data):
+	"""data を hasher に足すのを、別のスレッドで始める。hashlib は計算中に GIL を離すので、読み書きと並行して進む。"""
+	thread=threading.Thread(target=hasher.update,args=(data,))
+	thread.start()
+	return thread
+
+def _openRead(path,unbuffered):
+	"""path を読み込み用に開いて、ファイル記述子を返す。unbuffered なら、できればキャッシュを通さない。読む位置と大きさは、 ALIGNMENT の倍数にすること。"""
+	if unbuffered and os.name=="nt":
+		fd=_openNoBuffering(path)
+		if fd is not None: return fd
+	#end Windows
+	return _open(path,os.O_RDONLY|getattr(os,"O_BINARY",0),getattr(os,"O_DIRECT",0) if unbuffered else 0)
+
+def _openNoBuffering(path):
+	"""
+		Windows で、path を FILE_FLAG_NO_BUFFERING を付けて読み込み用に開き、ファイル記述子を返す。開けなければ None 。
+		CRT の read は、バイナリモードでは渡した領域にそのまま ReadFile するので、境界にそろった領域で読めばキャッシュを通らない。
+	"""
+	import msvcrt
+	kernel32=ctypes.WinDLL("kernel32",use_last_error=True)
+	kernel32.CreateFileW.restype=ctypes.c_void_p
+	kernel32.CreateFileW.argtypes=(ctypes.c_wchar_p,ctypes.c_uint32,ctypes.c_uint32,ctypes.c_void_p,ctypes.c_uint32,ctypes.c_uint32,ctypes.c_void_p)
+	kernel32.CloseHandle.argtypes=(ctypes.c_void_p,)
+	handle=kernel32.CreateFileW(path,GENERIC_READ,FILE_SHARE_READ|FILE_SHARE_WRITE,None,OPEN_EXISTING,FILE_FLAG_NO_BUFFERING|FILE_FLAG_SEQUENTIAL_SCAN,None)
+	if handle is None or handle==ctypes.c_void_p(-1).value: return None#ファイルシステムが対応していない場合は、普通に開き直す
+	try:
+		return msvcrt.open_osfhandle(handle,os.O_RDONLY|os.O_BINARY)
+	except OSError:
+		kernel32.CloseHandle(handle)
+		return None
+	#end except
+
+def _copyAttributes(src,dest):
+	"""Windows で、src の属性(隠し、システムなど)を dest に設定する。読み取り専用は、 shutil.copystat で設定済み。"""
+	attributes=getattr(os.stat(src),"st_file_attributes",None)
+	if attributes is None: return#Windows 以外
+	kernel32=ctypes.WinDLL("kernel32",use_last_error=True)
+	kernel32.SetFileAttributesW.argtypes=(ctypes.c_wchar_p,ctypes.c_uint32)
+	if not kernel32.SetFileAttributesW(dest,attributes&SETTABLE_ATTRIBUTES or FILE_ATTRIBUTE_NORMAL): raise ctypes.WinError(ctypes.get_last_error())
+
+def _open(path,flags,direct):
+	"""direct を付けて開けなければ、付けずに開く(ファイルシステムが対応していない場合がある)。"""
+	if direct:
+		try:
+			return os.open(path,flags|direct)
+		except OSError as err:
+			if isinstance(err,FileExistsError): raise
+		#end except
+	#end direct
+	return os.open(path,flags)
+
+def _copy(fin,fout,progress,taskState,chunkSize,direct,hasher):
+	#ページの境界にそろった領域。O_DIRECT で使える。ハッシュを計算する場合は、計算している間に次の塊を読み書きできるように、2つ使う
+	bufs=[mmap.mmap(-1,chunkSize) for i in range(1 if hasher is None else 2)]
+	views=[memoryview(buf) for buf in bufs]
+	reader=io.FileIO(fin,"rb",closefd=False)
+	writer=io.FileIO(fout,"wb",closefd=False)
+	hashing=None
+	current=0
+	try:
+		while True:
+			if taskState is not None and taskState.canceled: raise CopyCanceled()
+			view=views[current]
+			n=reader.readinto(view)
+			if hashing is not None:#前の塊の計算が終わってから、次の塊を足す
+				hashing.join()
+				hashing=None
+			#end 計算中
+			if not n: break
+			if direct and n%ALIGNMENT!=0:#最後の半端な塊は、境界にそろっていないので、キャッシュを通して書く
+				import fcntl
+				fcntl.fcntl(fout,fcntl.F_SETFL,fcntl.fcntl(fout,fcntl.F_GETFL)&~direct)
+			#end 最後の塊
+			if hasher is not None: hashing=_startHashing(hasher,view[:n])
+			written=0
+			while written<n:
+				written+=writer.write(view[written:n])
+			#end 全部書く
+			if progress is not None: progress(n)
+			current=(current+1)%len(views)
+		#end while
+	finally:
+		if hashing is not None: hashing.join()
+		for view in views: view.release()
+		for buf in bufs: buf.close()
+	#end finally
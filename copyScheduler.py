@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#Falcon copy scheduler
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+貼り付けで、ファイルのコピーを複数のスレッドで同時に行います。
+小さいファイルは、1ファイルごとの待ち時間(ネットワーク越しなら特に)が処理時間のほとんどになるので、いくつかまとめて1つの仕事にし、複数の仕事を同時に進めます。大きいファイルは、1つずつ仕事にします。
+フォルダは、呼び出したスレッドで、渡された順番どおりに作ります。フォルダの中の項目は、フォルダより後に渡されるので、必ずフォルダができてからコピーされます。
+成功・失敗の通知は、全て呼び出したスレッドで行うので、通知を受ける側で排他制御をする必要はありません。
+同時に進める仕事の数は、一定時間ごとの処理量を見て増減させます。増やして処理量が落ちたら減らし、減らして落ちたら増やします。変わらなければ減らします。
+同時に進める数が1のときは、スレッドを使わずに呼び出したスレッドでコピーします。ローカルディスクでは、これがいちばん速いことが多いので、1から始めます。
+このモジュールは、標準ライブラリだけで動きます。
+"""
+
+import concurrent.futures
+import logging
+import time
+
+#1ファイルにかかる手間を、バイト数に直したもの。処理量を比べるときに使う
+FILE_COST=64*1024
+
+class CopyScheduler(object):
+	def __init__(self,workers=1,maxWorkers=32,smallFileSize=1024*1024,batchFiles=64,batchBytes=8*1024*1024,window=0.5):
+		"""
+			workers は、最初に同時に進める仕事の数。maxWorkers まで増やす。smallFileSize バイト未満のファイルは、batchFiles 個か batchBytes バイトまでまとめる。
+			window 秒ごとに、同時に進める数を見直す。
+		"""
+		self.log=logging.getLogger("falcon.copyScheduler")
+		self.maxWorkers=max(1,maxWorkers)
+		self.workers=min(max(1,workers),self.maxWorkers)
+		self.smallFileSize=smallFileSize
+		self.batchFiles=max(1,batchFiles)
+		self.batchBytes=batchBytes
+		self.window=window
+		self.peakWorkers=self.workers
+
+	def Run(self,elements,copy,makeDir,onDone,onError,taskState=None):
+		"""
+			elements (isfile と size を持つ要素のイテラブル) を順番に処理する。ファイルは copy(要素) をワーカースレッドで、フォルダは makeDir(要素) をこのスレッドで呼ぶ。
+			成功したら onDone(要素) 、例外が起きたら onError(要素, 例外) を、このスレッドで呼ぶ。
+			最後まで処理したら True 、キャンセルされたら False を返す。
+		"""
+		self.limit=self.workers
+		self.direction=1
+		self.lastRate=None
+		self.windowStart=time.perf_counter()
+		self.windowWork=0
+		inflight=set()
+		batch=[]
+		batchBytes=0
+		with concurrent.futures.ThreadPoolExecutor(self.maxWorkers,"copyScheduler") as executor:
+			try:
+				for elem in elements:
+					if taskState is not None and taskState.canceled: return False
+					if not elem.isfile:
+						try:
+							makeDir(elem)
+						except Exception as err:
+							onError(elem,err)
+						else:
+							onDone(elem)
+						#end フォルダ作成
+						continue
+					#end フォルダ
+					if self.limit==1:#1つずつなら、ここでコピーする
+						while inflight:
+							self._collect(inflight,onDone,onError,True)
+						#end 増やしていたときの残りを待つ
+						batch.append(elem)
+						self._notify(self._copyBatch(batch,copy,taskState),onDone,onError)
+						batch=[]
+						batchBytes=0
+						self._tune()
+						continue
+					#end スレッドを使わない
+					if elem.size>=self.smallFileSize:#大きいファイルは、それだけで1つの仕事にする
+						self._submit(executor,inflight,[elem],copy,onDone,onError,taskState)
+						continue
+					#end 大きいファイル
+					batch.append(elem)
+					batchBytes+=elem.size
+					if len(batch)>=self.batchFiles or batchBytes>=self.batchBytes:
+						self._submit(executor,inflight,batch,copy,onDone,onError,taskState)
+						batch=[]
+						batchBytes=0
+					#end まとまった
+					self._collect(inflight,onDone,onError,False)
+				#end for
+				if batch: self._submit(executor,inflight,batch,copy,onDone,onError,taskState)
+				while inflight:
+					self._collect(inflight,onDone,onError,True)
+				#end 全部終わるまで待つ
+			finally:
+				for future in inflight:
+					future.cancel()
+				#end 途中で抜けたら、始まっていないものは取り消す
+			#end finally
+		#end with
+		self.log.debug("Copy finished with %d workers (peak %d)." % (self.limit,self.peakWorkers))
+		return taskState is None or not taskState.canceled
+
+	def _submit(self,executor,inflight,batch,copy,onDone,onError,taskState):
+		"""batch を1つの仕事として投げる。同時に進めている数が上限なら、どれかが終わるまで待つ。"""
+		while len(inflight)>=self.limit:
+			self._collect(inflight,onDone,onError,True)
+		#end 待つ
+		inflight.add(executor.submit(self._copyBatch,batch,copy,taskState))
+
+	def _collect(self,inflight,onDone,onError,block):
+		"""終わった仕事の結果を通知する。block が True なら、1つ終わるまで待つ。"""
+		if not inflight: return
+		done,notDone=concurrent.futures.wait(inflight,None if block else 0,concurrent.futures.FIRST_COMPLETED)
+		for future in done:
+			inflight.discard(future)
+			self._notify(future.result(),onDone,onError)
+		#end for
+		self._tune()
+
+	def _notify(self,results,onDone,onError):
+		"""_copyBatch の結果を通知する。"""
+		for elem,err in results:
+			if err is None:
+				self.windowWork+=elem.size+FILE_COST
+				onDone(elem)
+			else:
+				onError(elem,err)
+			#end 成功したかどうか
+		#end for
+
+	def _copyBatch(self,batch,copy,taskState):
+		"""ワーカースレッドで、batch のファイルを順番にコピーする。(要素, 例外か None) のリストを返す。"""
+		results=[]
+		for elem in batch:
+			if taskState is not None and taskState.canceled: break
+			try:
+				copy(elem)
+			except Exception as err:
+				results.append((elem,err))
+			else:
+				results.append((elem,None))
+			#end except
+		#end for
+		return results
+
+	def _tune(self):
+		"""window 秒ごとに処理量を比べて、同時に進める数を増減させる。"""
+		elapsed=time.perf_counter()-self.windowStart
+		if elapsed<self.window: return
+		rate=self.windowWork/elapsed
+		if self.lastRate is None:
+			self.direction=1#まず1つ増やしてみる
+		elif rate<self.lastRate*0.95:
+			self.direction=-self.direction#落ちたので、逆に動かす
+		elif rate<=self.lastRate*1.05:
+			self.direction=-1#変わらないなら、スレッドを増やしても意味がないので減らす
+		#end 処理量の変化
+		self.limit=min(max(1,self.limit+self.direction),self.maxWorkers)
+		self.peakWorkers=max(self.peakWorkers,self.limit)
+		self.lastRate=rate
+		self.windowStart=time.perf_counter()
+		self.windowWork=0
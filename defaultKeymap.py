@@ -59,7 +59,9 @@ defaultKeymap["MAINVIEW"]={
 	"READ_SETMOVEMENTREAD":"",
 
 	"TOOL_DIRCALC":"",
+	"TOOL_DIRCALC_REFRESH":"",
 	"TOOL_HASHCALC":"",
+	"TOOL_SIZEREPORT":"",
 	"TOOL_EXEC_PROGRAM": "ctrl+h/ctrl+shift+f2",
 	"TOOL_ADDPATH":"",
 	"TOOL_EJECT_DRIVE":"delete",
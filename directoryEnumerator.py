@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#Falcon directory enumerator
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+ディレクトリの中身を、1回の列挙だけで取得します。
+FindFirstFile 系や os.scandir が返す情報(属性・サイズ・日時)をそのまま DirectoryEntry に詰めるので、項目ごとに追加でファイルシステムへ問い合わせる必要がありません。
+種類の文字列やアイコンは、ここでは取得しません。リスト側で拡張子単位にまとめて解決してください。
+このモジュールは win32 のモジュールがない環境でも読み込めるようにしてあり、その場合は scandir を使います。
+"""
+
+import datetime
+import os
+import stat
+
+#win32file と同じ値。win32file がない環境でも使えるように、ここで定義しておく
+FILE_ATTRIBUTE_READONLY=0x1
+FILE_ATTRIBUTE_HIDDEN=0x2
+FILE_ATTRIBUTE_SYSTEM=0x4
+FILE_ATTRIBUTE_DIRECTORY=0x10
+FILE_ATTRIBUTE_ARCHIVE=0x20
+FILE_ATTRIBUTE_NORMAL=0x80
+FILE_ATTRIBUTE_REPARSE_POINT=0x400
+
+class EnumerationError(Exception):
+	"""ディレクトリを列挙できなかったことを表す。winerror には、分かればwindowsのエラー番号が入る。"""
+	def __init__(self,path,winerror,msg):
+		super().__init__("%s (%s)" % (msg,path))
+		self.path=path
+		self.winerror=winerror
+		self.msg=msg
+
+class DirectoryEntry(object):
+	"""列挙で得られた1項目を表す。日時はタイムゾーン付きの datetime 。"""
+	__slots__=["name","attributes","size","modDate","creationDate","shortName"]
+
+	def __init__(self,name,attributes,size,modDate,creationDate,shortName=""):
+		self.name=name
+		self.attributes=attributes
+		self.size=size
+		self.modDate=modDate
+		self.creationDate=creationDate
+		self.shortName=shortName
+
+	def IsDirectory(self):
+		return self.attributes&FILE_ATTRIBUTE_DIRECTORY!=0
+
+	def IsReparsePoint(self):
+		return self.attributes&FILE_ATTRIBUTE_REPARSE_POINT!=0
+
+	def __repr__(self):
+		return "<DirectoryEntry %s>" % self.name
+
+class EnumeratorBase(object):
+	"""列挙処理の基本クラス。サブクラスで、 Iterate と GetEntry を実装する。"""
+	name=""
+
+	def Iterate(self,path):
+		"""path の直下にある項目を DirectoryEntry でイテレートする。「.」と「..」は含まない。開けなかった場合は EnumerationError を送出する。"""
+
+	def GetEntry(self,fullpath):
+		"""fullpath の項目1つ分の DirectoryEntry を返す。存在しなければ None 。"""
+
+class FindFilesEnumerator(EnumeratorBase):
+	"""win32file.FindFilesIterator を使う。Windowsでの標準。"""
+	name="FindFiles"
+
+	def __init__(self):
+		import win32file
+		import pywintypes
+		self._win32file=win32file
+		self._error=pywintypes.error
+
+	def Iterate(self,path):
+		try:
+			for elem in self._win32file.FindFilesIterator(os.path.join(path,"*")):
+				if elem[8]=="." or elem[8]=="..": continue
+				yield self._makeEntry(elem)
+			#end for
+		except self._error as err:
+			raise EnumerationError(path,err.winerror,err.strerror)
+		#end except
+
+	def GetEntry(self,fullpath):
+		try:
+			for elem in self._win32file.FindFilesIterator(fullpath):
+				return self._makeEntry(elem)
+			#end for
+		except self._error:
+			pass
+		#end except
+		return None
+
+	def _makeEntry(self,elem):
+		if elem[0]&FILE_ATTRIBUTE_DIRECTORY:
+			size=-1
+		else:
+			size=(elem[4]<<32)+elem[5]
+		return DirectoryEntry(elem[8],elem[0],size,elem[3],elem[1],elem[9])
+
+class ScandirEnumerator(EnumeratorBase):
+	"""os.scandir を使う。Windows以外でも動く。Windowsでは、stat の情報が列挙の結果から得られるので追加の問い合わせは発生しない。"""
+	name="scandir"
+
+	def Iterate(self,path):
+		try:
+			with os.scandir(path) as it:
+				for entry in it:
+					try:
+						st=entry.stat(follow_symlinks=False)
+					except OSError:
+						continue#列挙中に消えた
+					#end except
+					yield self._makeEntry(entry.name,entry.path,st)
+				#end for
+			#end with
+		except OSError as err:
+			raise EnumerationError(path,getattr(err,"winerror",None),err.strerror)
+		#end except
+
+	def GetEntry(self,fullpath):
+		try:
+			st=os.stat(fullpath,follow_symlinks=False)
+		except OSError:
+			return None
+		#end except
+		return self._makeEntry(os.path.basename(fullpath),fullpath,st)
+
+	def _makeEntry(self,name,path,st):
+		attributes=_getAttributes(name,path,st)
+		if attributes&FILE_ATTRIBUTE_DIRECTORY:
+			size=-1
+		else:
+			size=st.st_size
+		return DirectoryEntry(
+			name,
+			attributes,
+			size,
+			datetime.datetime.fromtimestamp(st.st_mtime,datetime.timezone.utc),
+			datetime.datetime.fromtimestamp(_getCreationTime(st),datetime.timezone.utc)
+		)
+
+def _getAttributes(name,path,st):
+	"""stat の結果から、windows の属性値を得る。windows以外では、それらしい値を組み立てる。"""
+	attributes=getattr(st,"st_file_attributes",None)
+	if attributes is not None: return attributes
+	attributes=0
+	if stat.S_ISDIR(st.st_mode): attributes|=FILE_ATTRIBUTE_DIRECTORY
+	if stat.S_ISLNK(st.st_mode):
+		attributes|=FILE_ATTRIBUTE_REPARSE_POINT
+		try:
+			if os.path.isdir(path): attributes|=FILE_ATTRIBUTE_DIRECTORY
+		except OSError:
+			pass
+		#end except
+	#end リンク
+	if not st.st_mode&stat.S_IWUSR: attributes|=FILE_ATTRIBUTE_READONLY
+	if name.startswith("."): attributes|=FILE_ATTRIBUTE_HIDDEN
+	if attributes==0: attributes=FILE_ATTRIBUTE_NORMAL
+	return attributes
+
+def _getCreationTime(st):
+	"""作成日時を返す。取れない環境では、 st_ctime で代用する。"""
+	t=getattr(st,"st_birthtime",None)
+	return t if t is not None else st.st_ctime
+
+_enumerator=None
+
+def GetEnumerator():
+	"""この環境で使える列挙処理のうち、最適なものを返す。"""
+	global _enumerator
+	if _enumerator is None:
+		try:
+			_enumerator=FindFilesEnumerator()
+		except ImportError:
+			_enumerator=ScandirEnumerator()
+		#end except
+	#end 初回
+	return _enumerator
+
+def GetExtension(name):
+	"""ファイル名から、小文字にした拡張子をドットなしで返す。"""
+	i=name.rfind(".")
+	if i<0: return ""
+	return name[i+1:].lower()
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#Falcon directory size engine
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+フォルダのサイズ(中にあるファイルの合計バイト数、ファイル数、サブフォルダ数)を計算します。
+複数のフォルダを、複数のスレッドで同時に列挙します。属性やサイズは、列挙で得た情報(directoryEnumerator.DirectoryEntry)をそのまま使います。
+フォルダごとに、直下にあるファイルの合計とサブフォルダの名前を覚えておき、フォルダの更新日時が変わっていなければ、列挙し直さずに使います。同じフォルダを計算し直すときは、フォルダごとに日時を1回問い合わせるだけで済みます。
+ただし、ファイルの中身が書き換わっただけでは、フォルダの更新日時は変わりません。貼り付けや削除、フォルダの監視で変化が分かったときは、 Invalidate で覚えている情報を捨ててください。それ以外の方法で書き換わったものは、 Calculate に refresh=True を渡すと、覚えている情報を使わずに計算し直します。
+リパースポイント(ジャンクションやシンボリックリンク)は、数えず、中にも入りません。
+エントリ数には上限があり、超えた場合は最も長く使われていないものから破棄します(LRU)。
+このモジュールは、win32 のモジュールがない環境でも動きます。
+"""
+
+import collections
+import logging
+import os
+import threading
+
+import directoryEnumerator
+
+#計算に失敗したときの結果
+FAILED=(-1,-1,-1)
+
+class _Node(object):
+	"""フォルダ1つ分の、直下の情報。"""
+	__slots__=["modDate","size","files","children"]
+
+	def __init__(self,modDate,size,files,children):
+		self.modDate=modDate
+		self.size=size				#直下にあるファイルの合計バイト数
+		self.files=files			#直下にあるファイルの数
+		self.children=children		#サブフォルダの (名前, 更新日時) のタプル
+
+class _Job(object):
+	"""Calculate に渡されたフォルダ1つ分の計算。"""
+	__slots__=["index","size","files","dirs","outstanding","failed"]
+
+	def __init__(self,index):
+		self.index=index
+		self.size=0
+		self.files=0
+		self.dirs=-1				#自分自身も数えてしまうので
+		self.outstanding=1			#まだ調べていないフォルダの数
+		self.failed=False
+
+class DirectorySizeEngine(object):
+	def __init__(self,workers=4,maxEntries=100000):
+		self.log=logging.getLogger("falcon.directorySize")
+		self.workers=max(1,workers)
+		self.maxEntries=maxEntries
+		self.enumerator=directoryEnumerator.GetEnumerator()
+		self.nodes=collections.OrderedDict()#os.path.normcase したフルパス→_Node
+		self.lock=threading.Lock()
+		self.hits=0
+		self.misses=0
+		self.evictions=0
+
+	def Calculate(self,paths,taskState=None,callback=None,refresh=False):
+		"""
+			paths に指定したフォルダのサイズを、並行して計算する。refresh=True なら、覚えている情報を使わずに全て列挙し直す。
+			1つ計算し終わるごとに、 callback(paths の中のインデックス, (バイト数, ファイル数, サブフォルダ数)) を呼ぶ。計算できなかったものは FAILED 。callback は、計算しているスレッドから呼ばれる。
+			結果のリストを、paths と同じ順番で返す。キャンセルされたら None を返す。
+		"""
+		results=[None]*len(paths)
+		if not paths: return results
+		pending=[(_Job(i),path,None) for i,path in enumerate(paths)]
+		pending.reverse()#先に指定されたものから計算する
+		state={"pending": pending,"remaining": len(paths),"canceled": False}
+		condition=threading.Condition()
+		threads=[]
+		for i in range(self.workers):
+			t=threading.Thread(target=self._work,args=(state,condition,results,taskState,callback,refresh),name="directorySize%d" % (i+1),daemon=True)
+			t.start()
+			threads.append(t)
+		#end for
+		for t in threads:
+			t.join()
+		#end for
+		if state["canceled"] or (taskState is not None and taskState.canceled): return None
+		return results
+
+	def _work(self,state,condition,results,taskState,callback,refresh):
+		while True:
+			with condition:
+				while not state["pending"] and state["remaining"]>0 and not state["canceled"]:
+					if taskState is not None and taskState.canceled: state["canceled"]=True
+					condition.wait(0.1)
+				#end 他のスレッドが新しいフォルダを見つけるかもしれないので待つ
+				if not state["pending"] or state["canceled"]:
+					condition.notify_all()
+					return
+				#end もうない
+				job,path,modDate=state["pending"].pop()
+			#end lock
+			if taskState is not None and taskState.canceled:
+				with condition:
+					state["canceled"]=True
+					condition.notify_all()
+				#end lock
+				return
+			#end キャンセル
+			node,fresh=self._getNode(path,modDate,refresh)
+			finished=None
+			with condition:
+				job.outstanding-=1
+				if node is None:
+					if job.dirs<0: job.failed=True#指定されたフォルダ自体が開けなかった
+				else:
+					job.size+=node.size
+					job.files+=node.files
+					job.dirs+=1
+					job.outstanding+=len(node.children)
+					if fresh:#列挙したばかりなので、サブフォルダの日時は今のもの
+						state["pending"].extend((job,os.path.join(path,name),childModDate) for name,childModDate in node.children)
+					else:#覚えていた日時は古いかもしれないので、問い合わせ直させる
+						state["pending"].extend((job,os.path.join(path,name),None) for name,childModDate in node.children)
+					#end サブフォルダの日時
+				#end 開けたかどうか
+				if job.outstanding==0:
+					finished=FAILED if job.failed else (job.size,job.files,job.dirs)
+					results[job.index]=finished
+					state["remaining"]-=1
+				#end 1つ終わった
+				condition.notify_all()
+			#end lock
+			if finished is not None and callback is not None: callback(job.index,finished)
+
+	def _getNode(self,path,modDate,refresh=False):
+		"""
+			path の直下の情報を、 (_Node, 今列挙したかどうか) で返す。開けなければ (None, False) 。
+			modDate には、親フォルダを列挙したときに得た path の更新日時を渡す。分からなければ None で、その場合は問い合わせる。
+			refresh=True なら、覚えている情報は使わずに列挙し、覚え直す。
+		"""
+		if modDate is None:
+			entry=self.enumerator.GetEntry(path)
+			if entry is not None: modDate=entry.modDate#ドライブのルートなどは取れないので、覚えたものは使わない
+		#end 問い合わせる
+		key=os.path.normcase(path)
+		if modDate is not None and not refresh:
+			with self.lock:
+				node=self.nodes.get(key)
+				if node is not None and node.modDate==modDate:
+					self.nodes.move_to_end(key)
+					self.hits+=1
+					return node,False
+				#end 変わっていない
+				self.misses+=1
+			#end lock
+		#end 日時が分かる
+		size=files=0
+		children=[]
+		try:
+			for entry in self.enumerator.Iterate(path):
+				if entry.IsReparsePoint(): continue
+				if entry.IsDirectory():
+					children.append((entry.name,entry.modDate))
+				else:
+					size+=entry.size
+					files+=1
+				#end ファイルかフォルダか
+			#end for
+		except directoryEnumerator.EnumerationError as e:
+			self.log.error("Could not calculate the size of %s (%s)." % (path,e))
+			return None,False
+		#end except
+		node=_Node(modDate,size,files,tuple(children))
+		if modDate is not None:
+			with self.lock:
+				self.nodes[key]=node
+				self.nodes.move_to_end(key)
+				while len(self.nodes)>self.maxEntries:
+					self.nodes.popitem(last=False)
+					self.evictions+=1
+				#end 上限を超えたので古いものを捨てる
+			#end lock
+		#end 覚える
+		return node,True
+
+	def Invalidate(self,paths,recursive=False):
+		"""paths のフォルダについて覚えている情報を捨て、次に計算するときに列挙し直させる。recursive=True なら、中にあるフォルダの分も捨てる。"""
+		keys=[os.path.normcase(path) for path in paths]
+		with self.lock:
+			for key in keys:
+				self.nodes.pop(key,None)
+			#end for
+			if not recursive: return
+			prefixes=tuple(key.rstrip(os.sep)+os.sep for key in keys)
+			for key in [key for key in self.nodes if key.startswith(prefixes)]:
+				del self.nodes[key]
+			#end for
+		#end lock
+
+	def Clear(self):
+		"""覚えている情報を全て破棄する。"""
+		with self.lock:
+			self.nodes.clear()
+		#end lock
+
+	def GetStatistics(self):
+		"""ヒット数、ミス数、破棄数、現在のエントリ数、ヒット率を辞書で返す。"""
+		total=self.hits+self.misses
+		return {
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions,
+			"entries": len(self.nodes),
+			"hitRate": self.hits/total if total>0 else 0.0
+		}
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+#Falcon directory watcher
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+フォルダの中身の変化を監視します。
+変化のあった項目の名前を、一定時間(interval)ごとにまとめて、コールバックに渡します。名前の代わりに None が渡された場合は、変化が多すぎるなどの理由で、何が変わったのか分からなくなったことを表します。この場合は、フォルダ全体を取り直してください。
+コールバックは監視用のスレッドから呼ばれます。画面を触る場合は、wx.CallAfter を使ってください。
+Windowsでは ReadDirectoryChangesW を使い、win32 のモジュールがない環境では、定期的に列挙し直して比較します。
+"""
+
+import logging
+import threading
+import time
+
+import directoryEnumerator
+
+#ReadDirectoryChangesW で使う値。win32con と同じ
+FILE_LIST_DIRECTORY=0x1
+FILE_NOTIFY_CHANGE_FILE_NAME=0x1
+FILE_NOTIFY_CHANGE_DIR_NAME=0x2
+FILE_NOTIFY_CHANGE_ATTRIBUTES=0x4
+FILE_NOTIFY_CHANGE_SIZE=0x8
+FILE_NOTIFY_CHANGE_LAST_WRITE=0x10
+
+NOTIFY_FILTER=FILE_NOTIFY_CHANGE_FILE_NAME|FILE_NOTIFY_CHANGE_DIR_NAME|FILE_NOTIFY_CHANGE_ATTRIBUTES|FILE_NOTIFY_CHANGE_SIZE|FILE_NOTIFY_CHANGE_LAST_WRITE
+
+class WatcherBase(object):
+	"""監視処理の基本クラス。サブクラスで、 _run を実装する。callback は、 callback(watcher,names) の形で呼ばれる。names は変化のあった名前の集合か None 。"""
+	name=""
+
+	def __init__(self,path,callback,interval=0.2):
+		self.log=logging.getLogger("falcon.directoryWatcher")
+		self.path=path
+		self.callback=callback
+		self.interval=interval
+		self.stopEvent=threading.Event()
+		self.thread=None
+
+	def Start(self):
+		"""監視を始める。"""
+		self.thread=threading.Thread(target=self._run,name="directoryWatcher",daemon=True)
+		self.thread.start()
+		self.log.debug("Started watching %s (%s)" % (self.path,self.name))
+
+	def Stop(self,wait=False):
+		"""監視をやめる。wait=True の場合、監視用のスレッドが終わるまで待つ。"""
+		self.stopEvent.set()
+		self._wake()
+		if wait and self.thread is not None and self.thread is not threading.current_thread():
+			self.thread.join()
+		#end 待つ
+
+	def IsRunning(self):
+		return self.thread is not None and self.thread.is_alive()
+
+	def _wake(self):
+		"""待機中の監視スレッドを起こす。"""
+		pass
+
+	def _run(self):
+		"""監視用のスレッドで呼ばれる。 stopEvent がセットされるまで監視し、変化があれば _notify を呼ぶ。"""
+
+	def _notify(self,names):
+		if self.stopEvent.is_set(): return
+		try:
+			self.callback(self,names)
+		except Exception:
+			self.log.exception("Directory watcher callback failed.")
+		#end except
+
+class PollingWatcher(WatcherBase):
+	"""interval ごとにフォルダを列挙し直し、前回と比べて変わった名前を通知する。"""
+	name="polling"
+
+	def _run(self):
+		previous=self._snapshot()
+		while not self.stopEvent.wait(self.interval):
+			current=self._snapshot()
+			if current is None:
+				if previous is not None: self._notify(None)#フォルダが消えたなど
+				previous=None
+				continue
+			#end 列挙できなかった
+			if previous is None:
+				self._notify(None)
+			else:
+				names=set()
+				for name,state in current.items():
+					if previous.get(name)!=state: names.add(name)
+				#end 追加・変更
+				for name in previous:
+					if name not in current: names.add(name)
+				#end 削除
+				if names: self._notify(names)
+			#end 前回と比べる
+			previous=current
+		#end while
+
+	def _snapshot(self):
+		"""名前→(属性, サイズ, 更新日時) の辞書を作る。"""
+		ret={}
+		try:
+			for entry in directoryEnumerator.GetEnumerator().Iterate(self.path):
+				ret[entry.name]=(entry.attributes,entry.size,entry.modDate)
+			#end for
+		except directoryEnumerator.EnumerationError:
+			return None
+		#end except
+		return ret
+
+class ReadDirectoryChangesWatcher(WatcherBase):
+	"""ReadDirectoryChangesW で、変化をOSから通知してもらう。"""
+	name="ReadDirectoryChangesW"
+
+	def __init__(self,path,callback,interval=0.2):
+		super().__init__(path,callback,interval)
+		import win32event
+		import win32file
+		import pywintypes
+		self._win32event=win32event
+		self._win32file=win32file
+		self._pywintypes=pywintypes
+		self._handle=win32file.CreateFile(
+			path,
+			FILE_LIST_DIRECTORY,
+			win32file.FILE_SHARE_READ|win32file.FILE_SHARE_WRITE|win32file.FILE_SHARE_DELETE,#監視中でも、フォルダの削除や名前変更ができるように
+			None,
+			win32file.OPEN_EXISTING,
+			win32file.FILE_FLAG_BACKUP_SEMANTICS|win32file.FILE_FLAG_OVERLAPPED,
+			None
+		)
+		self._stopHandle=win32event.CreateEvent(None,True,False,None)
+
+	def _wake(self):
+		self._win32event.SetEvent(self._stopHandle)
+
+	def _run(self):
+		win32event=self._win32event
+		win32file=self._win32file
+		overlapped=self._pywintypes.OVERLAPPED()
+		overlapped.hEvent=win32event.CreateEvent(None,True,False,None)
+		buf=win32file.AllocateReadBuffer(65536)
+		names=set()
+		overflow=False
+		deadline=None
+		issued=False
+		try:
+			while True:
+				if not issued:
+					win32file.ReadDirectoryChangesW(self._handle,buf,False,NOTIFY_FILTER,overlapped)
+					issued=True
+				#end 次の通知を待つ
+				if deadline is None:
+					timeout=win32event.INFINITE
+				else:
+					timeout=max(0,int((deadline-time.monotonic())*1000))
+				#end まとめる時間が残っているか
+				rc=win32event.WaitForMultipleObjects([overlapped.hEvent,self._stopHandle],False,timeout)
+				if rc==win32event.WAIT_OBJECT_0+1: break#停止
+				if rc==win32event.WAIT_TIMEOUT:
+					self._notify(None if overflow else names)
+					names=set()
+					overflow=False
+					deadline=None
+					continue
+				#end まとめて通知
+				n=win32file.GetOverlappedResult(self._handle,overlapped,True)
+				issued=False
+				if n==0:
+					overflow=True#バッファが溢れて、通知が捨てられた
+				else:
+					for action,name in win32file.FILE_NOTIFY_INFORMATION(buf,n):
+						names.add(name)
+					#end for
+				#end 通知を読む
+				if deadline is None: deadline=time.monotonic()+self.interval
+			#end while
+		except self._pywintypes.error as err:
+			self.log.debug("Stopped watching %s (%s)" % (self.path,err))
+			self._notify(None)#フォルダが消えたなど
+		finally:
+			try:
+				if issued: win32file.CancelIo(self._handle)
+			except self._pywintypes.error:
+				pass
+			#end except
+			self._handle.Close()
+			overlapped.hEvent.Close()
+			self._stopHandle.Close()
+		#end finally
+
+def CreateWatcher(path,callback,interval=0.2,pollingInterval=2.0):
+	"""この環境で使える監視処理を作って、開始する。ReadDirectoryChangesW が使えなければ、pollingInterval 秒ごとに列挙し直す。監視できなければ None を返す。"""
+	try:
+		watcher=ReadDirectoryChangesWatcher(path,callback,interval)
+	except ImportError:
+		watcher=PollingWatcher(path,callback,pollingInterval)
+	except Exception as err:
+		logging.getLogger("falcon.directoryWatcher").debug("Cannot watch %s (%s)" % (path,err))
+		return None
+	#end except
+	watcher.Start()
+	return watcher
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#Falcon document text extraction
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+ドキュメントファイルから、テキストを取り出します。
+falconHelper.dll (xd2txlib) を使いますが、DLLの読み込みは最初に使うときまで遅らせています。
+プレーンテキストのファイルは、DLLを通さずに読めるように、エンコーディングの判定も行います。
+grep のワーカープロセスからも呼ばれるので、wx や globalVars には依存しないようにしてください。
+"""
+
+import codecs
+import ctypes
+import sys
+
+#エンコーディングの判定に使う、ファイルの先頭のバイト数
+DETECT_SIZE=65536
+
+_helper=None
+
+def _getHelper():
+	global _helper
+	if _helper is None:
+		_helper=ctypes.cdll.LoadLibrary("falconHelper.dll")
+	return _helper
+
+def _makeString(string):
+	"""falconHelper に渡せる、NULL終端のUTF-16文字列を作る。"""
+	tmp=bytearray(string.encode('UTF-16LE'))
+	tmp.extend(b'\x00\x00')
+	return bytes(tmp)
+
+def ExtractText(path):
+	"""path のドキュメントから、テキストを取り出して返す。"""
+	helper=_getHelper()
+	ptr=helper.extractText(_makeString(path))
+	s=ctypes.c_char_p(ptr).value
+	helper.releasePtr(ptr)
+	return s.decode('UTF-8')
+
+def DetectEncoding(head):
+	"""
+		ファイルの先頭のバイト列から、エンコーディングを判定する。(Pythonのエンコーディング名, BOMのバイト数) を返す。
+		BOMがあればそれに従う。なければ、NULの並び方でUTF-16を、それ以外はUTF-8として読めるかどうかで、UTF-8とShift_JIS(cp932)を見分ける。
+	"""
+	if head.startswith(codecs.BOM_UTF8): return "UTF-8",len(codecs.BOM_UTF8)
+	if head.startswith(codecs.BOM_UTF16_LE): return "UTF-16-LE",len(codecs.BOM_UTF16_LE)
+	if head.startswith(codecs.BOM_UTF16_BE): return "UTF-16-BE",len(codecs.BOM_UTF16_BE)
+	half=len(head)//2
+	if half>0:
+		even=head[0::2].count(0)
+		odd=head[1::2].count(0)
+		if odd>half*0.3 and even<half*0.05: return "UTF-16-LE",0#ASCIIの範囲の文字が多ければ、上位バイトのNULが並ぶ
+		if even>half*0.3 and odd<half*0.05: return "UTF-16-BE",0
+	#end UTF-16
+	try:
+		codecs.getincrementaldecoder("UTF-8")().decode(head,False)#途中で切れた最後の文字は、エラーにしない
+		return "UTF-8",0
+	except UnicodeDecodeError:
+		return "cp932",0
+	#end except
+
+#先頭・末尾を読むときに、一度に読むバイト数
+READ_BLOCK_SIZE=65536
+
+def ReadHeadLines(path,count,maxBytes=1024*1024):
+	"""
+		プレーンテキストのファイルの、先頭 count 行を返す。最後の改行の後ろの空行は数えない。ファイル全体は読まず、count 行が揃うか、 maxBytes まで読んだところでやめる。
+		maxBytes で打ち切った場合、最後の行は途中までになる。
+	"""
+	with open(path,"rb") as f:
+		head=f.read(READ_BLOCK_SIZE)
+		encoding,offset=DetectEncoding(head[:DETECT_SIZE])
+		decoder=codecs.getincrementaldecoder(encoding)("replace")
+		pieces=[decoder.decode(head[offset:])]
+		found=pieces[0].count("\n")
+		read=len(head)
+		while found<count and read<maxBytes:
+			block=f.read(min(READ_BLOCK_SIZE,maxBytes-read))
+			if not block: break
+			read+=len(block)
+			pieces.append(decoder.decode(block))
+			found+=pieces[-1].count("\n")
+		#end while
+	#end with
+	text="".join(pieces).replace("\r\n","\n")
+	if text.endswith("\n"): text=text[:-1]#最後の改行の後ろの空行は数えない
+	return text.split("\n")[:count]
+
+def ReadTailLines(path,count,maxBytes=1024*1024):
+	"""
+		プレーンテキストのファイルの、末尾 count 行を返す。最後の改行の後ろの空行は数えない。
+		ファイルの終わりから前に向かってブロック単位で読み、 count 行が揃うか、 maxBytes まで読んだところでやめる。
+	"""
+	with open(path,"rb") as f:
+		encoding,offset=DetectEncoding(f.read(DETECT_SIZE))
+		unit=2 if encoding.startswith("UTF-16") else 1#UTF-16 は、文字の途中から読まないようにする
+		size=f.seek(0,2)
+		start=size-(size-offset)%unit
+		data=b""
+		while start>offset:
+			step=min(READ_BLOCK_SIZE,start-offset,max(unit,maxBytes-len(data)))
+			step-=step%unit
+			if step<=0: break
+			start-=step
+			f.seek(start)
+			data=f.read(step)+data
+			text=data.decode(encoding,"replace").replace("\r\n","\n")
+			if text.endswith("\n"): text=text[:-1]
+			if text.count("\n")>=count or len(data)>=maxBytes: break#先頭の行は途中からかもしれないので、1行多く読む
+		#end while
+	#end with
+	text=data.decode(encoding,"replace").replace("\r\n","\n")
+	if text.endswith("\n"): text=text[:-1]
+	lines=text.split("\n")
+	if start>offset and len(lines)>1: lines=lines[1:]#途中から読み始めた行
+	return lines[-count:]
+
+def ReadHeadText(path,maxBytes=1024*1024):
+	"""プレーンテキストのファイルを、先頭から maxBytes まで読んで返す。"""
+	return "\n".join(ReadHeadLines(path,sys.maxsize,maxBytes))
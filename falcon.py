@@ -5,6 +5,7 @@
 #Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
 #See window.py for application entry point
 
+import multiprocessing
 import os
 import sys
 #カレントディレクトリを設定
@@ -45,4 +46,6 @@ def exchandler(type, exc, tb):
 #global schope
 sys.excepthook=exchandler
 
-if __name__ == "__main__": main()
+if __name__ == "__main__":
+	multiprocessing.freeze_support()#grep のワーカープロセスとして起動された場合は、ここで処理して終わる
+	main()
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#Falcon file name index
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+ファイル名検索のための、フォルダごとのパスの索引です。
+前回その場所を検索したときにたどったパスを、小文字にした順で並べてディスクに保存しておき、次の検索では、フォルダをたどり終わるのを待たずに、索引から結果を返します。
+索引のフォルダの中にあるフォルダを検索する場合も、その範囲のパスだけを使って答えます。
+検索するときは、正規表現の必須リテラルを、全てのパスを小文字にして改行でつないだ1つの文字列から str.find で探し、見つかった行だけを正規表現で確かめます。必須リテラルが複数あれば、その中で最も出現回数の少ないものを使います。
+索引は古くなっている可能性があるので、呼び出し側では、フォルダをたどり直した結果で確かめて、索引を作り直してください。
+このモジュールは、標準ライブラリだけで動きます。
+"""
+
+import array
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+import regexLiteral
+
+#索引ファイルの先頭。マジック、メタデータ(JSON)のバイト数
+HEADER=struct.Struct("<4sI")
+MAGIC=b"FNI1"
+EXTENSION=".idx"
+
+class FileNameIndex(object):
+	"""1つのフォルダ以下のパスの索引。パスは root からの相対パスで持つ。"""
+	def __init__(self,root,paths,created=None):
+		"""paths は、小文字にした順で並んでいること。並んでいなければ Build を使う。"""
+		self.root=root
+		self.paths=paths
+		self.created=created if created is not None else time.time()
+		self.text="\n".join(paths).lower()+"\n"#検索用に、小文字にして全部つないだもの
+		#小文字にすると長さが変わる文字もあるので、各行の開始位置は小文字にした後の文字列で数える
+		self.offsets=array.array("q",itertools.accumulate(itertools.chain((0,),(len(p.lower())+1 for p in paths))))
+
+	@classmethod
+	def Build(cls,root,paths):
+		"""たどった順のパスのリストから、索引を作る。"""
+		return cls(root,sorted(set(paths),key=str.lower))
+
+	def __len__(self):
+		return len(self.paths)
+
+	def Query(self,pattern,subdirectory=""):
+		"""
+			pattern (コンパイル済みの正規表現) にヒットするパスのリストを返す。
+			subdirectory に、 root から見た相対パスを指定すると、そのフォルダの中だけを検索し、そこからの相対パスを返す。
+		"""
+		lo,hi,prefix=self._getRange(subdirectory)
+		ret=[]
+		start=self.offsets[lo]
+		end=self.offsets[hi]
+		literals=[l.lower() for l in regexLiteral.GetRequiredLiterals(pattern.pattern,pattern.flags) if "\n" not in l]
+		literal=min(literals,key=lambda l: self.text.count(l,start,end)) if len(literals)>1 else "".join(literals)#数えるのは、候補の行を確かめるよりずっと速い
+		if not literal:#全部確かめる
+			return [path for path in (path[prefix:] for path in self.paths[lo:hi]) if pattern.search(path)]
+		#end リテラルなし
+		found=self.text.find(literal,start,end)
+		while found>=0:
+			i=bisect.bisect_right(self.offsets,found)-1
+			path=self.paths[i][prefix:]
+			if pattern.search(path): ret.append(path)
+			found=self.text.find(literal,self.offsets[i+1],end)#1行につき1回
+		#end while
+		return ret
+
+	def _getRange(self,subdirectory):
+		"""subdirectory の中のパスの範囲を、(最初のインデックス, 最後の次のインデックス, 取り除く接頭辞の長さ) で返す。"""
+		if not subdirectory: return 0,len(self.paths),0
+		key=(subdirectory.rstrip("\\/")+os.sep).lower()
+		#同じ接頭辞を持つものは、並び順で連続している。最後の区切り文字の次の文字で始まるものの手前までが範囲
+		return self._lowerBound(key),self._lowerBound(key[:-1]+chr(ord(key[-1])+1)),len(key)
+
+	def _lowerBound(self,key):
+		lo=0
+		hi=len(self.paths)
+		while lo<hi:
+			mid=(lo+hi)//2
+			if self._line(mid)<key:
+				lo=mid+1
+			else:
+				hi=mid
+			#end 比較
+		#end while
+		return lo
+
+	def _line(self,i):
+		return self.text[self.offsets[i]:self.offsets[i+1]-1]
+
+	def Serialize(self):
+		"""ファイルに保存するためのバイト列を返す。"""
+		meta=json.dumps({"root": self.root,"created": self.created,"count": len(self.paths)}).encode("UTF-8")
+		return HEADER.pack(MAGIC,len(meta))+meta+zlib.compress("\n".join(self.paths).encode("UTF-8","surrogatepass"))
+
+	@classmethod
+	def Deserialize(cls,data):
+		"""Serialize したバイト列から、索引を作る。壊れていれば ValueError を送出する。"""
+		if len(data)<HEADER.size: raise ValueError("index file is too short")
+		magic,metaSize=HEADER.unpack_from(data)
+		if magic!=MAGIC: raise ValueError("not a file name index")
+		try:
+			meta=json.loads(data[HEADER.size:HEADER.size+metaSize].decode("UTF-8"))
+			body=zlib.decompress(data[HEADER.size+metaSize:]).decode("UTF-8","surrogatepass")
+		except (zlib.error,UnicodeDecodeError,json.JSONDecodeError) as err:
+			raise ValueError(str(err))
+		#end except
+		return cls(meta["root"],body.split("\n") if body else [],meta["created"])
+
+class FileNameIndexStore(object):
+	"""索引ファイルを保存するフォルダを管理し、読み込んだ索引をメモリに持っておく。"""
+	def __init__(self,directory,maxRoots=32):
+		self.log=logging.getLogger("falcon.fileNameIndex")
+		self.directory=directory
+		self.maxRoots=maxRoots
+		self.loaded={}		#正規化したルート→FileNameIndex
+		self.lock=threading.Lock()
+
+	def Find(self,path):
+		"""
+			path を検索するのに使える索引を探す。path そのものか、最も近い親フォルダの索引。
+			(索引, 索引のルートから path への相対パス) を返す。なければ (None, "") 。
+		"""
+		path=os.path.abspath(path)
+		current=path
+		while True:
+			index=self._load(current)
+			if index is not None: return index,os.path.relpath(path,current) if current!=path else ""
+			parent=os.path.dirname(current)
+			if parent==current: return None,""
+			current=parent
+		#end while
+
+	def Save(self,root,paths):
+		"""root をたどった結果の paths で、索引を作り直して保存する。作った索引を返す。"""
+		root=os.path.abspath(root)
+		index=FileNameIndex.Build(root,paths)
+		try:
+			os.makedirs(self.directory,exist_ok=True)
+			fd,tmp=tempfile.mkstemp(".tmp","",self.directory)
+			with os.fdopen(fd,"wb") as f:
+				f.write(index.Serialize())
+			#end with
+			os.replace(tmp,self._makePath(root))
+		except OSError as err:
+			self.log.error("Cannot save file name index for %s (%s)" % (root,err))
+		#end except
+		with self.lock:
+			self.loaded[os.path.normcase(root)]=index
+		#end lock
+		self._trim()
+		return index
+
+	def SaveInBackground(self,root,paths):
+		"""Save を別のスレッドで行う。"""
+		threading.Thread(target=self.Save,args=(root,paths),name="fileNameIndex",daemon=True).start()
+
+	def _load(self,root):
+		key=os.path.normcase(root)
+		with self.lock:
+			if key in self.loaded: return self.loaded[key]
+		#end lock
+		try:
+			with open(self._makePath(root),"rb") as f:
+				data=f.read()
+			#end with
+		except OSError:
+			return None
+		#end except
+		try:
+			index=FileNameIndex.Deserialize(data)
+		except ValueError as err:
+			self.log.error("Broken file name index for %s (%s)" % (root,err))
+			return None
+		#end except
+		with self.lock:
+			self.loaded[key]=index
+		#end lock
+		return index
+
+	def _trim(self):
+		"""索引ファイルが maxRoots 個を超えたら、古いものから消す。"""
+		try:
+			with os.scandir(self.directory) as it:
+				found=sorted((entry.stat().st_mtime,entry.path) for entry in it if entry.name.endswith(EXTENSION))
+			#end with
+		except OSError:
+			return
+		#end except
+		for t,path in found[:max(0,len(found)-self.maxRoots)]:
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+			#end except
+		#end for
+		with self.lock:
+			self.loaded={k:v for k,v in self.loaded.items() if os.path.exists(self._makePath(v.root))}
+		#end lock
+
+	def _makePath(self,root):
+		return os.path.join(self.directory,hashlib.sha1(os.path.normcase(root).encode("UTF-8","surrogatepass")).hexdigest()+EXTENSION)
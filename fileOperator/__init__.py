@@ -37,6 +37,10 @@ class FileOperator(object):
 		self.output["failed"]=[]#失敗したファイル立ちの情報
 		self.output["retry"]={"files": []}#権限昇格して自動的にリトライするオペレーション
 		self.output["all_OK"]=False#全て成功ならTrueにする
+		self.output["percentage"]=0#進捗率
+		self.output["bytes_per_second"]=0#コピーの速度
+		self.output["eta"]=None#残り秒数。分からなければNone
+		self.canceled=False#キャンセルされたかどうか
 		self.started=False#スタートしたかどうか
 		self.instructions=None
 		self.resume=False#確認に応答した後のファイル処理では、これが True になっている。なので、エラーを無視したりとかする。処理に渡されたファイルは、問答無用で処理刷る(上書きするとかしないとかは、 confirmationManager が追加するかどうかのみに左右される)
@@ -69,12 +73,25 @@ class FileOperator(object):
 		#end キーがセットされてない
 		op=op.lower()
 		if threaded:
-			self.thread=threading.thread(self._process)
+			self.working=True#スレッドが動き出す前に、終わったと判断されないようにする
+			self.thread=threading.Thread(target=self._run,name="fileOperator",daemon=True)
+			self.thread.start()
 		else:
 			self._process()
 		#end スレッドかそうじゃないか
 		return True
 
+	def _run(self):
+		"""スレッドで実行するときの入り口。例外で抜けても、終わったことが分かるようにする。"""
+		try:
+			self._process()
+		except Exception:
+			self.log.exception("File operation failed.")
+			self.output["all_OK"]=False
+		finally:
+			self.working=False
+		#end finally
+
 	def _process(self):
 		"""ファイルオペレーション実行処理本体。スレッドで実行することもあるので、関数がべつになっている。"""
 		self.working=True
@@ -154,6 +171,24 @@ class FileOperator(object):
 		#end for
 		return lst
 
+	def Cancel(self):
+		"""実行中のオペレーションをキャンセルする。コピーは、ファイルの塊の区切りで止まる。"""
+		self.canceled=True
+
+	def SetPercentage(self,percentage):
+		"""進捗率を設定する。"""
+		self.output["percentage"]=percentage
+
+	def SetProgress(self,percentage,bytesPerSecond,eta):
+		"""進捗率、速度(バイト毎秒)、残り秒数を設定する。処理しているスレッドから呼ばれる。"""
+		self.output["percentage"]=percentage
+		self.output["bytes_per_second"]=bytesPerSecond
+		self.output["eta"]=eta
+
+	def GetProgress(self):
+		"""(進捗率, 速度, 残り秒数) を取得する。"""
+		return self.output["percentage"],self.output["bytes_per_second"],self.output["eta"]
+
 	def CheckFinished(self):
 		"""ファイルオペレーションが終了したかどうかを取得する。"""
 		return self.started and not self.working
@@ -12,7 +12,11 @@ def GetErrorNumber(err):
 	if isinstance(err,int): return err
 	s=str(err)
 	s=s.lstrip("(")
-	return int(s.split(",")[0])
+	try:
+		return int(s.split(",")[0])
+	except ValueError:#win32 形式ではない例外文字列
+		return 0
+	#end 数値でない
 
 def IsAccessDenied(num):
 	"""エラーナンバーから、アクセス拒否のエラーかどうかを調べる。"""
@@ -7,21 +7,29 @@ import os
 import re
 import time
 import win32file
+import winerror
 from . import confirmElement, failedElement, helper
+import copyEngine
+import copyScheduler
 import misc
+import pastePlanner
 from clipboard import COPY, MOVE
 
 VERB="past"
 log=logging.getLogger("falcon.%s" % VERB)
+COPY_FILE_NO_BUFFERING=0x00001000#pywin32 に定義されていない
 """テスト用のモックです。ディスクへの書き込みを待ち時間でシミュレートします。"""
 
 class Element(object):
-	"""コピー/移動する項目の情報を持っておく。"""
-	def __init__(self,path,basepath,destpath):
+	"""コピー/移動する項目の情報を持っておく。数が多くなるので、属性は固定にしてある。"""
+	__slots__=["path","isfile","size","destpath"]
+
+	def __init__(self,path,basepath,destpath,isfile=None,size=None):
+		"""isfile と size は、列挙で分かっていれば渡す。省略すると、問い合わせる。"""
 		self.path=path
-		self.isfile=os.path.isfile(path)
-		self.size=os.path.getsize(path) if self.isfile else -1
-		if basepath is None or destpath is None: return#どっちかがNoneだったら、移動するときのフォルダ削除用エントリとして取り扱うことにする
+		self.isfile=isfile if isfile is not None else os.path.isfile(path)
+		if size is None: size=os.path.getsize(path) if self.isfile else -1
+		self.size=size
 		self.destpath=path.replace(basepath,destpath)#これがコピー先
 	#end __init__
 #end Element
@@ -51,68 +59,106 @@ def Execute(op,resume=False):
 	basepath=op.output["basepath"]
 	destpath=op.output["destpath"]
 	log.debug("Base path: %s dest path: %s" % (basepath,destpath))
-	log.debug("Retrieving file list...")
-	lst=[]
+	roots=[]
 	for elem in f:
 		if not basepath in elem:
-			debug.log("Ummatched base path, skipping %s" % elem)
+			log.debug("Ummatched base path, skipping %s" % elem)
 			continue
 		#end ベースパスが合わない
-		if os.path.isfile(elem):
-			lst.append(Element(elem,basepath,destpath))
-		else:
-			e=Element(elem,basepath,destpath)
-			if os.path.isdir(e.destpath) and not resume:
-				_processExistingFolder(op.output,elem,basepath,destpath)#フォルダがもうあれば、その時点で確認に入れる(中のフォルダを展開しない)
-			else:#まだないか、確認済みなので追加
-				_expandFolder(lst,elem,e,basepath,destpath)
-			#end フォルダを展開するかしないか
-		#end フォルダだった
-	#end ファイルリスト作るループ
-	#ファイルリスト作ったので、もともとの target に上書き
-	f=lst
-	log.debug("%d items found." % len(f))
-	#コピーサイズの合計を計算
-	total=0
-	for elem in f:
-		if elem.size!=-1: total+=elem.size
-	#end サイズを足す
-	op.output['total_bytes']=total
+		if copy_move_flag==MOVE and _moveSameVolume(op,elem,basepath,destpath,resume): continue#同じボリュームなので、丸ごと移動できた
+		if not resume and os.path.isdir(elem) and os.path.isdir(elem.replace(basepath,destpath)):
+			_processExistingFolder(op.output,elem,basepath,destpath)#フォルダがもうあれば、その時点で確認に入れる(中のフォルダを展開しない)
+			continue
+		#end フォルダがもうある
+		roots.append(elem)#まだないか、確認済みなので、たどってコピーする
+	#end 貼り付ける項目を決めるループ
+	#フォルダの中は、コピーしながら別のスレッドでたどる。合計サイズは、たどるにつれて増えていく
+	planner=pastePlanner.PastePlanner(roots,lambda path,isfile,size: Element(path,basepath,destpath,isfile,size))
+	op.output['total_bytes']=0
 	op.output['current_bytes']=0
-	log.debug("Size: %d bbytes" % total)
 	log.debug("Start copying...")
 	overwrite=0 if resume else win32file.COPY_FILE_FAIL_IF_EXISTS
-	pasted_size=0
-	for elem in f:
-		if elem.destpath is None:#フォルダ削除用
-			try:
-				win32file.RemoveDirectory(elem.path,None)
-			except win32file.error as err:
-				log.debug("Error encountered when trying to delete moved folder: %s" % str(err))
-			#end except
-		#end フォルダ消す
-		try:
-			if elem.isfile:
-				win32file.CopyFileEx(elem.path,elem.destpath,None,None,False,overwrite)
-			else:
-				if resume and os.path.isdir(elem.destpath): continue#再開している場合はエラーになる前に逃げる
-				win32file.CreateDirectory(elem.destpath,None)
-		except win32file.error as err:
-			log.error("Cannot create %s (%s)" % (elem.destpath, str(err)))
-			ProcessError(op,elem,str(err),resume)
-			continue
-		#end except
+	largeFileSize=op.instructions.get("copy_large_file_size",64*1024*1024)
+	unbufferedSize=op.instructions.get("copy_unbuffered_size",256*1024*1024)
+	verify=op.instructions.get("copy_verify",False)
+	verifyAlgorithm=op.instructions.get("copy_verify_algorithm",copyEngine.DEFAULT_HASH_ALGORITHM)
+	tracker=copyEngine.ProgressTracker()#コピーしたバイト数は、大きいファイルでは塊ごとに、それ以外ではファイルごとに数える
+	def report():
+		"""進捗を op に書く。ワーカースレッドからも呼ばれる。"""
+		tracker.SetTotal(planner.totalBytes)
+		op.output['total_bytes']=tracker.total
+		op.output['current_bytes']=tracker.current
+		if tracker.total<=0: return
+		percentage=tracker.GetPercentage()
+		if not planner.finished: percentage=min(percentage,99)#まだ合計が増えるかもしれない
+		eta=tracker.GetETA() if planner.finished else None
+		op.SetProgress(percentage,tracker.GetBytesPerSecond(),None if eta is None else int(eta))
+	#end report
+	def copy(elem):
+		"""ワーカースレッドで呼ばれる。"""
+		if verify:#コピーしながらハッシュを計算する必要があるので、 CopyFileEx は使えない。属性はコピーするが、代替データストリームはコピーされない
+			copyEngine.CopyAndVerify(elem.path,elem.destpath,verifyAlgorithm,resume,tracker.Add,op,unbuffered=unbufferedSize>0 and elem.size>=unbufferedSize)
+			if elem.size>=largeFileSize: report()
+		elif elem.size>=largeFileSize:
+			_copyLargeFile(op,elem,overwrite|(COPY_FILE_NO_BUFFERING if unbufferedSize>0 and elem.size>=unbufferedSize else 0),tracker,report)
+		else:
+			win32file.CopyFileEx(elem.path,elem.destpath,None,None,False,overwrite)
+			tracker.Add(elem.size)
+		#end 大きいファイルかどうか
 		if copy_move_flag==MOVE:
 			try:
-				if elem.isfile: win32file.DeleteFile(elem.path)
+				win32file.DeleteFile(elem.path)
 			except win32file.error as err:
 				log.debug("Error encountered when deleting moved file: %s" % str(err))
 			#end except
 		#end 移動モード
+	#end copy
+	def makeDir(elem):
+		win32file.CreateDirectory(elem.destpath,None)
+	#end makeDir
+	def onDone(elem):
 		op.output["succeeded"]+=1
-		pasted_size+=elem.size
-		op.SetPercentage(int(pasted_size/total*100))
-	#end 削除処理
+		report()
+	#end onDone
+	def onError(elem,err):
+		if op.canceled: return#キャンセルで止めたものは、失敗として扱わない
+		if isinstance(err,copyEngine.VerificationError):#移動の場合も、移動元は消していない
+			log.error("Verification failed: %s" % str(err))
+			op.output["all_OK"]=False
+			op.output["failed"].append(failedElement.FailedElement(elem.destpath,(0,_("コピー先の内容がコピー元と一致しません。"))))
+			return
+		#end 内容が一致しない
+		log.error("Cannot create %s (%s)" % (elem.destpath, str(err)))
+		if isinstance(err,OSError):#copyEngine の例外を、 win32file の例外と同じ形にする
+			num=getattr(err,"winerror",None)
+			if not num:#os.open の O_EXCL などは、Windows でも errno の例外になる
+				if isinstance(err,FileExistsError): num=winerror.ERROR_ALREADY_EXISTS
+				elif isinstance(err,PermissionError): num=winerror.ERROR_ACCESS_DENIED
+			#end errno の例外
+			if num: err="(%d, 'CopyFile', '%s')" % (num,err.strerror)
+		#end OSError
+		ProcessError(op,elem,str(err),resume)
+	#end onError
+	scheduler=copyScheduler.CopyScheduler(
+		op.instructions.get("copy_workers",1),
+		op.instructions.get("copy_max_workers",32),
+		op.instructions.get("copy_small_file_size",1024*1024)
+	)
+	movedFolders=[]#移動元のフォルダ。中身を移動し終わったら消す
+	def plan():
+		for elem in planner:
+			if copy_move_flag==MOVE and not elem.isfile: movedFolders.append(elem.path)
+			if elem.isfile or not (resume and os.path.isdir(elem.destpath)): yield elem#再開している場合は、もうあるフォルダはエラーになる前に飛ばす
+		#end for
+	#end plan
+	try:
+		scheduler.Run(plan(),copy,makeDir,onDone,onError,op)
+	finally:
+		planner.Cancel()#途中で抜けていたら、たどるのもやめる
+	#end finally
+	_removeMovedFolders(movedFolders)
+	if op.canceled: log.debug("Canceled.")
+	log.debug("%d items, %d bytes." % (planner.totalItems,planner.totalBytes))
 	if len(op.output["retry"]["target"])>0:
 		op.output["retry"]["operation"]=VERB
 		retry=len(op.output["retry"]["target"])
@@ -134,19 +180,63 @@ def ProcessError(op,elem,msg,resume):
 		op._doCallback("confirm", {"reason": "already_exists", "elem": elem, "confirmation_manager_index": op.output["need_to_confirm"].GetLastIndex()})
 		return
 	#end 要確認
-	output["all_OK"]=False
-	output["failed"].append(failedElement.FailedElement(elem.destpath,(number,msg)))
+	op.output["all_OK"]=False
+	op.output["failed"].append(failedElement.FailedElement(elem.destpath,(number,msg)))
 #end ProcessError
 
+def _removeMovedFolders(folders):
+	"""
+		移動元のフォルダを、深いものから消す。folders は、たどった順(フォルダが中身より先)のリスト。
+		移動できなかったファイルが残っているフォルダは、空にならないので消えずに残る。
+	"""
+	for path in reversed(folders):
+		try:
+			win32file.RemoveDirectory(path,None)
+		except win32file.error as err:
+			log.debug("Error encountered when trying to delete moved folder: %s" % str(err))
+		#end except
+	#end for
+
+def _copyLargeFile(op,elem,flags,tracker,report):
+	"""
+		大きいファイルを、 CopyFileEx の進捗ルーチンで、コピーした分ずつ tracker に足しながらコピーする。
+		op がキャンセルされたら、次の塊の前で止める(書きかけのファイルは、 CopyFileEx が消す)。
+	"""
+	copied=[0]
+	def progress(total,transferred,streamSize,streamTransferred,streamNumber,reason,src,dest,data):
+		tracker.Add(transferred-copied[0])
+		copied[0]=transferred
+		report()
+		return win32file.PROGRESS_CANCEL if op.canceled else win32file.PROGRESS_CONTINUE
+	#end progress
+	win32file.CopyFileEx(elem.path,elem.destpath,progress,None,False,flags)
+	tracker.Add(elem.size-copied[0])#最後の塊の通知がなかった場合に合わせる
+
+def _moveSameVolume(op,path,basepath,destpath,resume):
+	"""
+		移動元と移動先が同じボリュームなら、path をフォルダごと MoveFileEx で移動する(中身はコピーしない)。
+		移動できたら True を返す。違うボリュームの場合や、移動できなかった場合は False を返すので、今までどおりコピーしてから消す。
+	"""
+	dest=path.replace(basepath,destpath)
+	try:
+		if os.stat(path).st_dev!=os.stat(destpath).st_dev: return False#st_dev は、ボリュームのシリアル番号
+	except OSError:
+		return False
+	#end except
+	flags=0
+	if os.path.exists(dest):
+		if not resume or os.path.isdir(dest): return False#確認や、フォルダの中身の統合は、今までの処理で行う
+		flags=win32file.MOVEFILE_REPLACE_EXISTING#上書きすると応答されたファイル
+	#end 移動先がもうある
+	try:
+		win32file.MoveFileEx(path,dest,flags)
+	except win32file.error as err:
+		log.debug("Cannot move %s directly, falling back to copy (%s)" % (path,str(err)))
+		return False
+	#end except
+	op.output["succeeded"]+=1
+	return True
+
 def _processExistingFolder(output,elem,basepath,destpath):
 	"""指定したフォルダを、すでに存在するフォルダとして、 need_to_confirm に入れる。"""
 	output["need_to_confirm"].Append(confirmElement.ConfirmElement(Element(elem,basepath,destpath),80,_("このフォルダはすでに存在します。")))
-
-def _expandFolder(lst,path,e,basepath,destpath):
-	"""フォルダを展開して、指定されたリストに入れる。"""
-	print("expand")
-	lst.append(e)#イテレーションの最初に親フォルダ追加
-	for elem in misc.IteratePaths_dirFirst(path):
-		lst.append(Element(elem,basepath,destpath))
-	#end フォルダからファイルリスト
-#end _expandFolder
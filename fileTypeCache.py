@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#Falcon file type cache
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+種類の文字列とアイコンを、アプリ全体で共有するキャッシュです。
+SHGetFileInfo は呼ぶたびに新しいアイコンハンドルを作ってしまうので、拡張子と属性の組み合わせごとに1回だけ問い合わせ、以降は同じ文字列とハンドルを返します。
+アイコンハンドルは SharedIcon で返します。タブ側でwx.Iconを作るときは、CopyIcon したものを使ってください。
+エントリ数には上限があり、超えた場合は最も長く使われていないものからキャッシュの外に出します(LRU)。出したアイコンは、それを持っているファイルなどの要素がなくなってから破棄します。
+"""
+
+import collections
+import logging
+import os
+import threading
+import win32file
+import win32gui
+import pywintypes
+
+import directoryEnumerator
+
+from win32com.shell import shell, shellcon
+
+#アイコンをファイルごとに持っている拡張子。これらは拡張子単位では共有せず、パス単位でキャッシュする
+PER_FILE_ICON_EXTENSIONS={"exe","lnk","ico","url","cur","ani","scr","msc","appref-ms"}
+
+class SharedIcon(int):
+	"""
+		キャッシュが返すアイコンハンドル。int として使える。どこからも参照されなくなったときに DestroyIcon する。
+		キャッシュから追い出されても、まだ持っている要素があるうちは破棄されないので、ハンドルの値が別のアイコンに使い回されることはない。
+		key にはキャッシュのキーが入る。同じキーなら同じアイコンなので、タブはこれでイメージリストの番号を覚える。
+	"""
+	def __new__(cls,hIcon,key):
+		self=super().__new__(cls,hIcon)
+		self.key=key
+		return self
+
+	def __del__(self):
+		try:
+			win32gui.DestroyIcon(int(self))
+		except Exception:#終了処理中は、モジュールが先に片付けられていることがある
+			pass
+		#end except
+
+class FileTypeCache(object):
+	def __init__(self,maxEntries=512):
+		self.log=logging.getLogger("falcon.fileTypeCache")
+		self.maxEntries=maxEntries
+		self.entries=collections.OrderedDict()#キー→(種類の文字列, アイコンハンドル)
+		self.lock=threading.Lock()#検索はワーカースレッドから呼ばれるので排他する
+		self.hits=0
+		self.misses=0
+		self.evictions=0
+
+	def GetTypeInfo(self,fullpath,attributes):
+		"""ファイルまたはフォルダの、(種類の文字列, アイコンハンドル) を返す。attributes にはwindowsの属性値を渡す。"""
+		key=self._makeKey(fullpath,attributes)
+		if key[0]=="path":
+			return self._get(key,fullpath,0,shellcon.SHGFI_ICON | shellcon.SHGFI_TYPENAME)
+		return self._get(key,fullpath,key[1] or win32file.FILE_ATTRIBUTE_NORMAL,shellcon.SHGFI_ICON | shellcon.SHGFI_TYPENAME | shellcon.SHGFI_USEFILEATTRIBUTES)
+
+	def GetIcon(self,path,key=None):
+		"""ドライブやネットワークリソースなど、パスそのものに対応するアイコンハンドルを返す。key を指定すると、パスの代わりにキャッシュのキーとして使う。"""
+		if key is None: key=path.lower()
+		return self._get(("path",key),path,0,shellcon.SHGFI_ICON)[1]
+
+	def _makeKey(self,fullpath,attributes):
+		"""キャッシュのキーを作る。拡張子と、属性の分類(ファイルかフォルダか)の組み合わせ。アイコンを個別に持ちうるものは、パスをキーにする。"""
+		if attributes&win32file.FILE_ATTRIBUTE_DIRECTORY:
+			if attributes&(win32file.FILE_ATTRIBUTE_READONLY|win32file.FILE_ATTRIBUTE_SYSTEM):#desktop.ini でアイコンが変わっているかもしれない
+				return ("path",fullpath.lower())
+			return ("",win32file.FILE_ATTRIBUTE_DIRECTORY)
+		#end フォルダ
+		ext=directoryEnumerator.GetExtension(os.path.basename(fullpath))
+		if ext in PER_FILE_ICON_EXTENSIONS:
+			return ("path",fullpath.lower())
+		return (ext,0)
+
+	def _get(self,key,path,attributes,flags):
+		with self.lock:
+			try:
+				ret=self.entries[key]
+				self.entries.move_to_end(key)
+				self.hits+=1
+				return ret
+			except KeyError:
+				self.misses+=1
+			#end キャッシュにあった
+		#end lock
+		try:
+			r, shfileinfo=shell.SHGetFileInfo(path,attributes,flags)
+			value=(shfileinfo[4],SharedIcon(shfileinfo[0],key) if shfileinfo[0]>0 else -1)
+		except pywintypes.error as err:
+			self.log.debug("SHGetFileInfo failed for %s (%s)" % (path,err))
+			return ("",-1)
+		#end except
+		with self.lock:
+			if key in self.entries:#別のスレッドが先に登録した。作ったアイコンは、参照がなくなった時点で破棄される
+				return self.entries[key]
+			#end 先を越された
+			self.entries[key]=value
+			while len(self.entries)>self.maxEntries:
+				self.entries.popitem(last=False)#アイコンは、持っている要素がなくなってから破棄される
+				self.evictions+=1
+			#end 上限を超えたので古いものを捨てる
+		#end lock
+		return value
+
+	def Clear(self):
+		"""全てのエントリを捨てる。アイコンは、持っている要素がなくなってから破棄される。"""
+		with self.lock:
+			self.entries.clear()
+		#end lock
+
+	def GetStatistics(self):
+		"""ヒット数、ミス数、破棄数、現在のエントリ数、ヒット率を辞書で返す。"""
+		total=self.hits+self.misses
+		return {
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions,
+			"entries": len(self.entries),
+			"hitRate": self.hits/total if total>0 else 0.0
+		}
+
+	def __len__(self):
+		return len(self.entries)
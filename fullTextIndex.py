@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+#Falcon full text index
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+ファイル内容検索(grep)のための、転置索引です。
+ドキュメントから取り出したテキストに含まれる2文字の組(バイグラム)ごとに、それを含むファイルのIDを記録します。日本語のように単語の区切りがない文章でも、部分一致の候補を絞り込めます。
+バイグラムは、ハッシュ値にして 2^22 通りにまとめています。衝突すると候補が増えるだけで、取りこぼしはありません。
+検索キーワードの必須リテラルに含まれるバイグラムを全て含むファイルだけが候補で、それ以外のファイルは、索引を作ったときからサイズと更新日時が変わっていなければ、検索を省略できます。
+索引は sqlite3 のデータベースに保存します。ファイルごとのサイズと更新日時を記録しているので、更新は変わったファイルの分だけで済みます。
+ファイル内容検索でテキストを取り出したついでに MakeEntry で作った情報を Update に渡すと、そのファイルはテキストを取り出し直さずに索引に入れます。
+このモジュールは、標準ライブラリだけで動きます。
+"""
+
+import array
+import logging
+import operator
+import os
+import re
+import sqlite3
+import threading
+import zlib
+
+import regexLiteral
+
+TERM_MASK=(1<<22)-1
+
+SCHEMA="""
+CREATE TABLE IF NOT EXISTS files(id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT UNIQUE NOT NULL, size INTEGER NOT NULL, mtime INTEGER NOT NULL, complete INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS postings(term INTEGER NOT NULL, ids BLOB NOT NULL);
+CREATE INDEX IF NOT EXISTS postings_term ON postings(term);
+"""
+
+#1つのバイグラムに対して、postings の行がこれより多くなったら、まとめ直す
+COMPACT_ROWS_PER_TERM=8
+
+def GetTerms(text):
+	"""text に含まれるバイグラムを、ハッシュ値の集合にして返す。大文字と小文字は区別しない。"""
+	text=text.lower()
+	return {zlib.crc32(gram.encode("UTF-8","surrogatepass"))&TERM_MASK for gram in set(map(operator.add,text,text[1:]))}
+
+def MakeEntry(path,text,maxTextLength,st):
+	"""
+		Update の prepared に渡す、1ファイル分の情報を作る。text はファイルから取り出したテキストで、先頭 maxTextLength 文字より後ろは使わない。st は、テキストを取り出す前に取った os.stat の結果。
+		(正規化したパス, サイズ, 更新日時, バイグラムの配列のバイト列, 全文を索引に入れたか) のタプルを返す。プロセスをまたいで渡せる。
+	"""
+	return (os.path.normcase(path),st.st_size,st.st_mtime_ns,array.array("I",GetTerms(text[:maxTextLength])).tobytes(),len(text)<=maxTextLength)
+
+class FullTextIndex(object):
+	def __init__(self,path,maxTextLength=16*1024*1024):
+		"""path はデータベースファイル。1ファイルにつき、先頭 maxTextLength 文字までを索引に入れる。それより長いファイルは、常に検索する。"""
+		self.log=logging.getLogger("falcon.fullTextIndex")
+		self.path=path
+		self.maxTextLength=maxTextLength
+		self.lock=threading.Lock()#更新は同時に1つだけ
+		self.initialized=False
+
+	def _connect(self):
+		"""スレッドごとに、データベースに接続する。"""
+		con=sqlite3.connect(self.path,timeout=30)
+		if not self.initialized:
+			con.execute("PRAGMA journal_mode=WAL")#更新中でも検索できるように
+			con.executescript(SCHEMA)
+			self.initialized=True
+		#end 初回
+		return con
+
+	def _selectFiles(self,con,root):
+		"""root 以下に記録されているファイルの、正規化したパス→(ID, サイズ, 更新日時, 全文を索引に入れたか) の辞書を返す。"""
+		prefix=os.path.join(os.path.normcase(os.path.abspath(root)),"")
+		upper=prefix[:-1]+chr(ord(prefix[-1])+1)#同じ接頭辞を持つものは、この範囲に並ぶ
+		ret={}
+		for path,fileId,size,mtime,complete in con.execute("SELECT path,id,size,mtime,complete FROM files WHERE path>=? AND path<?",(prefix,upper)):
+			ret[path]=(fileId,size,mtime,complete)
+		#end for
+		return ret
+
+	def GetFiles(self,root):
+		"""root 以下に記録されているファイルの、正規化したパス→(ID, サイズ, 更新日時, 全文を索引に入れたか) の辞書を返す。"""
+		con=self._connect()
+		try:
+			return self._selectFiles(con,root)
+		finally:
+			con.close()
+		#end finally
+
+	def Update(self,root,fullpaths,getText,taskState=None,batchSize=200,prepared=None):
+		"""
+			root 以下の索引を、今ある fullpaths に合わせる。新しいファイルと変わったファイルは、 getText(フルパス) でテキストを取り出して入れ直し、 fullpaths にないファイルは消す。
+			prepared には、正規化したパス→MakeEntry で作った情報の辞書を渡せる。サイズと更新日時が今のものと同じなら、テキストを取り出さずにその情報を使う。
+			最後まで更新したら True 、taskState がキャンセルされたら False を返す。キャンセルした場合も、そこまでの更新は保存される。
+		"""
+		with self.lock:
+			con=self._connect()
+			try:
+				known=self._selectFiles(con,root)
+				pending={}#バイグラム→ファイルIDの配列。batchSize ファイルごとに書き込む
+				indexed=0
+				for fullpath in fullpaths:
+					if taskState is not None and taskState.canceled:
+						self._flush(con,pending)
+						return False
+					#end キャンセル
+					key=os.path.normcase(fullpath)
+					old=known.pop(key,None)
+					try:
+						st=os.stat(fullpath)
+					except OSError:
+						continue
+					#end except
+					if old is not None and old[1]==st.st_size and old[2]==st.st_mtime_ns: continue#変わっていない
+					entry=prepared.get(key) if prepared is not None else None
+					if entry is not None and entry[1]==st.st_size and entry[2]==st.st_mtime_ns:#検索のついでに作ったものが使える
+						terms=array.array("I")
+						terms.frombytes(entry[3])
+						complete=entry[4]
+					else:
+						try:
+							text=getText(fullpath)
+						except Exception as err:
+							self.log.debug("Cannot index %s (%s)" % (fullpath,err))
+							continue
+						#end except
+						terms=GetTerms(text[:self.maxTextLength])
+						complete=len(text)<=self.maxTextLength
+					#end テキストを取り出す
+					if old is not None: con.execute("DELETE FROM files WHERE id=?",(old[0],))#古いIDの postings は、まとめ直すときに消える
+					fileId=con.execute("INSERT INTO files(path,size,mtime,complete) VALUES(?,?,?,?)",(key,st.st_size,st.st_mtime_ns,int(complete))).lastrowid
+					for term in terms:
+						ids=pending.get(term)
+						if ids is None: ids=pending[term]=array.array("I")
+						ids.append(fileId)
+					#end for
+					indexed+=1
+					if indexed%batchSize==0: self._flush(con,pending)
+				#end for
+				if known: con.executemany("DELETE FROM files WHERE id=?",[(v[0],) for v in known.values()])#なくなったファイル
+				self._flush(con,pending)
+				self.log.debug("Indexed %d files and removed %d files under %s." % (indexed,len(known),root))
+				self._compactIfNeeded(con,taskState)
+				return True
+			finally:
+				con.close()
+			#end finally
+		#end lock
+
+	def _flush(self,con,pending):
+		if pending: con.executemany("INSERT INTO postings(term,ids) VALUES(?,?)",((term,ids.tobytes()) for term,ids in pending.items()))
+		con.commit()
+		pending.clear()
+
+	def _compactIfNeeded(self,con,taskState):
+		"""追記を繰り返して、1つのバイグラムの行が増えすぎていたら、まとめ直す。消えたファイルのIDも取り除く。"""
+		rows,terms=con.execute("SELECT COUNT(*),COUNT(DISTINCT term) FROM postings").fetchone()
+		if terms==0 or rows<=terms*COMPACT_ROWS_PER_TERM: return
+		live=set(fileId for fileId, in con.execute("SELECT id FROM files"))
+		merged={}
+		for term,blob in con.execute("SELECT term,ids FROM postings"):
+			if taskState is not None and taskState.canceled: return
+			ids=merged.get(term)
+			if ids is None: ids=merged[term]=array.array("I")
+			ids.frombytes(blob)
+		#end for
+		con.execute("DELETE FROM postings")
+		con.executemany("INSERT INTO postings(term,ids) VALUES(?,?)",((term,array.array("I",sorted(set(ids)&live)).tobytes()) for term,ids in merged.items()))
+		con.commit()
+		self.log.debug("Compacted full text index (%d rows, %d terms)." % (rows,terms))
+
+	def Query(self,pattern,root):
+		"""
+			pattern で root 以下を検索するときの、 Shortlist を返す。絞り込めない場合は None 。
+			pattern は、コンパイル済みの正規表現か、キーワードごとの必須リテラルを GetLiteralGroups で返すもの(grepEngine.MultiPattern)。複数のキーワードの場合は、どれかにヒットしうるファイルが候補になる。
+		"""
+		if isinstance(pattern,re.Pattern):
+			groups=[regexLiteral.GetRequiredLiterals(pattern.pattern,pattern.flags)]
+		else:
+			groups=pattern.GetLiteralGroups()
+		#end キーワードが複数
+		termGroups=[]
+		for literals in groups:
+			terms=set()
+			for literal in literals:
+				terms|=GetTerms(literal)
+			#end for
+			if not terms: return None#どのファイルにもヒットしうる
+			termGroups.append(terms)
+		#end for
+		if not termGroups: return None
+		con=self._connect()
+		try:
+			files=self._selectFiles(con,root)
+			if not files: return None
+			postings={}#バイグラム→ファイルIDの集合。キーワードの間で使い回す
+			candidates=set()
+			for terms in termGroups:
+				found=None
+				for term in terms:
+					ids=postings.get(term)
+					if ids is None:
+						ids=array.array("I")
+						for blob, in con.execute("SELECT ids FROM postings WHERE term=?",(term,)):
+							ids.frombytes(blob)
+						#end for
+						ids=postings[term]=set(ids)
+					#end 読み込む
+					found=set(ids) if found is None else found&ids
+					if not found: break
+				#end for
+				candidates|=found
+			#end for
+		finally:
+			con.close()
+		#end finally
+		return Shortlist(files,candidates)
+
+class Shortlist(object):
+	"""索引で絞り込んだ、検索が必要なファイルの一覧。"""
+	def __init__(self,files,candidates):
+		self.files=files
+		self.candidates=candidates
+
+	def CanSkip(self,fullpath):
+		"""fullpath を検索しなくてもヒットしないことが、索引から分かるなら True 。"""
+		entry=self.files.get(os.path.normcase(fullpath))
+		if entry is None or not entry[3] or entry[0] in self.candidates: return False
+		try:
+			st=os.stat(fullpath)
+		except OSError:
+			return False
+		#end except
+		return entry[1]==st.st_size and entry[2]==st.st_mtime_ns
+
+	def __len__(self):
+		return len(self.candidates)
@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+#Falcon grep engine
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+ファイル内容検索(grep)の処理本体です。
+テキストの取り出しと照合を、CPUの数に合わせたプロセスプールで並行して行います。
+1ファイル分の結果は、(行番号, プレビュー) のタプルのリストという小さな形で返ってきます。ヒット件数はリストの長さです。GrepItem への変換は、呼び出し側で行ってください。
+textCache を渡すと、ワーカープロセスは取り出したテキストをキャッシュから読み書きし、その結果を親プロセスのキャッシュに記録します。
+プレーンテキストのファイルは、xd2txlib を通さず、ファイルを mmap して bytes のまま検索します(GrepPlainText)。
+プロセスプールが使えない環境では、呼び出したスレッドでそのまま処理します。
+複数のキーワードをまとめて探す場合は、正規表現の代わりに MultiPattern を渡します。結果のタプルには、ヒットしたキーワードのインデックスが加わります。
+全文索引を更新するときは、取り出したテキストから、ついでに索引に入れる情報も作ります。索引を更新するときに、ファイルを読み直さずに済みます。
+"""
+
+import concurrent.futures
+import functools
+import hashlib
+import logging
+import mmap
+import os
+import re
+import threading
+
+from concurrent.futures.process import BrokenProcessPool
+
+import ahoCorasick
+import documentText
+import fullTextIndex
+import regexLiteral
+import textCache
+
+#プレビューとして、ヒットした位置の何文字前から何文字を取り出すか
+PREVIEW_BEFORE=10
+PREVIEW_LENGTH=25
+
+#キーワードファイルから読み込んだ複数のキーワードを、1行で表示するときの区切り
+KEYWORD_SEPARATOR=";"
+
+def SplitKeywords(text):
+	"""1行に1つずつ書いたキーワードを分けて、重複と空のものを除いたリストにする。"""
+	return list(dict.fromkeys(k for k in (k.strip() for k in text.splitlines()) if k))
+
+class MultiPattern(object):
+	"""
+		複数のキーワードを、1回の走査でまとめて探す。大文字と小文字は区別しない。
+		ワイルドカードを含まないキーワードは、1つの Aho-Corasick オートマトンにまとめる。ワイルドカードを含むものは、1つの正規表現にまとめる。
+		ワーカープロセスに渡すときは、キーワードを改行でつないだ文字列と、そのダイジェストだけを送り、オートマトンはワーカープロセスで1回だけ作る。
+		ダイジェストは hash() と違ってプロセスごとに変わらないので、spawn で起動したワーカープロセスでも、同じキーワードなら作り直さない。
+	"""
+	def __init__(self,keywords):
+		self.keywords=list(keywords)
+		self.source="\n".join(self.keywords)
+		self.token=_digest(self.source)
+		literals=[]
+		wildcards=[]
+		for i,keyword in enumerate(self.keywords):
+			if "*" in keyword or "?" in keyword:
+				wildcards.append(i)
+				literals.append("")
+			else:
+				literals.append(keyword.lower())
+			#end ワイルドカード
+		#end for
+		self.automaton=ahoCorasick.Automaton(literals)
+		self.wildcards=wildcards
+		if wildcards:
+			self.regex=re.compile("|".join("(%s)" % re.escape(self.keywords[i]).replace(r"\*",".*").replace(r"\?",".") for i in wildcards),re.IGNORECASE)
+		else:
+			self.regex=None
+		#end ワイルドカード
+
+	def __reduce__(self):
+		return _loadMultiPattern,(self.token,self.source)
+
+	def __repr__(self):
+		return "<MultiPattern %d keywords>" % len(self.keywords)
+
+	def GetLiteralGroups(self):
+		"""キーワードごとに、ヒットする文字列が必ず含む文字列のタプルを返す。"""
+		return [tuple(l for l in re.split(r"[*?]",keyword) if l) for keyword in self.keywords]
+
+	def Search(self,line):
+		"""line で最初にヒットしたキーワードの (開始位置, インデックス) を返す。なければ None 。"""
+		ret=self.automaton.Search(line.lower())
+		if self.regex is not None:
+			m=self.regex.search(line)
+			if m:
+				hit=(m.start(),self.wildcards[m.lastindex-1])
+				if ret is None or hit<ret: ret=hit
+			#end ヒット
+		#end ワイルドカード
+		return ret
+
+	def MatchLines(self,text):
+		"""
+			MatchLines と同じだが、(行番号, プレビュー, キーワードのインデックス) のリストを返す。
+			テキスト全体を小文字にして、行に分けずに走査する。ヒットしたら、その行の残りは読み飛ばす。
+		"""
+		lowered=text.lower()
+		if len(lowered)!=len(text): return self._matchLinesByLine(text)#小文字にすると長さが変わる文字があり、位置がずれる
+		ret=[]
+		ln=1
+		counted=0#ここより前の改行は、ln に数えた
+		pos=0
+		size=len(text)
+		noHit=(size+1,-1)
+		literalHit=wildcardHit=(-1,-1)#pos より前なら、探し直す
+		while True:
+			if literalHit[0]<pos: literalHit=self.automaton.Search(lowered,pos) or noHit
+			if wildcardHit[0]<pos:
+				m=self.regex.search(text,pos) if self.regex is not None else None
+				wildcardHit=(m.start(),self.wildcards[m.lastindex-1]) if m else noHit
+			#end ワイルドカード
+			start,index=min(literalHit,wildcardHit)
+			if index<0: break
+			ln+=text.count("\n",counted,start)
+			counted=start
+			lineStart=text.rfind("\n",0,start)+1
+			lineEnd=text.find("\n",start)
+			if lineEnd<0: lineEnd=size
+			previewStart=max(lineStart,start-PREVIEW_BEFORE)
+			ret.append((ln,text[previewStart:min(lineEnd,previewStart+PREVIEW_LENGTH)],index))
+			pos=lineEnd+1#1行につき1件
+		#end while
+		return ret
+
+	def _matchLinesByLine(self,text):
+		ret=[]
+		ln=1
+		search=self.Search
+		for line in text.split("\n"):
+			hit=search(line)
+			if hit:
+				start=max(0,hit[0]-PREVIEW_BEFORE)
+				ret.append((ln,line[start:start+PREVIEW_LENGTH],hit[1]))
+			#end ヒット
+			ln+=1
+		#end for
+		return ret
+
+#ワーカープロセスで、最後に使った MultiPattern
+_multiPattern=None
+
+def _loadMultiPattern(token,source):
+	global _multiPattern
+	if _multiPattern is None or _multiPattern.token!=token: _multiPattern=MultiPattern(source.split("\n"))
+	return _multiPattern
+
+def _digest(source):
+	"""キーワードをつないだ文字列から、プロセスをまたいでも変わらない識別子を作る。"""
+	return hashlib.sha1(source.encode("UTF-8","surrogatepass")).hexdigest()
+
+def MatchLines(text,pattern):
+	"""text を行ごとに pattern で検索し、ヒットした行の (行番号, プレビュー) のリストを返す。行番号は1から。"""
+	if isinstance(pattern,MultiPattern): return pattern.MatchLines(text)
+	ret=[]
+	ln=1
+	for line in text.split("\n"):
+		m=pattern.search(line)
+		if m:
+			start=max(0,m.start()-PREVIEW_BEFORE)
+			ret.append((ln,line[start:start+PREVIEW_LENGTH]))
+		#end ヒット
+		ln+=1
+	#end for
+	return ret
+
+#改行を数えたり、大文字と小文字を同一視して探したりするときに、一度に切り出すバイト数
+BLOCK_SIZE=1024*1024
+
+def GrepPlainText(path,pattern):
+	"""
+		プレーンテキストのファイルを検索して、ヒットした行の (行番号, プレビュー) のリストを返す。結果は MatchLines と同じ。
+		ファイルを mmap し、pattern が必ず含む文字列(必須リテラル)を bytes のまま探して、見つかった行だけをデコードして pattern で確かめる。
+		必須リテラルがない場合や、UTF-16 のファイルは、全体をデコードして MatchLines で検索する。
+	"""
+	return _grepPlainText(path,pattern)[0]
+
+def _grepPlainText(path,pattern,index=None):
+	"""GrepPlainText と同じだが、 (ヒットのリスト, 全文索引に入れる情報か None) を返す。index は GrepFile と同じ。"""
+	with open(path,"rb") as f:
+		st=os.fstat(f.fileno())
+		try:
+			buf=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+		except ValueError:#空のファイル
+			return [],fullTextIndex.MakeEntry(path,"",index[0],st) if _needsIndex(index,st) else None
+		#end except
+	#end with
+	with buf:
+		encoding,offset=documentText.DetectEncoding(buf[:documentText.DETECT_SIZE])
+		entry=None
+		if _needsIndex(index,st): entry=fullTextIndex.MakeEntry(path,buf[offset:offset+(index[0]+1)*4].decode(encoding,"replace").replace("\r\n","\n"),index[0],st)#索引に入らないほど長いことが分かる分だけ使う
+		literal=_getLiteral(pattern.pattern,pattern.flags,encoding) if not isinstance(pattern,MultiPattern) else None
+		if literal is None: return MatchLines(buf[offset:].decode(encoding,"replace").replace("\r\n","\n"),pattern),entry
+		return _matchBytes(buf,offset,encoding,literal,pattern.flags&re.IGNORECASE,pattern),entry
+	#end with
+
+def _needsIndex(index,st):
+	"""GrepFile の index と、今の os.stat の結果 st を比べて、全文索引に入れ直す必要があるかどうかを返す。"""
+	return index is not None and (index[1],index[2])!=(st.st_size,st.st_mtime_ns)
+
+def _matchBytes(buf,offset,encoding,literal,ignoreCase,pattern):
+	"""buf の中で literal が見つかった行を、デコードして pattern で検索する。encoding は、改行が b"\n" で表されるものに限る。"""
+	ret=[]
+	ln=1
+	counted=offset#ここより前の改行は、ln に数えた。常に行の先頭を指す
+	pos=offset
+	size=len(buf)
+	for found in _iterLiteral(buf,literal,offset,ignoreCase):
+		if found<pos: continue#ヒット済みの行
+		start=buf.rfind(b"\n",counted,found)
+		start=counted if start<0 else start+1
+		ln+=_countLines(buf,counted,start)
+		counted=start
+		end=buf.find(b"\n",found+len(literal))
+		if end<0: end=size
+		line=buf[start:end].decode(encoding,"replace").rstrip("\r")
+		hit=pattern.search(line)
+		if hit:
+			previewStart=max(0,hit.start()-PREVIEW_BEFORE)
+			ret.append((ln,line[previewStart:previewStart+PREVIEW_LENGTH]))
+		#end ヒット
+		pos=end+1#1行につき1件
+	#end for
+	return ret
+
+def _iterLiteral(buf,literal,start,ignoreCase):
+	"""
+		buf の start から後で、 literal が現れる位置を順に返す。
+		ignoreCase のときは、 literal は小文字にしておくこと。buf を少しずつ切り出して小文字にしてから探す。re.IGNORECASE の bytes の正規表現より、ずっと速い。
+	"""
+	if not ignoreCase:
+		found=buf.find(literal,start)
+		while found>=0:
+			yield found
+			found=buf.find(literal,found+1)
+		#end while
+		return
+	#end 大文字と小文字を区別する
+	size=len(buf)
+	overlap=len(literal)-1#ブロックの境目をまたいで現れるもの
+	while start<size:
+		blockEnd=min(size,start+BLOCK_SIZE)
+		block=buf[start:blockEnd+overlap].lower()
+		found=block.find(literal)
+		while 0<=found<blockEnd-start:
+			yield start+found
+			found=block.find(literal,found+1)
+		#end while
+		start=blockEnd
+	#end while
+
+def _countLines(buf,start,end):
+	"""buf[start:end] に含まれる改行の数を返す。大きなファイルでもメモリを使いすぎないように、少しずつ切り出して数える。"""
+	n=0
+	while start<end:
+		block=min(end,start+BLOCK_SIZE)
+		n+=buf[start:block].count(b"\n")
+		start=block
+	#end while
+	return n
+
+@functools.lru_cache(maxsize=64)
+def _getLiteral(source,flags,encoding):
+	"""
+		source の正規表現の必須リテラルを、encoding の bytes にして返す。使えない場合は None 。
+		IGNORECASE のときは、bytes のまま大文字と小文字を同一視できる、ASCIIの文字と大文字小文字のない文字だけを使い、小文字にして返す。
+	"""
+	if encoding.startswith("UTF-16"): return None#改行が b"\n" 1バイトではない
+	best=regexLiteral.GetRequiredLiteral(source,flags,True)
+	if not best: return None
+	try:
+		literal=best.encode(encoding)
+	except UnicodeEncodeError:
+		return None
+	#end except
+	return literal.lower() if flags&re.IGNORECASE else literal
+
+#ワーカープロセスで使うテキストキャッシュ。読み書きだけを行う
+_textCache=None
+
+def _initWorker(cacheDirectory,cacheMaxBytes):
+	"""ワーカープロセスの初期化。"""
+	global _textCache
+	if cacheDirectory is not None: _textCache=textCache.TextCache(cacheDirectory,cacheMaxBytes)
+
+def GrepFile(path,pattern,plainText=False,index=None):
+	"""
+		path のファイルを検索して、(ヒットした行の (行番号, プレビュー) のリスト, キャッシュの結果, 全文索引に入れる情報) を返す。ワーカープロセスで実行される。
+		キャッシュの結果は、 TextCache.Record に渡す引数のタプル。キャッシュを使わなかった場合は None 。
+		plainText=True なら、プレーンテキストとして直接読む。
+		全文索引を更新する場合は、 index に (索引に入れる最大文字数, 索引にあるサイズ, 索引にある更新日時) を渡す。索引にないファイルなら、サイズと更新日時は None 。
+		ファイルが索引を作ったときから変わっていれば、取り出したテキストから fullTextIndex.MakeEntry で作った情報を返す。それ以外は None 。
+	"""
+	if plainText:
+		hits,entry=_grepPlainText(path,pattern,index)
+		return hits,None,entry
+	#end プレーンテキスト
+	st=os.stat(path) if index is not None else None#取り出している間に変わった場合は、索引を更新するときに入れ直す
+	cached=None
+	if _textCache is None:
+		text=documentText.ExtractText(path)
+	else:
+		name,text=_textCache.Load(path)
+		if text is not None:
+			cached=(name,True)
+		else:
+			text=documentText.ExtractText(path)
+			name,size=_textCache.Store(path,text)
+			cached=(name,False,size)
+		#end キャッシュにあるかどうか
+	#end キャッシュを使う
+	entry=fullTextIndex.MakeEntry(path,text,index[0],st) if _needsIndex(index,st) else None
+	return MatchLines(text,pattern),cached,entry
+
+class GrepEngine(object):
+	"""ファイル単位の検索を、プロセスプールに投げる。"""
+	def __init__(self,processes=0,textCache=None):
+		self.log=logging.getLogger("falcon.grepEngine")
+		self.processes=processes if processes>0 else (os.cpu_count() or 1)
+		self.textCache=textCache
+		self.executor=None
+		self.disabled=False		#プールを作れなかったので、呼び出し元のスレッドで処理する
+		self.lock=threading.Lock()
+
+	def GetWindowSize(self):
+		"""同時に投げておくとよいファイル数。"""
+		return self.processes*4
+
+	def Submit(self,path,pattern,plainText=False,index=None):
+		"""
+			path の検索を投げて、 concurrent.futures.Future を返す。結果は Result で受け取る。plainText=True なら、プレーンテキストとして直接読む。
+			index を渡すと、全文索引に入れる情報も作る。index については GrepFile を参照。
+		"""
+		executor=self._getExecutor()
+		if executor is not None:
+			try:
+				return executor.submit(GrepFile,path,pattern,plainText,index)
+			except (BrokenProcessPool,RuntimeError) as err:
+				self.log.error("Cannot submit to the grep process pool (%s)." % err)
+				self._reset(executor)
+			#end except
+		#end プールがある
+		future=concurrent.futures.Future()
+		try:
+			if self.textCache is not None and not plainText:
+				st=os.stat(path) if index is not None else None
+				text=self.textCache.GetText(path,documentText.ExtractText)
+				future.set_result((MatchLines(text,pattern),None,fullTextIndex.MakeEntry(path,text,index[0],st) if _needsIndex(index,st) else None))
+			else:
+				future.set_result(GrepFile(path,pattern,plainText,index))
+			#end キャッシュを使う
+		except Exception as err:
+			future.set_exception(err)
+		#end except
+		return future
+
+	def Result(self,future,timeout=None,entries=None):
+		"""
+			Submit で投げた検索の結果を返す。timeout 秒たっても終わらなければ、concurrent.futures.TimeoutError を送出する。
+			ファイルが読めなかったなど、検索に失敗した場合は、ヒットなしとして扱う。
+			entries にリストを渡すと、全文索引に入れる情報が返ってきていれば、それを追加する。
+		"""
+		try:
+			hits,cached,entry=future.result(timeout)
+		except concurrent.futures.TimeoutError:
+			raise
+		except BrokenProcessPool as err:#ワーカープロセスが落ちた
+			self.log.error("Grep worker process terminated unexpectedly (%s)." % err)
+			self._reset(self.executor)
+			return []
+		except Exception as err:
+			self.log.debug("Grep failed (%s)." % err)
+			return []
+		#end except
+		if cached is not None and self.textCache is not None: self.textCache.Record(*cached)
+		if entry is not None and entries is not None: entries.append(entry)
+		return hits
+
+	def _getExecutor(self):
+		with self.lock:
+			if self.executor is None and not self.disabled:
+				try:
+					if self.textCache is not None:
+						initargs=(self.textCache.directory,self.textCache.maxBytes)
+					else:
+						initargs=(None,0)
+					#end キャッシュ
+					self.executor=concurrent.futures.ProcessPoolExecutor(self.processes,initializer=_initWorker,initargs=initargs)
+					self.log.debug("Grep process pool started with %d processes." % self.processes)
+				except (OSError,NotImplementedError,ValueError) as err:
+					self.log.error("Cannot start the grep process pool (%s). Falling back to serial grep." % err)
+					self.disabled=True
+				#end except
+			#end プールを作る
+			return self.executor
+		#end lock
+
+	def _reset(self,executor):
+		"""壊れたプールを捨てる。次に Submit したときに作り直す。"""
+		with self.lock:
+			if executor is not None and self.executor is executor:
+				self.executor=None
+				executor.shutdown(wait=False)
+			#end 捨てる
+		#end lock
+
+	def Shutdown(self):
+		"""プロセスプールを終了する。"""
+		with self.lock:
+			if self.executor is not None:
+				self.executor.shutdown(wait=False)
+				self.executor=None
+			#end プールがある
+		#end lock
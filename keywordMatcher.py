@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#Falcon keyword matcher
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+ファイル名検索のキーワードを、パスに当てる関数にします。
+よく使われる形のキーワードは、正規表現を使わずに、小文字にした文字列の比較で判定します。
+・ワイルドカードなし (report) : 部分一致
+・*.txt : 末尾一致
+・report* : 先頭一致
+・*report* : 部分一致
+・report*.docx : 先頭一致かつ末尾一致
+・*.txt;*.docx : 拡張子の集合
+それ以外のワイルドカードは、正規表現に直して判定します。ワイルドカードを含むキーワードは、名前全体に当てます。
+キーワードにパスの区切り文字(\\ か /)が含まれていなければ、パスの最後の部分(ファイル名)だけに当てます。
+正規表現のキーワードは、今までどおりパス全体に当てます。ただし、特別な文字を含まないものは、部分一致として扱います。
+このモジュールは、標準ライブラリだけで動きます。
+"""
+
+import os
+import re
+
+#判定の方法
+STRATEGY_SUBSTRING="substring"
+STRATEGY_PREFIX="prefix"
+STRATEGY_SUFFIX="suffix"
+STRATEGY_PREFIX_SUFFIX="prefixSuffix"
+STRATEGY_EXTENSIONS="extensions"
+STRATEGY_REGEX="regex"
+
+#複数のキーワードの区切り
+SEPARATOR=";"
+#正規表現で、特別な意味を持つ文字
+REGEX_SPECIAL_CHARS=frozenset(".^$*+?{}[]\\|()")
+SIMPLE_EXTENSION_PATTERN=re.compile(r"\*\.([^*?.]+)")
+
+class KeywordMatcher(object):
+	"""キーワードを1つのパスに当てる。Match(パス) でヒットするかどうかを返す。"""
+	def __init__(self,strategy,match,regex,basenameOnly):
+		self.strategy=strategy
+		self.Match=match
+		self.regex=regex				#同じ判定をする正規表現。basenameOnly なら、ファイル名に当てる
+		self.basenameOnly=basenameOnly
+
+	def __repr__(self):
+		return "<KeywordMatcher %s%s>" % (self.strategy," basename" if self.basenameOnly else "")
+
+def Compile(keyword,isRegularExpression):
+	"""keyword から KeywordMatcher を作る。正規表現が間違っている場合は、re.error を送出する。"""
+	if isRegularExpression:
+		regex=re.compile(keyword,re.IGNORECASE)
+		if REGEX_SPECIAL_CHARS.isdisjoint(keyword):#ただの文字列
+			return _makeMatcher(STRATEGY_SUBSTRING,keyword.lower(),regex,False)
+		return KeywordMatcher(STRATEGY_REGEX,regex.search,regex,False)
+	#end 正規表現
+	basenameOnly="\\" not in keyword and "/" not in keyword
+	globs=[g for g in (re.sub(r"\*+","*",g) for g in keyword.split(SEPARATOR)) if g]
+	if not globs: globs=[""]
+	regex=re.compile("|".join(_translate(g) for g in globs),re.IGNORECASE|re.DOTALL)
+	if len(globs)>1:
+		extensions=[SIMPLE_EXTENSION_PATTERN.fullmatch(g) for g in globs]
+		if all(extensions): return _makeMatcher(STRATEGY_EXTENSIONS,frozenset(m.group(1).lower() for m in extensions),regex,basenameOnly)
+		return _makeMatcher(STRATEGY_REGEX,regex,regex,basenameOnly)
+	#end 複数
+	glob=globs[0]
+	if "?" in glob: return _makeMatcher(STRATEGY_REGEX,regex,regex,basenameOnly)
+	parts=glob.lower().split("*")
+	if len(parts)==1: return _makeMatcher(STRATEGY_SUBSTRING,parts[0],regex,basenameOnly)
+	if len(parts)==2:
+		head,tail=parts
+		if not head and not tail: return _makeMatcher(STRATEGY_SUBSTRING,"",regex,basenameOnly)
+		if not head: return _makeMatcher(STRATEGY_SUFFIX,tail,regex,basenameOnly)
+		if not tail: return _makeMatcher(STRATEGY_PREFIX,head,regex,basenameOnly)
+		return _makeMatcher(STRATEGY_PREFIX_SUFFIX,(head,tail),regex,basenameOnly)
+	#end アスタリスク1つ
+	if len(parts)==3 and not parts[0] and not parts[2]: return _makeMatcher(STRATEGY_SUBSTRING,parts[1],regex,basenameOnly)
+	return _makeMatcher(STRATEGY_REGEX,regex,regex,basenameOnly)
+
+def _translate(glob):
+	"""ワイルドカードを、名前全体に当てる正規表現にする。ワイルドカードがなければ部分一致。"""
+	if "*" not in glob and "?" not in glob: return re.escape(glob)
+	return "\\A"+"".join(".*" if c=="*" else "." if c=="?" else re.escape(c) for c in glob)+"\\Z"
+
+def _makeMatcher(strategy,value,regex,basenameOnly):
+	"""判定の方法ごとに、できるだけ速い関数を作る。"""
+	sep=os.sep
+	if strategy==STRATEGY_REGEX:
+		search=value.search
+		if basenameOnly:
+			match=lambda path: search(path.rpartition(sep)[2]) is not None
+		else:
+			match=lambda path: search(path) is not None
+		#end ファイル名だけか
+		return KeywordMatcher(strategy,match,regex,basenameOnly)
+	#end 正規表現
+	if basenameOnly:
+		if strategy==STRATEGY_SUBSTRING:
+			match=lambda path: value in path.rpartition(sep)[2].lower()
+		elif strategy==STRATEGY_PREFIX:
+			match=lambda path: path.rpartition(sep)[2].lower().startswith(value)
+		elif strategy==STRATEGY_SUFFIX:
+			match=lambda path: path.lower().endswith(value)#value は区切り文字を含まないので、パス全体の末尾で判定できる
+		elif strategy==STRATEGY_PREFIX_SUFFIX:
+			head,tail=value
+			def match(path):
+				name=path.rpartition(sep)[2].lower()
+				return len(name)>=len(head)+len(tail) and name.startswith(head) and name.endswith(tail)
+			#end match
+		else:#拡張子
+			def match(path):
+				name,dot,ext=path.rpartition(sep)[2].rpartition(".")
+				return dot!="" and ext.lower() in value
+			#end match
+		#end 判定の方法
+	else:
+		if strategy==STRATEGY_SUBSTRING:
+			match=lambda path: value in path.lower()
+		elif strategy==STRATEGY_PREFIX:
+			match=lambda path: path.lower().startswith(value)
+		elif strategy==STRATEGY_SUFFIX:
+			match=lambda path: path.lower().endswith(value)
+		elif strategy==STRATEGY_PREFIX_SUFFIX:
+			head,tail=value
+			def match(path):
+				path=path.lower()
+				return len(path)>=len(head)+len(tail) and path.startswith(head) and path.endswith(tail)
+			#end match
+		else:#拡張子
+			def match(path):
+				name,dot,ext=path.rpartition(".")
+				return dot!="" and ext.lower() in value
+			#end match
+		#end 判定の方法
+	#end ファイル名だけか
+	return KeywordMatcher(strategy,match,regex,basenameOnly)
@@ -11,4 +11,5 @@ from lists.searchResult import *
 from lists.grepResult import *
 from lists.networkResource import *
 from lists.pastProgress import *
+from lists.sizeReport import *
 from lists.constants import *
@@ -22,22 +22,90 @@ class FalconListBase(object):
 		self.sortDescending=globalVars.app.config.getint(self.__class__.__name__,"descending",0)
 		self.lists=[]		#内部のアイテムを保持するリストを表示順に格納
 		self.columns={}
+		self.searchColumnAttributes={0:"basename"}	#Search で、カラム番号→比較する要素の属性名
+		self._index=None		#要素・名前・パスから位置を引く索引。_getIndex で作る
+		self._indexedLengths=[]
+		self._offsets=[]
+		self.sortKeyCache={}	#ソートの種類→{browsableObject: ソートキー}。カラムを切り替えるたびにキーを作り直さないようにする
 
 	#indexで指定した列が文字列searchに一致する行の行インデックスを返す
 	def Search(self,search,index=0):
-		"""文字列からインデックス番号に変換する。"""
-		lst=self.GetItems()
-		found=-1
+		"""文字列からインデックス番号に変換する。索引のある列(searchColumnAttributes)なら、索引から引く。"""
+		attribute=self.searchColumnAttributes.get(index)
+		if attribute=="basename":
+			return self.GetIndexByName(search)
+		if attribute=="fullpath":
+			return self.GetIndexByPath(search)
 		i=0
-		for elem in lst:
-			if elem[index]==search:
-				return i
-			#end 検索
-			i+=1
+		for l in self.lists:
+			for elem in l:
+				if attribute is not None:
+					value=getattr(elem,attribute)
+				else:
+					value=elem.GetListTuple()[index]
+				if value==search:
+					return i
+				#end 検索
+				i+=1
+			#end for
 		#end for
 		#見つからない場合
 		return -1
 
+	def GetIndexByName(self,basename):
+		"""ファイル名が basename に一致する最初の項目のインデックスを返す。なければ-1。"""
+		return self._lookup(self._getIndex()["basename"].get(basename))
+
+	def GetIndexByPath(self,fullpath):
+		"""フルパスが fullpath に一致する最初の項目のインデックスを返す。なければ-1。"""
+		return self._lookup(self._getIndex()["fullpath"].get(fullpath))
+
+	def _lookup(self,position):
+		"""索引に入っている (何番目のリストか, リスト内の位置) を、全体でのインデックスに変換する。"""
+		if position is None: return -1
+		return self._offsets[position[0]]+position[1]
+
+	def InvalidateIndex(self):
+		"""索引を捨てる。self.lists の中身を消したり、並べ替えたり、要素の名前を変えたりしたときに呼ぶ。末尾への追加だけなら、呼ばなくても次に引くときに反映される。"""
+		self._index=None
+
+	def _getIndex(self):
+		"""
+			要素・ファイル名・フルパスから位置を引くための索引を返す。
+			位置は、(何番目のリストか, リスト内の位置) で持っておく。こうすると、前のリストに追加されても後ろのリストの分を直さなくてよい。
+			各リストの長さを覚えておき、伸びていたら伸びた分だけ索引に加える。縮んでいたら作り直す。
+		"""
+		lengths=[len(l) for l in self.lists]
+		if self._index is None or len(lengths)!=len(self._indexedLengths) or any(n<m for n,m in zip(lengths,self._indexedLengths)):
+			self._index={"element": {}, "basename": {}, "fullpath": {}}
+			self._indexedLengths=[0]*len(lengths)
+		#end 作り直す
+		if lengths!=self._indexedLengths:
+			for k,l in enumerate(self.lists):
+				for i in range(self._indexedLengths[k],lengths[k]):
+					self._addToIndex(l[i],(k,i))
+				#end 追加された分
+			#end for
+			self._indexedLengths=lengths
+			self._offsets=[]
+			offset=0
+			for n in lengths:
+				self._offsets.append(offset)
+				offset+=n
+			#end 各リストの先頭位置
+		#end 変化があった
+		return self._index
+
+	def _addToIndex(self,elem,position):
+		self._index["element"][elem]=position
+		for key in ("basename","fullpath"):
+			value=getattr(elem,key,None)
+			if value is None: continue
+			current=self._index[key].get(value)
+			if current is None or position<current:#同じ名前が複数あれば、前にあるほうを返す
+				self._index[key][value]=position
+		#end for
+
 	def GetSortCursor(self):
 		return self.sortCursor
 
@@ -77,11 +145,76 @@ class FalconListBase(object):
 		"""指定した要素で、リストを並べ替える。"""
 		self.log.debug("Begin sorting (attrib %s, descending %s)" % (attrib, descending))
 		t=misc.Timer()
-		f=self._getSortFunction(attrib)
+		f=self._getCachedSortFunction(attrib)
 		for l in self.lists:
 			l.sort(key=f, reverse=(descending==1))
+		self.InvalidateIndex()#位置が変わったので、索引は作り直す
 		self.log.debug("Finished sorting (%f seconds)" % t.elapsed)
 
+	def _getCachedSortFunction(self,attrib):
+		"""_getSortFunction の結果を、要素ごとに覚えておくようにしたものを返す。"""
+		f=self._getSortFunction(attrib)
+		cache=self.sortKeyCache.get(attrib)
+		if cache is None or len(cache)>len(self)*2:#要素が入れ替わって、古いキーが溜まってきたら作り直す
+			cache={}
+			self.sortKeyCache[attrib]=cache
+		#end キャッシュを作る
+		def key(elem):
+			try:
+				return cache[elem]
+			except KeyError:
+				k=f(elem)
+				cache[elem]=k
+				return k
+			#end except
+		return key
+
+	def _findSortedPosition(self,l,elem,insert=False):
+		"""
+			現在の並び順で並んでいるリスト l の中で、elem の位置を二分探索で求める。
+			insert=True なら、elem を挿入すべき位置を返す。そうでなければ、elem が入っている位置を返し、見つからなければ-1を返す。
+		"""
+		if len(self.supportedSorts)==0:
+			if insert: return len(l)
+			return _indexOf(l,elem)
+		#end ソートしないリスト
+		f=self._getCachedSortFunction(self.supportedSorts[self.sortCursor])
+		descending=self.sortDescending==1
+		key=f(elem)
+		lo=0
+		hi=len(l)
+		while lo<hi:
+			mid=(lo+hi)//2
+			k=f(l[mid])
+			if k==key:
+				before=insert
+			elif descending:
+				before=k>key
+			else:
+				before=k<key
+			#end 比較
+			if before:
+				lo=mid+1
+			else:
+				hi=mid
+		#end while
+		if insert: return lo
+		while lo<len(l) and f(l[lo])==key:
+			if l[lo] is elem: return lo
+			lo+=1
+		#end 同じキーのものを順に見る
+		return _indexOf(l,elem)#並び順が崩れていた
+
+	def InvalidateSortKey(self,elem=None):
+		"""名前やサイズが変わった要素の、覚えているソートキーを捨てる。elem を省略すると全て捨てる。"""
+		if elem is None:
+			self.sortKeyCache.clear()
+			return
+		#end 全て
+		for cache in self.sortKeyCache.values():
+			cache.pop(elem,None)
+		#end for
+
 	def GetSupportedSorts(self):
 		"""サポートされているソートのタイプを取得する。"""
 		return self.supportedSorts
@@ -142,13 +275,7 @@ class FalconListBase(object):
 
 	def GetItemIndex(self,item):
 		"""指定されたbrowsableObjectのインデックスを調べる"""
-		beforeListCount=0	#前のリストのアイテム数
-		for l in self.lists:
-			try:
-				return l.index(item)+beforeListCount
-			except ValueError:
-				beforeListCount+=len(l)
-		return -1
+		return self._lookup(self._getIndex()["element"].get(item))
 
 	def GetItemNames(self):
 		"""リストの中身をファイル名のリストで取得する。"""
@@ -187,6 +314,7 @@ class FalconListBase(object):
 		if attrib==SORT_TYPE_HITCOUNT: return lambda x: x.hits
 		if attrib==SORT_TYPE_HITLINE: return lambda x: x.ln
 		if attrib==SORT_TYPE_PREVIEW: return lambda x: x.preview.lower()
+		if attrib==SORT_TYPE_PATTERN: return lambda x: x.pattern.lower()
 
 	def GetColumns(self):
 		"""このリストのカラム情報を返す。"""
@@ -200,3 +328,10 @@ class FalconListBase(object):
 		for l in self.lists:
 			ret+=len(l)
 		return ret
+
+def _indexOf(l,elem):
+	"""l の中で、elem と同一のオブジェクトの位置を返す。なければ-1。"""
+	for i,e in enumerate(l):
+		if e is elem: return i
+	#end for
+	return -1
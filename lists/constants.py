@@ -20,6 +20,7 @@ SORT_TYPE_SEARCHPATH=10
 SORT_TYPE_HITCOUNT=11
 SORT_TYPE_HITLINE=12
 SORT_TYPE_PREVIEW=13
+SORT_TYPE_PATTERN=14
 
 SORT_DESCRIPTIONS=None
 
@@ -44,7 +45,8 @@ def GetSortDescription(attrib):
 			SORT_TYPE_SEARCHPATH: _("検索パス"),
 			SORT_TYPE_HITLINE: _("行"),
 			SORT_TYPE_HITCOUNT: _("ヒット"),
-			SORT_TYPE_PREVIEW: _("プレビュー")
+			SORT_TYPE_PREVIEW: _("プレビュー"),
+			SORT_TYPE_PATTERN: _("キーワード")
 		}
 	#end 辞書作る
 	return SORT_DESCRIPTIONS[attrib]
@@ -36,6 +36,7 @@ class DriveList(FalconListBase):
 		self.unusableDrives=[]
 		self.networkResources=[]
 		self.lists=[self.drives,self.unusableDrives,self.networkResources]
+		self.searchColumnAttributes={0:"basename",1:"letter"}
 
 	def Update(self):
 		return self.Initialize(None,True)
@@ -52,6 +53,7 @@ class DriveList(FalconListBase):
 		self.drives.clear()
 		self.unusableDrives.clear()
 		self.networkResources.clear()
+		self.InvalidateIndex()
 		if not silent:
 			globalVars.app.say(_("ドライブ洗濯"))
 		drv=win32api.GetLogicalDrives()
@@ -109,6 +111,7 @@ def GetDriveObject(index):
 		pass
 	#エラーは無視
 	d=browsableObjects.Drive()
-	ret, shfileinfo=shell.SHGetFileInfo(letter+":\\",0,shellcon.SHGFI_ICON)
-	d.Initialize(letter,f,t,type,n,shfileinfo[0])
+	#メディアの入れ替えでアイコンが変わるので、種類とラベルもキーに含める
+	hIcon=globalVars.app.filetypes_cach.GetIcon(path,"%s|%d|%s" % (path,type,n))
+	d.Initialize(letter,f,t,type,n,hIcon)
 	return d
@@ -10,10 +10,12 @@ import win32api
 import win32file
 import pywintypes
 import constants
+import directoryEnumerator
 import misc
 import browsableObjects
 import globalVars
 import errorCodes
+
 from win32com.shell import shell, shellcon
 
 from simpleDialog import *
@@ -48,6 +50,8 @@ class FileList(FileListBase):
 		#end copy
 		self.files.clear()
 		self.folders.clear()
+		self.InvalidateSortKey()
+		self.InvalidateIndex()
 		dir_spl=dir[len(os.path.splitdrive(dir)[0])+1:].split("\\")
 		level=len(dir_spl)
 		if dir_spl[0]=="":level-=1
@@ -67,35 +71,27 @@ class FileList(FileListBase):
 		self.rootDirectory=dir
 		self.log.debug("Getting file list for %s..." % self.rootDirectory)
 		t=misc.Timer()
+		enumerator=directoryEnumerator.GetEnumerator()
+		typeCache=globalVars.app.filetypes_cach
 		try:
-			lst=win32api.FindFiles(os.path.join(dir,"*"))
-		except pywintypes.error as err:
+			for entry in enumerator.Iterate(dir):
+				if entry.IsDirectory():
+					self.folders.append(self._makeElement(entry))
+				else:
+					self.files.append(self._makeElement(entry))
+				#end どっちについかするか？
+			#end 追加ループ
+		except directoryEnumerator.EnumerationError as err:
 			self.log.error("Cannot open the directory! {0}".format(err))
+			self.files.clear()
+			self.folders.clear()
 			if err.winerror==5:
 				return errorCodes.ACCESS_DENIED
 			dialog(_("エラー"), _("フォルダを開くことができませんでした(%(error)s)") % {"error": str(err)})
 			return errorCodes.FATAL
 		#end except
-		if len(lst)==0:
-			self.log.debug("Blank folder.")
-			return errorCodes.OK
-		#end 空のフォルダだったらさっさと帰る
-		for elem in lst:
-			if elem[8]=="." or elem[8]=="..":
-				continue
-			fullpath=os.path.join(dir,elem[8])
-			ret, shfileinfo=shell.SHGetFileInfo(fullpath,0,shellcon.SHGFI_ICON | shellcon.SHGFI_TYPENAME)
-			if os.path.isfile(fullpath):
-				f=browsableObjects.File()
-				f.Initialize(dir,elem[8],fullpath,(elem[4]<<32)+elem[5], elem[3], elem[0], shfileinfo[4],elem[1],elem[9],shfileinfo[0])
-				self.files.append(f)
-			else:
-				f=browsableObjects.Folder()
-				f.Initialize(dir,elem[8],fullpath,-1,elem[3], elem[0], shfileinfo[4],elem[1],elem[9],shfileinfo[0])
-				self.folders.append(f)
-			#end どっちについかするか？
-		#end 追加ループ
-		self.log.debug("File list created in %f seconds." % t.elapsed)
+		self.log.debug("File list created in %f seconds (%s)." % (t.elapsed,enumerator.name))
+		self.log.debug("File type cache: %(hits)d hits, %(misses)d misses, %(evictions)d evictions, %(entries)d entries" % typeCache.GetStatistics())
 		self.log.debug(str(len(self.folders))+" directories and "+str(len(self.files))+" files found.")
 		if self.sortCursor!=0 or self.sortDescending!=0:
 			self.log.debug("Triggering sorting")
@@ -103,6 +99,103 @@ class FileList(FileListBase):
 		#end ソートが必要ならソート
 		return errorCodes.OK
 
+	def _makeElement(self,entry,f=None):
+		"""DirectoryEntry から、 Folder または File を作る。f を渡すと、新しく作らずにその内容を書き換える。"""
+		fullpath=os.path.join(self.rootDirectory,entry.name)
+		typeString,hIcon=globalVars.app.filetypes_cach.GetTypeInfo(fullpath,entry.attributes)
+		if f is None:
+			f=browsableObjects.Folder() if entry.IsDirectory() else browsableObjects.File()
+		f.Initialize(self.rootDirectory,entry.name,fullpath,entry.size,entry.modDate,entry.attributes,typeString,entry.creationDate,entry.shortName,hIcon)
+		return f
+
+	def Synchronize(self):
+		"""
+			フォルダを列挙し直して、今のリストと違うところだけを反映する。Update と違い、変わっていない項目のオブジェクトはそのまま残る。
+			ApplyChanges と同じ形式で、行った操作を返す。フォルダが開けなければ None を返す。
+		"""
+		entries={}
+		try:
+			for entry in directoryEnumerator.GetEnumerator().Iterate(self.rootDirectory):
+				entries[entry.name]=entry
+			#end for
+		except directoryEnumerator.EnumerationError as err:
+			self.log.error("Cannot synchronize the directory! {0}".format(err))
+			return None
+		#end except
+		names=set()
+		for elem in self:
+			entry=entries.get(elem.basename)
+			if entry is None or not _isSameEntry(elem,entry): names.add(elem.basename)
+		#end 削除・変更
+		for name in entries:
+			if self.GetIndexByName(name)<0: names.add(name)
+		#end 追加
+		return self.ApplyChanges(names,entries)
+
+	def ApplyChanges(self,names,entries=None):
+		"""
+			names で指定された名前の項目を、今のファイルシステムの状態に合わせる。変わっていなければ何もしない。
+			entries に名前→DirectoryEntry の辞書を渡すと、問い合わせる代わりにそれを使い、含まれていない名前は存在しないものとして扱う。
+			並び順は保ったまま、該当する項目だけを削除・挿入する。変更された項目は、同じオブジェクトのまま、新しい位置に入れ直す。
+			行った操作を、("remove", インデックス, 要素) または ("insert", インデックス, 要素) のリストで返す。インデックスは、前から順に操作を適用したときのもの。
+		"""
+		enumerator=directoryEnumerator.GetEnumerator()
+		#先に、ファイルシステム上の状態と、リスト上の要素を全部調べておく。リストを書き換え始めると、索引が使えなくなるため
+		found={}
+		for name in names:
+			if entries is not None:
+				entry=entries.get(name)
+			else:
+				entry=enumerator.GetEntry(os.path.join(self.rootDirectory,name))
+			#end 問い合わせ
+			found[name]=None
+			if entry is None: continue
+			found[entry.name]=entry#大文字小文字だけ変わった場合、新しい名前のほうで見つかる
+		#end for
+		current={}
+		for name in found:
+			i=self.GetIndexByName(name)
+			if i>=0: current[name]=self.GetElement(i)
+		#end for
+
+		ops=[]
+		for name,entry in found.items():
+			elem=current.get(name)
+			if elem is not None:
+				if entry is not None and entry.IsDirectory()==isinstance(elem,browsableObjects.Folder) and _isSameEntry(elem,entry): continue
+				i=self._removeElement(elem)
+				if i>=0: ops.append(("remove",i,elem))
+				if entry is None or entry.IsDirectory()!=isinstance(elem,browsableObjects.Folder): elem=None#種類が変わったものは作り直す
+			#end 今ある要素
+			if entry is None: continue
+			elem=self._makeElement(entry,elem)
+			self.InvalidateSortKey(elem)
+			ops.append(("insert",self._insertElement(elem),elem))
+		#end for
+		if ops:
+			self.InvalidateIndex()
+			self.log.debug("Applied %d changes to the file list." % len(ops))
+		#end 変更あり
+		return ops
+
+	def _removeElement(self,elem):
+		"""elem をリストから取り除き、取り除く前の位置を返す。見つからなければ何もせずに-1を返す。"""
+		l=self.folders if isinstance(elem,browsableObjects.Folder) else self.files
+		i=self._findSortedPosition(l,elem)#二分探索で見つからなければ、総当たりで探している
+		if i<0:
+			self.log.warning("Element to remove was not found in the file list: %s" % elem.basename)
+			return -1
+		#end 見つからない
+		del l[i]
+		return i if l is self.folders else i+len(self.folders)
+
+	def _insertElement(self,elem):
+		"""elem を並び順に合った位置に入れ、その位置を返す。"""
+		l=self.folders if isinstance(elem,browsableObjects.Folder) else self.files
+		i=self._findSortedPosition(l,elem,True)
+		l.insert(i,elem)
+		return i if l is self.folders else i+len(self.folders)
+
 	def _copyFromList(self,lst):
 		self.log.debug("Copying from file list...")
 		for elem in lst:
@@ -123,3 +216,8 @@ class FileList(FileListBase):
 
 	def GetFolderFileNumber(self):
 		return len(self.folders), len(self.files)
+
+def _isSameEntry(elem,entry):
+	"""リスト上の要素と、列挙で得た項目が、同じ状態かどうかを調べる。フォルダのサイズは容量計算で変わるので比べない。"""
+	if elem.attributes!=entry.attributes or elem.modDate!=entry.modDate: return False
+	return entry.IsDirectory() or elem.size==entry.size
@@ -4,22 +4,35 @@
 #Copyright (C) 2019-2020 yamahubuki <itiro.ishino@gmail.com>
 #Note: All comments except these top lines will be written in Japanese. 
 
+import collections
+import concurrent.futures
 import os
 import re
 import wx
 
 import browsableObjects
 import errorCodes
+import globalVars
+import grepEngine
 import misc
+import workerThreads
+import workerThreadTasks
 
 from .searchResultBase import *
 from .constants import *
 
+#全文索引に入れるために、検索のついでに作った情報を溜めておく上限のバイト数。超えた分は、索引を更新するときに取り出し直す
+PREPARED_INDEX_MAX_BYTES=64*1024*1024
+
 class GrepResultList(SearchResultBase):
 	"""grep検索の結果を扱うリスト。"""
+
+	#最後に始めた全文索引の更新。どのリストでも、次の検索を始めるときに止める
+	latestIndexTask=None
+
 	def __init__(self):
 		super().__init__()
-		self.supportedSorts=[SORT_TYPE_BASENAME,SORT_TYPE_HITLINE,SORT_TYPE_PREVIEW,SORT_TYPE_HITCOUNT,SORT_TYPE_FILESIZE,SORT_TYPE_MODDATE,SORT_TYPE_ATTRIBUTES,SORT_TYPE_TYPESTRING]
+		self.supportedSorts=[SORT_TYPE_BASENAME,SORT_TYPE_HITLINE,SORT_TYPE_PREVIEW,SORT_TYPE_HITCOUNT,SORT_TYPE_FILESIZE,SORT_TYPE_MODDATE,SORT_TYPE_ATTRIBUTES,SORT_TYPE_TYPESTRING,SORT_TYPE_PATTERN]
 		self.columns={
 			_("ファイル名"):wx.LIST_FORMAT_LEFT,
 			_("行"): wx.LIST_FORMAT_RIGHT,
@@ -28,14 +41,16 @@ class GrepResultList(SearchResultBase):
 			_("サイズ"):wx.LIST_FORMAT_RIGHT,
 			_("更新"):wx.LIST_FORMAT_LEFT,
 			_("属性"):wx.LIST_FORMAT_LEFT,
-			_("種類"):wx.LIST_FORMAT_LEFT
+			_("種類"):wx.LIST_FORMAT_LEFT,
+			_("キーワード"):wx.LIST_FORMAT_LEFT
 		}
 		self.results=[]
 		self.lists=[self.results]
+		self.indexTask=None
 
 
-	def Initialize(self,rootDirectory,searches=[],keyword="",isRegularExpression=False,silent=False):
-		"""与えられたファイル名のリストから、条件に一致する項目を抽出する。"""
+	def Initialize(self,rootDirectory,searches=[],keyword="",isRegularExpression=False,silent=False,searchFilter=None):
+		"""与えられたファイル名のリストから、条件に一致する項目を抽出する。searchFilter には、searches をたどるときに使った絞り込み条件を渡す。"""
 		if isinstance(rootDirectory,list):#パラメータがリストなら、browsableObjects のリストとして処理刷る(ファイルリストを取得しないでコピーする)
 			for elem in rootDirectory:
 				self.results.append(elem)
@@ -44,39 +59,171 @@ class GrepResultList(SearchResultBase):
 		self.rootDirectory=rootDirectory
 		self.searches=searches
 		self._initKeyword(keyword,isRegularExpression,silent)
+		self._initFilter(searchFilter)
 		self._initSearch()
 
-	def HitTest(self,path,ret_list):
-		"""_performSearchStepから呼ばれ、与えられたpathのファイルが検索にヒットするならリスト追加する"""
-		if misc.isDocumentExt(path.split(".")[-1]):
+	def HitTest(self,path,ret_list,entry=None):
+		"""_performSearchStepから呼ばれ、与えられたpathのファイルが検索にヒットするならリスト追加する。entry は、パスをたどったときに得た DirectoryEntry 。"""
+		ext=path.split(".")[-1]
+		if misc.isDocumentExt(ext):
 			fullpath=os.path.join(self.rootDirectory,path)
-			content=misc.ExtractText(fullpath).split("\n")
-			fileobj=None#複数ヒットでファイルオブジェクトを生成し続けないようにキャッシュする
-			ln=1
-			hitobjects=[]
-			for	 elem in content:
-				m=re.search(self.keyword,elem)
-				if m:
-					preview_start=max(0,m.start()-10)
-					preview=elem[preview_start:preview_start+25]
-					if not fileobj:
-						fileobj=self._MakeObject(browsableObjects.File,fullpath)
-					obj=browsableObjects.GrepItem()
-					obj.Initialize(ln,preview,fileobj)
-					hitobjects.append(obj)
-				#end ヒット
-				ln+=1
-			#end 行数ごとに検索
-			for elem in hitobjects:
-				hits=len(hitobjects)
-				elem.SetHitCount(hits)
-			#end 最終的なヒットカウントを設定
-			self.results.extend(hitobjects)
-			ret_list.extend(hitobjects)
-			return len(hitobjects)
+			shortlist=self._getShortlist()
+			if shortlist is not None and shortlist.CanSkip(fullpath): return 0#索引から、ヒットしないことが分かる
+			if misc.isPlainTextExt(ext):
+				try:
+					hits=grepEngine.GrepPlainText(fullpath,self.keyword)
+				except OSError:
+					hits=[]
+				#end except
+			else:
+				hits=grepEngine.MatchLines(misc.ExtractText(fullpath),self.keyword)
+			#end プレーンテキスト
+			return self._addHits(fullpath,hits,ret_list,entry)
 		#end 対応している拡張子
 		return 0
 
+	def _initKeyword(self,keyword,isRegularExpression,silent):
+		"""keyword がリスト(キーワードファイルから読み込んだもの)なら、それらをまとめて探す。文字列は、区切り文字を含んでいても1つのキーワードとして扱う。"""
+		if isinstance(keyword,grepEngine.MultiPattern): keyword=keyword.keywords#Update から、前回のものが渡された
+		if not isinstance(keyword,list): return super()._initKeyword(keyword,isRegularExpression,silent)
+		if len(keyword)==1: return super()._initKeyword(keyword[0],False,silent)
+		#複数のキーワードを、まとめて探す
+		keywords=keyword
+		self.keyword_string=grepEngine.KEYWORD_SEPARATOR.join(keywords)
+		self.keyword=grepEngine.MultiPattern(keywords)
+		if not silent: globalVars.app.say(_("%(count)d個のキーワードの検索結果 %(dir)s から") % {'count': len(keywords), 'dir': self.rootDirectory})
+
+	def _addHits(self,fullpath,hits,ret_list,entry=None):
+		"""
+			grepEngine から返ってきた (行番号, プレビュー) のリストを、GrepItem にしてリストに追加する。
+			複数のキーワードで探した場合は、(行番号, プレビュー, キーワードのインデックス) のリスト。
+			entry は、パスをたどったときに得た DirectoryEntry 。
+		"""
+		if not hits: return 0
+		fileobj=self._MakeObject(browsableObjects.File,fullpath,entry)#ファイルオブジェクトは、ヒットした行で共有する
+		if fileobj is None: return 0#検索中に消えた
+		hitobjects=[]
+		for hit in hits:
+			obj=browsableObjects.GrepItem()
+			obj.Initialize(hit[0],hit[1],fileobj,self.keyword.keywords[hit[2]] if len(hit)>2 else self.keyword_string)
+			obj.SetHitCount(len(hits))
+			hitobjects.append(obj)
+		#end for
+		self.results.extend(hitobjects)
+		ret_list.extend(hitobjects)
+		return len(hitobjects)
+
+	def _initSearch(self):
+		self._cancelInflight()
+		if GrepResultList.latestIndexTask is not None: GrepResultList.latestIndexTask.Cancel()#検索とディスクを取り合わないように、前の検索の後の索引の更新を止める
+		super()._initSearch()
+		self.submitted_index=0#インデックスいくつまで、grepEngine に投げたか
+		self.inflight=collections.deque()#投げて、結果を受け取っていないもの。(インデックス, フルパス, future)
+		self.shortlist=None
+		self.shortlistLoaded=False
+		self.indexedFiles=None#全文索引に入っているファイル。索引を更新しないなら None
+		self.prepared=[]#検索のついでに作った、全文索引に入れる情報
+		self.preparedBytes=0
+
+	def _getShortlist(self):
+		"""転置索引で、検索が必要なファイルを絞り込む。最初に呼ばれたときに、ワーカースレッドで問い合わせる。"""
+		if not self.shortlistLoaded:
+			self.shortlistLoaded=True
+			index=globalVars.app.fullTextIndex
+			if index is not None:
+				timer=misc.Timer()
+				self.shortlist=index.Query(self.keyword,self.rootDirectory)
+				if self.shortlist is not None: self.log.debug("Full text index shortlisted %d of %d indexed files in %f seconds." % (len(self.shortlist),len(self.shortlist.files),timer.elapsed))
+				if self.searchFilter is None: self.indexedFiles=self.shortlist.files if self.shortlist is not None else index.GetFiles(self.rootDirectory)
+			#end 索引を使う
+		#end 初回
+		return self.shortlist
+
+	def _getIndexState(self,fullpath):
+		"""fullpath を検索するときに、 grepEngine.GrepFile の index に渡すものを返す。検索のついでに索引に入れる情報を作らない場合は None 。"""
+		if self.indexedFiles is None or self.preparedBytes>=PREPARED_INDEX_MAX_BYTES: return None
+		known=self.indexedFiles.get(os.path.normcase(fullpath))
+		if known is None: return (globalVars.app.fullTextIndex.maxTextLength,None,None)
+		return (globalVars.app.fullTextIndex.maxTextLength,known[1],known[2])
+
+	def _finishSearch(self):
+		super()._finishSearch()
+		if globalVars.app.fullTextIndex is not None and self.searchFilter is None:#今回たどったドキュメントで、索引を更新する。絞り込んでたどった結果は、全てのパスではないので使わない
+			paths=[os.path.join(self.rootDirectory,path) for path in self.searches.paths if misc.isDocumentExt(path.split(".")[-1])]
+			prepared={entry[0]: entry for entry in self.prepared}
+			self.prepared=[]
+			self.indexTask=workerThreads.RegisterMaintenanceTask(workerThreadTasks.UpdateFullTextIndex,{'root': self.rootDirectory,'paths': paths,'prepared': prepared})
+			GrepResultList.latestIndexTask=self.indexTask
+		#end 索引を使う
+
+	def CancelIndexUpdate(self):
+		"""この検索の後に始めた全文索引の更新が、まだ終わっていなければ止める。"""
+		if self.indexTask is not None:
+			self.indexTask.Cancel()
+			self.indexTask=None
+		#end 更新中
+
+	def _cancelInflight(self):
+		"""投げたまま、結果を受け取っていない検索を取り消す。"""
+		for i,fullpath,future in getattr(self,"inflight",()):
+			future.cancel()
+		#end for
+		self.inflight=collections.deque()
+
+	def _performSearchStep(self,taskState,maxHits=100,timeout=0):
+		"""
+			検索を1ステップ実行する。戻り値は SearchResultBase._performSearchStep と同じ。
+			ファイルの検索は grepEngine のプロセスプールに先行して投げておき、結果はパスの順番どおりに受け取る。そのため、プロセス数に関係なく、結果の並び順は毎回同じになる。
+			受け取れる結果がなければ、timeout 秒まで、先頭の結果か、新しいパスが届くのを待つ。
+		"""
+		engine=globalVars.app.grepEngine
+		window=engine.GetWindowSize()
+		shortlist=self._getShortlist()
+		ret_list=[]
+		hit=0
+		waited=False
+		while True:
+			if taskState.canceled:
+				self._cancelInflight()
+				return False, -1#途中でキャンセル
+			#end キャンセル
+			end,finished=self.searches.Read(self.submitted_index,0)
+			paths=self.searches.paths
+			while self.submitted_index<end and len(self.inflight)<window:
+				path=paths[self.submitted_index]
+				ext=path.split(".")[-1]
+				if misc.isDocumentExt(ext):
+					fullpath=os.path.join(self.rootDirectory,path)
+					if shortlist is not None and shortlist.CanSkip(fullpath):#索引から、ヒットしないことが分かる
+						self.submitted_index+=1
+						continue
+					#end 省略
+					self.inflight.append((self.submitted_index,fullpath,engine.Submit(fullpath,self.keyword,misc.isPlainTextExt(ext),self._getIndexState(fullpath))))
+				#end 対応している拡張子
+				self.submitted_index+=1
+			#end 投げる
+			while self.inflight and self.inflight[0][2].done() and hit<maxHits:
+				i,fullpath,future=self.inflight.popleft()
+				received=len(self.prepared)
+				hit+=self._addHits(fullpath,engine.Result(future,entries=self.prepared),ret_list,self.searches.entries[i])
+				for entry in self.prepared[received:]:
+					self.preparedBytes+=len(entry[3])
+				#end for
+			#end 受け取る
+			self.searched_index=self.inflight[0][0] if self.inflight else self.submitted_index
+			if not self.inflight and self.submitted_index>=end and finished:#最後まで検索した
+				self._finishSearch()
+				return True,ret_list
+			#end 検索終了
+			if hit>=maxHits or ret_list or waited or timeout==0: return False,ret_list
+			if self.inflight and (self.submitted_index>=end or len(self.inflight)>=window):
+				concurrent.futures.wait([self.inflight[0][2]],timeout)
+			elif self.submitted_index>=end:
+				self.searches.Read(self.submitted_index,timeout)
+			#end 待つ
+			waited=True
+		#end while
+
 	def _GetJumpKey(self,index):
 		"""
 			デフォルトの先頭文字単位ではなく、見つかったファイル単位で動く
@@ -26,6 +26,7 @@ class NetworkResourceList(FalconListBase):
 		}
 		self.resources=[]
 		self.lists=[self.resources]
+		self.searchColumnAttributes={0:"basename",1:"letter"}
 
 	def Update(self):
 		return self.Initialize(self.rootDirectory,True)
@@ -40,6 +41,7 @@ class NetworkResourceList(FalconListBase):
 			return errorCodes.OK
 		#end copy
 		self.resources.clear()
+		self.InvalidateIndex()
 		if not silent:
 			globalVars.app.say(path[2:])
 
@@ -59,10 +61,10 @@ class NetworkResourceList(FalconListBase):
 			return errorCodes.ACCESS_DENIED
 
 		for l in lst:
-			ret, shfileinfo=shell.SHGetFileInfo(l.lpRemoteName,0,shellcon.SHGFI_ICON)
+			hIcon=globalVars.app.filetypes_cach.GetIcon(l.lpRemoteName)
 			s=browsableObjects.NetworkResource()
 			self.log.debug("network resource found and check IP address:"+l.lpRemoteName[2:])
-			s.Initialize(l.lpRemoteName[len(path)+1:],l.lpRemoteName,"",shfileinfo[0])
+			s.Initialize(l.lpRemoteName[len(path)+1:],l.lpRemoteName,"",hIcon)
 			self.resources.append(s)
 
 		self.log.debug("Network resource list created in %d seconds." % t.elapsed)
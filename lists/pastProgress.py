@@ -29,6 +29,9 @@ class PastProgressList(FalconListBase):
 		self.results=[]
 		self.headers=[]
 		self.lists=[self.headers,self.results]
+		self.searchColumnAttributes={0:"fullpath"}
+		self.rootDirectory=""
+		self.header=None
 
 	def Initialize(self,another_instance=None):
 		"""テストアイテムを作る"""
@@ -45,6 +48,21 @@ class PastProgressList(FalconListBase):
 		self.results.append(self._make(random.randint(0,9999),"エラー","宛先ドライブに十分な空き領域がありません"))
 		self.results.append(self._make(random.randint(0,9999),"エラー","アクセスが拒否されました。"))
 
+	def InitializeOperation(self,source,dest,details):
+		"""source から dest への貼り付けの進捗を表示するために、ヘッダだけを作る。"""
+		self.rootDirectory=dest
+		self.header=browsableObjects.PastProgressHeader()
+		self.header.Initialize(os.path.basename(source),source,_("進行中"),details)
+		self.headers.append(self.header)
+
+	def AddFailure(self,failed):
+		"""処理に失敗した項目 (fileOperator.failedElement.FailedElement) を追加する。"""
+		path=str(failed.elem)
+		msg=failed.msg[1] if isinstance(failed.msg,tuple) else failed.msg
+		o=browsableObjects.PastProgressItem()
+		o.Initialize(os.path.basename(path),path,_("エラー"),str(msg))
+		self.results.append(o)
+
 	def _make(self,p1,p3,p4):
 		o=browsableObjects.PastProgressItem()
 		o.Initialize("test%04d" % (p1),"full\\path\\test%04d" % (p1),p3,p4)
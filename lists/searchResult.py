@@ -9,7 +9,9 @@ import re
 import wx
 import browsableObjects
 import globalVars
+import directoryEnumerator
 import errorCodes
+import keywordMatcher
 
 from .searchResultBase import *
 from .constants import *
@@ -31,8 +33,8 @@ class SearchResultList(SearchResultBase):
 		self.files=[]
 		self.lists=[self.folders,self.files]
 
-	def Initialize(self,rootDirectory,searches=[],keyword="",isRegularExpression=False,silent=False):
-		"""与えられたファイル名のリストから、条件に一致する項目を抽出する。"""
+	def Initialize(self,rootDirectory,searches=[],keyword="",isRegularExpression=False,silent=False,searchFilter=None):
+		"""与えられたファイル名のリストから、条件に一致する項目を抽出する。searchFilter には、searches をたどるときに使った絞り込み条件を渡す。"""
 		if isinstance(rootDirectory,list):#パラメータがリストなら、browsableObjects のリストとして処理刷る(ファイルリストを取得しないでコピーする)
 			for elem in rootDirectory:
 				if type(elem) is browsableObjects.SearchedFolder:
@@ -45,22 +47,52 @@ class SearchResultList(SearchResultBase):
 		self.rootDirectory=rootDirectory
 		self.searches=searches
 		self._initKeyword(keyword,isRegularExpression,silent)
+		self._initFilter(searchFilter)
 		self._initSearch()
 
-	def HitTest(self,path,ret_list):
-		"""_performSearchStepから呼ばれ、与えられたpathのファイルが検索にヒットするならリスト追加する"""
-		if re.search(self.keyword,path):
-			fullpath=os.path.join(self.rootDirectory,path)
-			if os.path.isfile(fullpath):
-				f=self._MakeObject(browsableObjects.SearchedFile,fullpath)
-				self.files.append(f)
-			else:
-				f=self._MakeObject(browsableObjects.SearchedFolder,fullpath,True)
-				self.folders.append(f)
-			#end ファイルかフォルダか
-			ret_list.append(f)
-			return 1
-		return 0
+	def _initKeyword(self,keyword,isRegularExpression,silent):
+		super()._initKeyword(keyword,isRegularExpression,silent)
+		self.matcher=keywordMatcher.Compile(keyword,isRegularExpression)#パスに当てるのは、正規表現ではなくこちら
+		self.log.debug("Keyword %s uses %s matching." % (keyword,self.matcher))
+
+	def _initSearch(self):
+		super()._initSearch()
+		self.seededKeys={path.lower() for path in self.searches.paths[:self.searches.seeded]}#ファイル名の索引から得た結果
+		self.seen=set()#索引から得た結果のうち、確かめたもの
+
+	def HitTest(self,path,ret_list,entry=None):
+		"""
+			_performSearchStepから呼ばれ、与えられたpathのファイルが検索にヒットするならリスト追加する
+			entry は、パスをたどったときに得た DirectoryEntry 。これを使って要素を作るので、ファイルシステムには問い合わせない。
+		"""
+		if self.seededKeys:
+			key=path.lower()
+			if key in self.seededKeys:
+				if key in self.seen: return 0#索引から得た結果として、もう確かめた
+				self.seen.add(key)
+			#end 索引から得た結果
+		#end 索引を使っている
+		if not self.matcher.Match(path): return 0
+		fullpath=os.path.join(self.rootDirectory,path)
+		if entry is None:#ファイル名の索引から得たパスには、たどったときの情報がない
+			entry=directoryEnumerator.GetEnumerator().GetEntry(fullpath)
+			if entry is None: return 0#索引が古かった
+			if self.searchFilter is not None and not self.searchFilter.Match(entry): return 0#索引にはパスしかないので、ここで絞り込む
+		#end 問い合わせる
+		if entry.IsDirectory():
+			f=self._MakeObject(browsableObjects.SearchedFolder,fullpath,entry)
+			self.folders.append(f)
+		else:
+			f=self._MakeObject(browsableObjects.SearchedFile,fullpath,entry)
+			self.files.append(f)
+		#end ファイルかフォルダか
+		ret_list.append(f)
+		return 1
+
+	def _finishSearch(self):
+		super()._finishSearch()
+		store=globalVars.app.nameIndexStore
+		if store is not None and self.searchFilter is None: store.SaveInBackground(self.rootDirectory,self.searches.paths[self.searches.seeded:])#たどり直した結果で、索引を作り直す。絞り込んでたどった結果は、全てのパスではないので使わない
 
 	def GetFolderFileNumber(self):
 		return len(self.folders), len(self.files)
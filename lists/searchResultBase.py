@@ -4,13 +4,11 @@
 #Copyright (C) 2019-2020 yamahubuki <itiro.ishino@gmail.com>
 #Note: All comments except these top lines will be written in Japanese. 
 
-import datetime
 import os
 import re
 import wx
-import win32api
-import win32file
 import constants
+import directoryEnumerator
 import globalVars
 
 from win32com.shell import shell, shellcon
@@ -19,38 +17,51 @@ from .fileListBase import *
 
 ESCAPE_PATTERN=re.compile(r"([\\\+\.\{\}\(\)\[\]\^\$\-\|\/])")
 
+def MakeKeywordPattern(keyword,isRegularExpression):
+	"""検索キーワードを、コンパイル済みの正規表現にする。"""
+	#ワイルドカード (アスタリスクとクエスチョン)は、正規表現に置き換えしちゃう
+	if not isRegularExpression:
+		keyword=re.sub(ESCAPE_PATTERN,r"\\\1",keyword)
+		keyword=keyword.replace("*",".*")
+		keyword=keyword.replace("?",".")
+	#end ワイルドカード置き換え
+	return re.compile(keyword,re.IGNORECASE)
+
 class SearchResultBase(FileListBase):
 	def __init__(self):
 		super().__init__()
 
-	def _performSearchStep(self,taskState):
-		"""検索を1ステップ実行する。100県のファイルがヒットするか、リストが終わるまで検索し、終わったら関数から抜ける。途中で EOL に当たったら、検索終了としてTrueを返し、そうでないときにFalseを帰す。また、表示関数に渡しやすいように、今回のステップでヒットした要素のリストも返す。"""
+	def _performSearchStep(self,taskState,maxHits=100,timeout=0):
+		"""
+			検索を1ステップ実行する。maxHits 件以上のファイルがヒットするか、今届いているパスが終わるまで検索し、終わったら関数から抜ける。
+			検索していないパスがまだ届いていなければ、timeout 秒まで届くのを待つ。
+			パスの終わりまで検索したら、検索終了としてTrueを返し、そうでないときにFalseを帰す。また、表示関数に渡しやすいように、今回のステップでヒットした要素のリストも返す。
+		"""
 		ret_list=[]
 		i=self.searched_index
 		hit=0
-		while(True):
+		end,finished=self.searches.Read(i,timeout)
+		paths=self.searches.paths
+		entries=self.searches.entries
+		while(i<end):
 			if taskState.canceled: return False, -1#途中でキャンセル
-			path=self.searches[i]
-			if path=="eol":#EOLで検索終了
-				self.finished=True
-				globalVars.app.PlaySound("complete.ogg")
-				globalVars.app.say(_("検索終了、%(item)d件ヒットしました。") % {'item': len(self)})
-				return True,ret_list
-			#end EOL
-			result=self.HitTest(path,ret_list)
-			hit+=result
-			if hit==100:
-				self.searched_index=i+1#次の位置をキャッシュ
-				break
-			#end 100県ヒット
+			hit+=self.HitTest(paths[i],ret_list,entries[i])
 			i+=1
-			if i>=len(self.searches):#検索は終わってないが、ファイルリスト取得が追いついてない
-				self.searched_index=len(self.searches)
-				break
-			#end リストが追いついてない
+			if hit>=maxHits: break#1ステップ分ヒットした
 		#end 検索ループ
+		self.searched_index=i#次の位置をキャッシュ
+		if i>=end and finished:#最後まで検索した
+			self._finishSearch()
+			return True,ret_list
+		#end 検索終了
 		return False,ret_list
 
+	def _finishSearch(self):
+		"""最後まで検索したときに呼ばれる。"""
+		self.finished=True
+		globalVars.app.PlaySound("complete.ogg")
+		globalVars.app.say(_("検索終了、%(item)d件ヒットしました。") % {'item': len(self)})
+
 	def GetFinishedStatus(self):
 		"""
 			workerThreadTaskでの検索処理が終わっているならTrue
@@ -63,47 +74,51 @@ class SearchResultBase(FileListBase):
 
 	def _initKeyword(self,keyword,isRegularExpression,silent):
 		self.keyword_string=keyword
-		#ワイルドカード (アスタリスクとクエスチョン)は、正規表現に置き換えしちゃう
-		if not isRegularExpression:
-			keyword=re.sub(ESCAPE_PATTERN,r"\\\1",keyword)
-			keyword=keyword.replace("*",".*")
-			keyword=keyword.replace("?",".")
-		#end ワイルドカード置き換え
-		self.keyword=re.compile(keyword,re.IGNORECASE)
+		self.keyword=MakeKeywordPattern(keyword,isRegularExpression)
+		keyword=self.keyword.pattern
 		if not silent: globalVars.app.say("%sの検索結果 %s から" % (keyword,self.rootDirectory,))
 
+	def _initFilter(self,searchFilter):
+		"""絞り込み条件 (searchFilter.SearchFilter) を設定する。パスをたどる側で絞り込み済みなので、ここでは覚えておくだけ。何も絞り込まない場合は None にする。"""
+		self.searchFilter=searchFilter if searchFilter is not None and not searchFilter.IsEmpty() else None
+		if self.searchFilter is not None: self.log.debug("Search results are filtered by %s." % self.searchFilter)
+
 	def _initSearch(self):
 		"""検索する前に準備する。"""
 		self.finished=False
 		for l in self.lists:
 			l.clear()
+		self.InvalidateIndex()
 		self.log.debug("Getting search results for %s..." % self.keyword)
 		self.searched_index=0#インデックスいくつまで検索したか
 
-	def _MakeObject(self,objType,fullpath,isDir=False):
-		stat=os.stat(fullpath)
-		ret, shfileinfo=shell.SHGetFileInfo(fullpath,0,shellcon.SHGFI_ICON | shellcon.SHGFI_TYPENAME)
+	def _MakeObject(self,objType,fullpath,entry=None):
+		"""
+			fullpath の要素を作る。entry には、パスをたどったときに得た DirectoryEntry を渡す。その場合は、ファイルシステムに問い合わせない。
+			entry がなければ、1回だけ問い合わせる。見つからなければ None を返す。
+		"""
+		if entry is None:
+			entry=directoryEnumerator.GetEnumerator().GetEntry(fullpath)
+			if entry is None: return None
+		#end 問い合わせる
+		typeString,hIcon=globalVars.app.filetypes_cach.GetTypeInfo(fullpath,entry.attributes)
 		obj=objType()
-		if isDir:
-			size=-1
-		else:
-			size=stat.st_size
 		obj.Initialize(
 			os.path.dirname(fullpath),						#directory
 			os.path.basename(fullpath),						#basename
 			fullpath,
-			size,									#size
-			datetime.datetime.fromtimestamp(stat.st_mtime),	#modDate
-			win32file.GetFileAttributes(fullpath),			#attributes
-			shfileinfo[4],									#typeString
-			datetime.datetime.fromtimestamp(stat.st_ctime),	#creationDate
-			win32api.GetShortPathName(fullpath),			#shortName
-			shfileinfo[0]									#hIcon
+			entry.size,										#size (フォルダは-1)
+			entry.modDate,									#modDate
+			entry.attributes,								#attributes
+			typeString,										#typeString
+			entry.creationDate,								#creationDate
+			entry.shortName,								#shortName
+			hIcon											#hIcon
 		)
 		return obj
 
 	def Update(self):
-		return self.Initialize(self.rootDirectory,self.searches,self.keyword,True)
+		return self.Initialize(self.rootDirectory,self.searches,self.keyword,True,searchFilter=self.searchFilter)
 
 	def RedoSearch(self):
 		self._initSearch()
@@ -0,0 +1,101 @@
+﻿# -*- coding: utf-8 -*-
+#Falcon size report list object
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+import os
+import wx
+import browsableObjects
+import globalVars
+import directoryEnumerator
+import errorCodes
+
+from .fileListBase import *
+from .constants import *
+
+class SizeReportList(FileListBase):
+	"""sizeTree.SizeTree から、容量の大きいフォルダとファイルを取り出して並べるリスト。"""
+	def __init__(self):
+		super().__init__()
+		self.supportedSorts=[SORT_TYPE_BASENAME,SORT_TYPE_FILESIZE,SORT_TYPE_SEARCHPATH,SORT_TYPE_MODDATE,SORT_TYPE_ATTRIBUTES,SORT_TYPE_TYPESTRING]
+		self.columns={
+			_("ファイル名"):wx.LIST_FORMAT_LEFT,
+			_("サイズ"):wx.LIST_FORMAT_RIGHT,
+			_("パス"):wx.LIST_FORMAT_LEFT,
+			_("更新"):wx.LIST_FORMAT_LEFT,
+			_("属性"):wx.LIST_FORMAT_LEFT,
+			_("種類"):wx.LIST_FORMAT_LEFT
+		}
+		self.folders=[]
+		self.files=[]
+		self.lists=[self.folders,self.files]
+		self.tree=None
+
+	def Initialize(self,rootDirectory,tree=None,count=100):
+		"""
+			tree (sizeTree.SizeTree) から、容量の大きいフォルダとファイルを、それぞれ count 個まで取り出す。
+			tree を省略すると、空のリストになる。取り出した後に消えていた項目は、含めない。
+		"""
+		if isinstance(rootDirectory,list):#パラメータがリストなら、browsableObjects のリストとして処理刷る(ファイルリストを取得しないでコピーする)
+			for elem in rootDirectory:
+				if type(elem) is browsableObjects.SearchedFolder:
+					self.folders.append(elem)
+				else:
+					self.files.append(elem)
+				#end ファイルかフォルダか
+			#end for
+			return errorCodes.OK
+		self.rootDirectory=rootDirectory
+		self.tree=tree
+		if tree is None: return errorCodes.OK
+		for index in tree.LargestFolders(count):
+			f=self._makeObject(browsableObjects.SearchedFolder,tree.GetPath(index))
+			if f is None: continue
+			f.size,f.fileCount,f.dirCount=tree.GetSizeByIndex(index)#サイズは、中身の合計にする
+			self.folders.append(f)
+		#end for
+		for fullpath,size in tree.LargestFiles(count):
+			f=self._makeObject(browsableObjects.SearchedFile,fullpath)
+			if f is None: continue
+			self.files.append(f)
+		#end for
+		self.ApplySort()
+		return errorCodes.OK
+
+	def _makeObject(self,objType,fullpath):
+		"""fullpath の要素を作る。見つからなければ None を返す。"""
+		entry=directoryEnumerator.GetEnumerator().GetEntry(fullpath)
+		if entry is None: return None
+		typeString,hIcon=globalVars.app.filetypes_cach.GetTypeInfo(fullpath,entry.attributes)
+		obj=objType()
+		obj.Initialize(
+			os.path.dirname(fullpath),						#directory
+			os.path.basename(fullpath),						#basename
+			fullpath,
+			entry.size,										#size (フォルダは-1)
+			entry.modDate,									#modDate
+			entry.attributes,								#attributes
+			typeString,										#typeString
+			entry.creationDate,								#creationDate
+			entry.shortName,								#shortName
+			hIcon											#hIcon
+		)
+		return obj
+
+	def Update(self):
+		"""一覧を作り直す。たどり直すのはタブの方で行うので、ここでは今の木から取り出し直すだけ。"""
+		self.folders.clear()
+		self.files.clear()
+		self.InvalidateIndex()
+		return self.Initialize(self.rootDirectory,self.tree,globalVars.app.config.getint("size_report","top_count",100,1,10000))
+
+	def GetFolderFileNumber(self):
+		return len(self.folders), len(self.files)
+
+	def GetTopFileIndex(self):
+		"""先頭ファイルのインデックス番号を返す。"""
+		if len(self.files)>0:
+			return len(self.folders)
+		else:
+			return -1
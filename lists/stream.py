@@ -38,6 +38,7 @@ class StreamList(FalconListBase):
 		#end copy
 
 		self.streams.clear()
+		self.InvalidateIndex()
 		file_spl=file.split("\\")
 		self.rootDirectory=file
 		level=len(file_spl)
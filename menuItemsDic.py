@@ -56,7 +56,9 @@ dic={
 	"READ_SETMOVEMENTREAD":_("移動先の読み方を設定"),
 
 	"TOOL_DIRCALC":_("フォルダ容量計算"),
+	"TOOL_DIRCALC_REFRESH":_("フォルダ容量の再計算"),
 	"TOOL_HASHCALC":_("ファイルハッシュの計算"),
+	"TOOL_SIZEREPORT":_("容量の大きい項目の一覧"),
 	"TOOL_EXEC_PROGRAM":_("ファイル名を指定して実行"),
 	"TOOL_ADDPATH":_("環境変数PATHに追加"),
 	"TOOL_EJECT_DRIVE":_("ドライブの取り外し"),
@@ -18,6 +18,7 @@ import win32con
 import win32file
 
 import constants
+import documentText
 import globalVars
 import lists
 import workerThreadTasks
@@ -145,12 +146,9 @@ def DestroyContextMenu():
 	falconHelper.destroyContextMenu()
 
 def ExtractText(path):
-	path_bytes=makeStringForFalconHelper(path)
-	ptr=falconHelper.extractText(path_bytes)
-	s=ctypes.c_char_p(ptr).value
-	falconHelper.releasePtr(ptr)
-	s2=s.decode('UTF-8')
-	return s2
+	"""ドキュメントからテキストを取り出す。テキストキャッシュが有効なら、キャッシュを通す。"""
+	if globalVars.app.textCache is not None: return globalVars.app.textCache.GetText(path,documentText.ExtractText)
+	return documentText.ExtractText(path)
 
 def disableWindowStyleFlag(hwnd,flag):
 	"""指定されたウィンドウハンドルの DWL_STYLE の値を撮って、指定されたフラグを折る。"""
@@ -175,31 +173,23 @@ def IteratePaths(path,append_eol=False):
 	#EOL挿入
 	if append_eol: yield "eol"
 
-def GetDirectorySize(path,fileCount=0,dirCount=0):
-	"""ディレクトリのサイズをバイト数で返す。"""
-	total = 0
+def IteratePaths_dirFirst(path):
+	"""IteratePaths と同じだが、フォルダを、その中身より先に返す。貼り付けで、フォルダを作ってから中身をコピーするのに使う。"""
 	try:
-		with os.scandir(path) as it:
-			for entry in it:
-				if isLink(entry.path):
-					print("Synlink skipped:"+entry.path)
-					log.debug("Synlink skipped:"+entry.path)
-					continue
-				elif entry.is_file(follow_symlinks=False):
-					total += entry.stat().st_size
-					fileCount+=1
-				elif entry.is_dir(follow_symlinks=False):
-					dirCount+=1
-					r=GetDirectorySize(entry.path,fileCount,dirCount)
-					if r==(-1,0-1,-1):continue
-					total+=r[0]
-					fileCount=r[1]
-					dirCount=r[2]
-	except OSError as er:
-		log.error("GetDirectorySize failed (%s" % er)
-		return -1,-1,-1
+		for elem in win32file.FindFilesIterator(os.path.join(path,"*")):
+			if elem[8]=="." or elem[8]=="..": continue
+			yield os.path.join(path,elem[8])
+			if elem[0]&win32file.FILE_ATTRIBUTE_DIRECTORY and not elem[0]&win32file.FILE_ATTRIBUTE_REPARSE_POINT:
+				yield from IteratePaths_dirFirst(os.path.join(path,elem[8]))
+			#end ディレクトリ
+		#end iterate
+	except pywintypes.error as e:
+		log.error("Access denied while searching paths at %s (%s)." % (path,e))
 	#end except
-	return total,fileCount,dirCount
+
+def GetDirectorySize(path):
+	"""ディレクトリのサイズを、(バイト数, ファイル数, サブフォルダ数) で返す。失敗したら、全て-1。計算は directorySize.DirectorySizeEngine で行う。"""
+	return globalVars.app.directorySizeEngine.Calculate([path])[0]
 
 def GetExecutableState(path):
 	"""指定されたファイルパスが、実行可能ファイルであろうかどうかを調べて boolean で返す。"""
@@ -280,6 +270,11 @@ def CommandLineToArgv(cmd):
 def isDocumentExt(ext):
 	return ext.lower() in constants.SUPPORTED_DOCUMENT_FORMATS | globalVars.app.documentFormats
 
+def isPlainTextExt(ext):
+	"""テキストをそのまま読めばよいドキュメントかどうか。ユーザーが追加したドキュメント形式も、プレーンテキストとして扱う。"""
+	ext=ext.lower()
+	return ext in constants.PLAIN_TEXT_FORMATS or (ext in globalVars.app.documentFormats and ext not in constants.SUPPORTED_DOCUMENT_FORMATS)
+
 def ResolveLocalIpAddress(name):
 	addr=""
 	try:
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#Falcon paste planner
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+貼り付けるフォルダの中を、コピーと同時に別のスレッドでたどり、見つけた項目を順番に流します。
+全てたどり終わるのを待たずにコピーを始められるので、大きなツリーでも、最初のファイルがすぐにコピーされます。
+種類とサイズは列挙で得た情報(directoryEnumerator.DirectoryEntry)を使うので、項目ごとにファイルシステムへ問い合わせ直しません。
+フォルダは、必ずその中身より先に流します。項目は、フォルダ1つ分ずつ(多ければ chunkSize 個ずつ)まとめてキューに入れます。流す量には上限があり、コピーが追いつかないと、たどる側が待ちます。
+これまでに見つけたファイルの数と合計バイト数は、たどりながら増えていくので、進捗の表示に使えます。
+リパースポイント(ジャンクションやシンボリックリンク)は、項目としては流しますが、中には入りません。
+このモジュールは、win32 のモジュールがない環境でも動きます。
+"""
+
+import logging
+import os
+import queue
+import threading
+
+import directoryEnumerator
+
+#流し終わりを表す。キューの中だけで使う
+_END=object()
+
+class PastePlanner(object):
+	def __init__(self,roots,makeElement,maxsize=64,chunkSize=1000):
+		"""
+			roots (フルパスのリスト) 以下を、たどった順に流す。
+			makeElement(フルパス, ファイルかどうか, バイト数) で、流す要素を作る。フォルダのバイト数は-1。
+			キューには、chunkSize 個までの要素のリストを、maxsize 個まで溜める。
+		"""
+		self.log=logging.getLogger("falcon.pastePlanner")
+		self.roots=roots
+		self.makeElement=makeElement
+		self.queue=queue.Queue(maxsize)
+		self.chunkSize=chunkSize
+		self.chunk=[]			#まだキューに入れていない要素
+		self.enumerator=directoryEnumerator.GetEnumerator()
+		self.totalBytes=0		#これまでに見つけたファイルの合計バイト数
+		self.totalFiles=0		#これまでに見つけたファイルの数
+		self.totalItems=0		#これまでに流した項目の数
+		self.finished=False		#最後までたどった
+		self.canceled=False
+		self.errors=0
+		self.thread=None
+
+	def Start(self):
+		"""別のスレッドで、たどり始める。"""
+		self.thread=threading.Thread(target=self._walk,name="pastePlanner",daemon=True)
+		self.thread.start()
+
+	def Cancel(self):
+		"""たどるのをやめる。"""
+		self.canceled=True
+
+	def __iter__(self):
+		"""流れてきた要素を、順番に返す。Start を呼んでいなければ、ここで始める。"""
+		if self.thread is None: self.Start()
+		while True:
+			item=self.queue.get()
+			if item is _END: return
+			yield from item
+		#end while
+
+	def _walk(self):
+		try:
+			for root in self.roots:
+				entry=self.enumerator.GetEntry(root)
+				if entry is None:#もうない
+					self.errors+=1
+					self.log.error("Cannot find %s" % root)
+					continue
+				#end ない
+				if not self._put(root,entry) or not self._flush(): return
+				if entry.IsDirectory() and not entry.IsReparsePoint():
+					if not self._walkFolder(root): return
+				#end フォルダ
+			#end for
+			if not self._flush(): return
+			self.finished=True
+			self.log.debug("Planned %d items, %d files, %d bytes (%d errors)." % (self.totalItems,self.totalFiles,self.totalBytes,self.errors))
+		finally:
+			self._enqueue(_END)
+		#end finally
+
+	def _walkFolder(self,root):
+		"""root の中を、フォルダを中身より先にしてたどる。キャンセルされたら False を返す。"""
+		stack=[root]
+		while stack:
+			path=stack.pop()
+			found=[]
+			try:
+				for entry in self.enumerator.Iterate(path):
+					fullpath=os.path.join(path,entry.name)
+					if not self._put(fullpath,entry): return False
+					if entry.IsDirectory() and not entry.IsReparsePoint(): found.append(fullpath)
+				#end for
+			except directoryEnumerator.EnumerationError as e:
+				self.errors+=1
+				self.log.error("Cannot enumerate %s (%s)." % (path,e))
+			#end except
+			if not self._flush(): return False
+			found.reverse()#先に見つけたフォルダから入る
+			stack.extend(found)
+		#end while
+		return True
+
+	def _put(self,fullpath,entry):
+		isfile=not entry.IsDirectory()
+		size=entry.size if isfile else -1
+		if isfile:
+			self.totalBytes+=size
+			self.totalFiles+=1
+		#end ファイル
+		self.totalItems+=1
+		self.chunk.append(self.makeElement(fullpath,isfile,size))
+		if len(self.chunk)>=self.chunkSize: return self._flush()
+		return True
+
+	def _flush(self):
+		"""溜めた要素を、キューに入れる。"""
+		if not self.chunk: return True
+		chunk=self.chunk
+		self.chunk=[]
+		return self._enqueue(chunk)
+
+	def _enqueue(self,item):
+		"""キューが空くまで待って入れる。待っている間にキャンセルされたら False を返す。"""
+		while True:
+			if self.canceled and item is not _END: return False
+			try:
+				self.queue.put(item,timeout=0.1)
+				return True
+			except queue.Full:
+				if item is _END and self.canceled:#読む側がもういない
+					return False
+			#end except
+		#end while
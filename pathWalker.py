@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#Falcon parallel path walker
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+フォルダの中を再帰的にたどって、見つかったパスを PathStream に流します。
+絞り込み条件(searchFilter.SearchFilter)を渡すと、列挙で得た情報だけで判定して、条件に合うパスだけを流します。
+複数のフォルダを、複数のスレッドで同時に列挙します。NASなど、フォルダ1つの列挙に時間がかかる場所で効果があります。
+PathStream は上限付きのキューを持っていて、読み出し側が追いつかないと、たどる側が待ちます。読み終わったパスは PathStream.paths に残るので、同じ結果を何度でも読み直せます。
+パスと一緒に、列挙で得た情報(directoryEnumerator.DirectoryEntry)も PathStream.entries に残します。検索結果の要素は、ファイルシステムに問い合わせ直さずに、この情報から作れます。
+このモジュールは、win32 のモジュールがない環境でも動きます。
+"""
+
+import logging
+import os
+import queue
+import threading
+
+import directoryEnumerator
+
+#PathStream の終わりを表す。キューの中だけで使う
+_END=object()
+
+class PathStream(object):
+	"""
+		walker から検索処理へ、パスを受け渡す。
+		書き込み側は Put と Close を呼び、読み出し側は Read で、自分が何番目まで読んだかを指定して続きを受け取る。
+		entries には、paths と同じ位置に、そのパスを列挙したときの DirectoryEntry が入る。情報がないもの(Seed で入れたものなど)は None 。
+	"""
+	def __init__(self,maxsize=10000):
+		self.queue=queue.Queue(maxsize)
+		self.paths=[]			#読み出し済みのパス
+		self.entries=[]			#paths に対応する DirectoryEntry
+		self.finished=False		#最後まで読み出した
+		self.seeded=0			#Seed で先頭に入れたパスの数
+		self.abandoned=False	#読み出し側が、もう読まない
+		self.lock=threading.Lock()
+
+	def Seed(self,paths):
+		"""たどった結果より先に読ませるパスを、先頭に入れる。ファイル名の索引から得た結果を、すぐに検索させるときに使う。読み出しを始める前に呼ぶこと。"""
+		with self.lock:
+			self.paths[self.seeded:self.seeded]=paths
+			self.entries[self.seeded:self.seeded]=[None]*len(paths)
+			self.seeded+=len(paths)
+		#end lock
+
+	def Put(self,path,taskState=None,entry=None):
+		"""path を流す。entry には、列挙で得た DirectoryEntry を渡す。キューがいっぱいなら、空くまで待つ。待っている間にキャンセルされたら False を返す。"""
+		return self._put((path,entry),taskState)
+
+	def Close(self,taskState=None):
+		"""全て流し終わったことを知らせる。"""
+		return self._put(_END,taskState)
+
+	def Abandon(self):
+		"""読み出し側が、もう読まないことを知らせる。書き込み側は、キューが空くのを待たずに止まる。"""
+		self.abandoned=True
+
+	def _put(self,item,taskState):
+		while True:
+			if self.abandoned or (taskState is not None and taskState.canceled): return False
+			try:
+				self.queue.put(item,timeout=0.1)
+				return True
+			except queue.Full:
+				pass
+			#end except
+		#end while
+
+	def Read(self,position,timeout=0):
+		"""
+			position 番目から後に届いたパスの数を調べる。まだ届いていなければ、timeout 秒まで待つ(None なら届くまで待つ)。
+			(読めるところの終わりの位置, 最後まで届いたかどうか) を返す。パスは、 self.paths[position:終わりの位置] で、列挙で得た情報は self.entries[position:終わりの位置] で取り出す。
+		"""
+		with self.lock:
+			self._drain()
+			if len(self.paths)>position or self.finished or timeout==0:
+				return len(self.paths),self.finished
+			#end すでにある
+		#end lock
+		try:
+			item=self.queue.get(timeout=timeout)
+		except queue.Empty:
+			item=None
+		#end except
+		with self.lock:
+			if item is _END:
+				self.finished=True
+			elif item is not None:
+				self.paths.append(item[0])
+				self.entries.append(item[1])
+			#end 届いたもの
+			self._drain()
+			return len(self.paths),self.finished
+		#end lock
+
+	def _drain(self):
+		"""キューに届いているものを、待たずに全部 paths に移す。"""
+		while not self.finished:
+			try:
+				item=self.queue.get_nowait()
+			except queue.Empty:
+				return
+			#end except
+			if item is _END:
+				self.finished=True
+			else:
+				self.paths.append(item[0])
+				self.entries.append(item[1])
+			#end 終わりかどうか
+		#end while
+
+	def __len__(self):
+		return len(self.paths)
+
+class ParallelWalker(object):
+	"""
+		roots に指定したフォルダ以下を、workers 個のスレッドでたどる。
+		ルートが1つなら、そこからの相対パスを流す。複数なら、フルパスを流す。
+		リパースポイント(ジャンクションなど)は、パスとしては流すが、中には入らない。
+		searchFilter (searchFilter.SearchFilter) を指定すると、列挙で得た情報で判定し、条件に合うものだけを流す。合わないフォルダの中もたどる。
+	"""
+	def __init__(self,roots,stream,workers=4,searchFilter=None):
+		self.log=logging.getLogger("falcon.pathWalker")
+		if isinstance(roots,str): roots=[roots]
+		self.roots=roots
+		self.stream=stream
+		self.workers=max(1,workers)
+		self.filter=searchFilter if searchFilter is not None and not searchFilter.IsEmpty() else None
+		self.enumerator=directoryEnumerator.GetEnumerator()
+		self.pending=[]			#まだ列挙していないフォルダ。(フルパス, 流すときの接頭辞)
+		self.active=0			#列挙中のフォルダの数
+		self.condition=threading.Condition()
+		self.canceled=False
+		self.errors=0
+		self.directories=0
+
+	def Run(self,taskState=None):
+		"""たどり終わるまで待つ。最後まで流し終わったら True 、キャンセルされたら False を返す。"""
+		self.taskState=taskState
+		for root in self.roots:
+			self.pending.append((root,"" if len(self.roots)==1 else root))
+		#end for
+		threads=[]
+		for i in range(self.workers):
+			t=threading.Thread(target=self._work,name="pathWalker%d" % (i+1),daemon=True)
+			t.start()
+			threads.append(t)
+		#end for
+		for t in threads:
+			t.join()
+		#end for
+		if self._isCanceled(): return False
+		self.log.debug("Walked %d directories with %d workers (%d errors)." % (self.directories,self.workers,self.errors))
+		return self.stream.Close(taskState)
+
+	def _isCanceled(self):
+		return self.canceled or (self.taskState is not None and self.taskState.canceled)
+
+	def _work(self):
+		while True:
+			with self.condition:
+				while not self.pending and self.active>0 and not self._isCanceled():
+					self.condition.wait(0.1)
+				#end 他のスレッドが新しいフォルダを見つけるかもしれないので待つ
+				if not self.pending or self._isCanceled():
+					self.condition.notify_all()
+					return
+				#end もうない
+				path,prefix=self.pending.pop()
+				self.active+=1
+			#end lock
+			found=self._list(path,prefix)
+			with self.condition:
+				self.active-=1
+				self.directories+=1
+				if found: self.pending.extend(found)
+				self.condition.notify_all()
+			#end lock
+
+	def _list(self,path,prefix):
+		"""path の中身を流し、中に入るべきフォルダのリストを返す。"""
+		found=[]
+		match=self.filter.Match if self.filter is not None else None
+		try:
+			for entry in self.enumerator.Iterate(path):
+				name=os.path.join(prefix,entry.name) if prefix else entry.name
+				if (match is None or match(entry)) and not self.stream.Put(name,self.taskState,entry):
+					self.canceled=True
+					return found
+				#end キャンセル
+				if entry.IsDirectory() and not entry.IsReparsePoint():
+					found.append((os.path.join(path,entry.name),name))
+			#end for
+		except directoryEnumerator.EnumerationError as e:
+			self.errors+=1
+			self.log.error("Access denied while searching paths at %s (%s)." % (path,e))
+		#end except
+		return found
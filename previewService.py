@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#Falcon preview service
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+プレビューや先頭・末尾の読み上げのための読み込みを、専用のスレッドで行います。
+ワーカースレッドは検索などで長時間ふさがることがあるので、プレビューはそれとは別のスレッドで、すぐに処理します。
+新しい要求が来ると、まだ始まっていない古い要求は捨てます。処理中のものは最後まで実行しますが、結果は通知しません。
+コールバックはプレビュー用のスレッドから呼ばれます。画面を触る場合は、wx.CallAfter を使ってください。
+"""
+
+import logging
+import threading
+
+class PreviewService(object):
+	def __init__(self):
+		self.log=logging.getLogger("falcon.previewService")
+		self.condition=threading.Condition()
+		self.pending=None		#まだ始めていない要求。(番号, 処理, コールバック)
+		self.current=0			#最新の要求の番号
+		self.finished=0			#最後に処理が終わった要求の番号
+		self.stopped=False
+		self.thread=None
+
+	def Request(self,func,callback):
+		"""
+			func() をプレビュー用のスレッドで実行し、 callback(要求の番号, 戻り値) を呼ぶ。func が例外を送出した場合、戻り値は None になる。
+			要求の番号を返す。後から別の要求をすると、この要求の結果は通知されない。
+		"""
+		with self.condition:
+			self.current+=1
+			self.pending=(self.current,func,callback)
+			if self.thread is None:
+				self.thread=threading.Thread(target=self._run,name="previewService",daemon=True)
+				self.thread.start()
+			#end スレッドを作る
+			self.condition.notify()
+			return self.current
+		#end lock
+
+	def Cancel(self):
+		"""まだ結果を通知していない要求を、全て取り消す。"""
+		with self.condition:
+			self.current+=1
+			self.pending=None
+		#end lock
+
+	def IsCurrent(self,requestId):
+		"""requestId が、取り消されていない最新の要求かどうか。"""
+		return requestId==self.current
+
+	def IsPending(self,requestId):
+		"""requestId が最新の要求で、まだ処理が終わっていないかどうか。"""
+		return requestId==self.current and self.finished<requestId
+
+	def Stop(self):
+		"""スレッドを終了する。"""
+		with self.condition:
+			self.stopped=True
+			self.pending=None
+			self.condition.notify()
+		#end lock
+
+	def _run(self):
+		while True:
+			with self.condition:
+				while self.pending is None and not self.stopped:
+					self.condition.wait()
+				#end while
+				if self.stopped: return
+				requestId,func,callback=self.pending
+				self.pending=None
+			#end lock
+			try:
+				ret=func()
+			except Exception:
+				self.log.exception("Preview request failed.")
+				ret=None
+			#end except
+			self.finished=requestId
+			if self.IsCurrent(requestId): callback(requestId,ret)
+		#end while
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+#Falcon regular expression literal analysis
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+正規表現を解析して、ヒットする文字列が必ず含む部分(必須リテラル)を取り出します。
+必須リテラルを単純な文字列検索で先に探し、見つかったところだけを正規表現で確かめることで、検索を速くするために使います。
+"""
+
+import functools
+import re
+
+try:
+	from re import _parser as sre_parse
+except ImportError:
+	import sre_parse
+#end except
+
+@functools.lru_cache(maxsize=64)
+def GetRequiredLiterals(source,flags,asciiCaseOnly=False):
+	"""
+		正規表現 source にヒットする文字列が必ず含む文字列を、全て取り出してタプルで返す。
+		ここで見るのは、パターンの一番外側に並んでいる文字だけ。選択(|)や繰り返しの中は見ない。
+		asciiCaseOnly=True で flags に IGNORECASE が含まれている場合、大文字と小文字のあるASCII以外の文字は、リテラルに含めない。bytes のまま大文字と小文字を同一視して探すときに使う。
+	"""
+	try:
+		parsed=sre_parse.parse(source,flags)
+	except Exception:
+		return ()
+	#end except
+	checkCase=asciiCaseOnly and flags&re.IGNORECASE
+	ret=[]
+	run=[]
+	for op,av in list(parsed)+[(None,None)]:
+		c=chr(av) if op==sre_parse.LITERAL else None
+		if c is not None and checkCase and not c.isascii() and c.lower()!=c.upper(): c=None
+		if c is not None:
+			run.append(c)
+			continue
+		#end 続く
+		if run: ret.append("".join(run))
+		run=[]
+	#end for
+	return tuple(ret)
+
+def GetRequiredLiteral(source,flags,asciiCaseOnly=False):
+	"""GetRequiredLiterals のうち、最も長いものを返す。見つからなければ空文字列を返す。"""
+	return max(GetRequiredLiterals(source,flags,asciiCaseOnly),key=len,default="")
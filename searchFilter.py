@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#Falcon search filter
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+検索の絞り込み条件(サイズ・更新日時・属性・ファイルかフォルダか)を表します。
+条件は、パスをたどるときに列挙で得られた DirectoryEntry に当てます。条件に合わないものは検索処理に流れないので、リストの要素を作る処理も、ファイルシステムへの問い合わせも発生しません。
+絞り込みはパスを流すかどうかだけに使い、条件に合わないフォルダの中もたどります。
+このモジュールは、標準ライブラリだけで動きます。
+"""
+
+import datetime
+import re
+
+import directoryEnumerator
+
+#ファイルかフォルダか
+KIND_ALL=0
+KIND_FILES=1
+KIND_FOLDERS=2
+
+#サイズの単位。misc.ConvertBytesTo と同じく、1024倍ずつ
+SIZE_UNITS={"":1,"B":1,"BYTES":1,"K":1024,"KB":1024,"M":1024**2,"MB":1024**2,"G":1024**3,"GB":1024**3,"T":1024**4,"TB":1024**4}
+SIZE_PATTERN=re.compile(r"^\s*([0-9]+(?:\.[0-9]+)?)\s*([A-Za-z]*)\s*$")
+DATE_PATTERN=re.compile(r"^\s*([0-9]{4})[/\-.]([0-9]{1,2})[/\-.]([0-9]{1,2})\s*$")
+
+class SearchFilter(object):
+	"""
+		検索の絞り込み条件。指定しない条件は None か 0 にする。
+		サイズは、バイト数で下限と上限(どちらも含む)。フォルダにはサイズがないので、サイズを指定するとフォルダはヒットしない。
+		日時は、タイムゾーン付きの datetime で、modifiedAfter 以降、modifiedBefore より前。
+		属性は、attributesOn の全てが付いていて、 attributesOff のどれも付いていないものがヒットする。
+	"""
+	def __init__(self,minSize=None,maxSize=None,modifiedAfter=None,modifiedBefore=None,attributesOn=0,attributesOff=0,kind=KIND_ALL):
+		self.minSize=minSize
+		self.maxSize=maxSize
+		self.modifiedAfter=modifiedAfter
+		self.modifiedBefore=modifiedBefore
+		self.attributesOn=attributesOn
+		self.attributesOff=attributesOff
+		self.kind=kind
+
+	def IsEmpty(self):
+		"""何も絞り込まないなら True 。"""
+		return self.minSize is None and self.maxSize is None and self.modifiedAfter is None and self.modifiedBefore is None and not self.attributesOn and not self.attributesOff and self.kind==KIND_ALL
+
+	def Match(self,entry):
+		"""entry (directoryEnumerator.DirectoryEntry) が条件に合うなら True 。"""
+		attributes=entry.attributes
+		if self.kind!=KIND_ALL:
+			if (attributes&directoryEnumerator.FILE_ATTRIBUTE_DIRECTORY!=0)!=(self.kind==KIND_FOLDERS): return False
+		#end ファイルかフォルダか
+		if attributes&self.attributesOn!=self.attributesOn or attributes&self.attributesOff: return False
+		if self.minSize is not None or self.maxSize is not None:
+			if entry.size<0: return False#フォルダ
+			if self.minSize is not None and entry.size<self.minSize: return False
+			if self.maxSize is not None and entry.size>self.maxSize: return False
+		#end サイズ
+		if self.modifiedAfter is not None and entry.modDate<self.modifiedAfter: return False
+		if self.modifiedBefore is not None and entry.modDate>=self.modifiedBefore: return False
+		return True
+
+	def __repr__(self):
+		conditions=[]
+		if self.kind!=KIND_ALL: conditions.append("files" if self.kind==KIND_FILES else "folders")
+		if self.minSize is not None: conditions.append("size>=%d" % self.minSize)
+		if self.maxSize is not None: conditions.append("size<=%d" % self.maxSize)
+		if self.modifiedAfter is not None: conditions.append("modified>=%s" % self.modifiedAfter.isoformat())
+		if self.modifiedBefore is not None: conditions.append("modified<%s" % self.modifiedBefore.isoformat())
+		if self.attributesOn: conditions.append("attributes&0x%x" % self.attributesOn)
+		if self.attributesOff: conditions.append("~attributes&0x%x" % self.attributesOff)
+		return "<SearchFilter %s>" % (" ".join(conditions) if conditions else "empty")
+
+def ParseSize(text):
+	"""「1GB」「500 KB」「1.5g」「1024」のような文字列をバイト数にする。空なら None 。読めなければ ValueError を送出する。"""
+	if not text.strip(): return None
+	m=SIZE_PATTERN.match(text)
+	if not m or m.group(2).upper() not in SIZE_UNITS: raise ValueError("invalid size: %s" % text)
+	return int(float(m.group(1))*SIZE_UNITS[m.group(2).upper()])
+
+def ParseDate(text,nextDay=False):
+	"""
+		「2020/01/31」「2020-1-31」のような文字列を、その日の0時(ローカル時刻)を表すタイムゾーン付きの datetime にする。空なら None 。読めなければ ValueError を送出する。
+		nextDay=True にすると、次の日の0時を返す。その日を含む範囲の終わりに使う。
+	"""
+	if not text.strip(): return None
+	m=DATE_PATTERN.match(text)
+	if not m: raise ValueError("invalid date: %s" % text)
+	ret=datetime.datetime(int(m.group(1)),int(m.group(2)),int(m.group(3)))
+	if nextDay: ret+=datetime.timedelta(days=1)
+	return ret.astimezone()
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+#Falcon size tree
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+ドライブやフォルダ全体を1回だけたどって、全てのフォルダのサイズを持つ木を作ります。
+木ができれば、その中のどのフォルダのサイズも、ファイルシステムに問い合わせずに答えられます。容量の大きいフォルダとファイルの一覧も、木から作ります。
+フォルダごとに、名前、親フォルダの番号、中身の合計を配列で持つので、フォルダ数が多くてもメモリをあまり使いません。ファイルは、大きいものから決まった数だけ覚えます。
+ハードリンクを1回だけ数える設定にすると、ファイルID(ボリュームとファイル番号)で見分けます。Windows の列挙ではリンク数が分からず、ファイルごとに1回問い合わせることになるので、既定では数えません。
+リパースポイント(ジャンクションやシンボリックリンク)は、数えず、中にも入りません。
+作った木は、ディスクに保存しておき、次回はたどり直す前に表示できます。
+このモジュールは、標準ライブラリだけで動きます。
+"""
+
+import array
+import hashlib
+import heapq
+import json
+import logging
+import os
+import stat
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+#保存ファイルの先頭。マジック、メタデータ(JSON)のバイト数
+HEADER=struct.Struct("<4sI")
+MAGIC=b"FST1"
+EXTENSION=".tree"
+
+#os.stat_result.st_file_attributes の、リパースポイントを表すビット
+FILE_ATTRIBUTE_REPARSE_POINT=0x400
+
+class SizeTree(object):
+	"""1つのフォルダ以下の、全てのフォルダのサイズ。フォルダは番号で扱い、0番がルート。親は必ず子より小さい番号になる。"""
+	def __init__(self,root,names,parents,sizes,files,largestFiles=(),created=None,errors=0):
+		"""
+			names は、ルートを除いたフォルダ名のリスト(ルートは root)。parents, sizes, files は、フォルダごとの親の番号、直下のファイルの合計バイト数、直下のファイル数の配列。
+			largestFiles は、大きいファイルの (バイト数, フォルダの番号, ファイル名) のリスト。
+		"""
+		self.root=root
+		self.names=names
+		self.parents=parents
+		self.sizes=sizes
+		self.files=files
+		self.largestFiles=sorted(largestFiles,reverse=True)
+		self.created=created if created is not None else time.time()
+		self.errors=errors			#開けなかったフォルダの数
+		self._children=None			#(親の番号, os.path.normcase した名前)→番号。Find で作る
+		self._accumulate()
+
+	def _accumulate(self):
+		"""直下の合計から、サブフォルダを含めた合計を作る。"""
+		count=len(self.parents)
+		self.totalSizes=array.array("q",self.sizes)
+		self.totalFiles=array.array("q",self.files)
+		self.totalDirs=array.array("q",bytes(8*count))
+		parents=self.parents
+		totalSizes=self.totalSizes
+		totalFiles=self.totalFiles
+		totalDirs=self.totalDirs
+		for i in range(count-1,0,-1):#子は親より後ろにあるので、後ろから足していけば1回で済む
+			p=parents[i]
+			totalSizes[p]+=totalSizes[i]
+			totalFiles[p]+=totalFiles[i]
+			totalDirs[p]+=totalDirs[i]+1
+		#end for
+
+	@classmethod
+	def Build(cls,root,taskState=None,maxFiles=1000,countHardLinksOnce=False):
+		"""
+			root 以下を1回たどって、木を作る。大きいファイルは maxFiles 個まで覚える。
+			countHardLinksOnce が True なら、ハードリンクされたファイルを1回だけ数える。キャンセルされたら None を返す。
+		"""
+		log=logging.getLogger("falcon.sizeTree")
+		root=os.path.abspath(root)
+		names=[root]
+		parents=array.array("i",[-1])
+		sizes=array.array("q",[0])
+		files=array.array("q",[0])
+		largest=[]			#(バイト数, フォルダの番号, ファイル名) の最小ヒープ
+		seen=set()			#数えたハードリンクの (ボリューム, ファイル番号)
+		errors=0
+		stack=[(0,root)]
+		while stack:
+			if taskState is not None and taskState.canceled: return None
+			index,path=stack.pop()
+			size=count=0
+			try:
+				with os.scandir(path) as it:
+					for entry in it:
+						try:
+							st=entry.stat(follow_symlinks=False)#Windows では、列挙で得た情報なので問い合わせない
+						except OSError:
+							continue
+						#end except
+						if stat.S_ISLNK(st.st_mode) or getattr(st,"st_file_attributes",0)&FILE_ATTRIBUTE_REPARSE_POINT: continue
+						if stat.S_ISDIR(st.st_mode):
+							stack.append((len(names),entry.path))
+							names.append(entry.name)
+							parents.append(index)
+							sizes.append(0)
+							files.append(0)
+							continue
+						#end フォルダ
+						if countHardLinksOnce:
+							if st.st_nlink==0:#Windows の列挙では、リンク数とファイル番号が分からない
+								try:
+									st=os.stat(entry.path,follow_symlinks=False)
+								except OSError:
+									pass
+								#end except
+							#end 問い合わせる
+							if st.st_nlink>1:
+								key=(st.st_dev,st.st_ino)
+								if key in seen: continue
+								seen.add(key)
+							#end ハードリンク
+						#end ハードリンクを1回だけ数える
+						size+=st.st_size
+						count+=1
+						if maxFiles>0:
+							item=(st.st_size,index,entry.name)
+							if len(largest)<maxFiles:
+								heapq.heappush(largest,item)
+							elif item>largest[0]:
+								heapq.heapreplace(largest,item)
+							#end ヒープ
+						#end 大きいファイルを覚える
+					#end for
+				#end with
+			except OSError as err:
+				log.debug("Cannot enumerate %s (%s)" % (path,err))
+				errors+=1
+			#end except
+			sizes[index]=size
+			files[index]=count
+		#end while
+		return cls(root,names,parents,sizes,files,largest,errors=errors)
+
+	def __len__(self):
+		"""フォルダの数(ルートを含む)。"""
+		return len(self.parents)
+
+	def GetPath(self,index):
+		"""index 番のフォルダのフルパスを返す。"""
+		parts=[]
+		while index>0:
+			parts.append(self.names[index])
+			index=self.parents[index]
+		#end while
+		parts.reverse()
+		return os.path.join(self.root,*parts)
+
+	def Find(self,path):
+		"""path のフォルダの番号を返す。木の中になければ -1 。"""
+		path=os.path.abspath(path)
+		rel=os.path.relpath(path,self.root) if os.path.splitdrive(path)[0].lower()==os.path.splitdrive(self.root)[0].lower() else os.pardir
+		if rel==os.curdir: return 0
+		if rel==os.pardir or rel.startswith(os.pardir+os.sep): return -1
+		if self._children is None:
+			self._children={(self.parents[i],os.path.normcase(self.names[i])):i for i in range(1,len(self.parents))}
+		#end 初回
+		index=0
+		for name in rel.split(os.sep):
+			index=self._children.get((index,os.path.normcase(name)),-1)
+			if index<0: return -1
+		#end for
+		return index
+
+	def GetSize(self,path):
+		"""path のフォルダの (バイト数, ファイル数, サブフォルダ数) を返す。木の中になければ None 。"""
+		index=self.Find(path)
+		if index<0: return None
+		return self.GetSizeByIndex(index)
+
+	def GetSizeByIndex(self,index):
+		return (self.totalSizes[index],self.totalFiles[index],self.totalDirs[index])
+
+	def LargestFolders(self,count):
+		"""サブフォルダを含めた合計が大きいフォルダの番号を、大きい順に count 個返す。ルートは含まない。"""
+		return heapq.nlargest(count,range(1,len(self.parents)),key=self.totalSizes.__getitem__)
+
+	def LargestFiles(self,count):
+		"""大きいファイルの (フルパス, バイト数) を、大きい順に count 個まで返す。"""
+		return [(os.path.join(self.GetPath(index),name),size) for size,index,name in self.largestFiles[:count]]
+
+	def Serialize(self):
+		"""ファイルに保存するためのバイト列を返す。"""
+		meta=json.dumps({
+			"root": self.root,
+			"created": self.created,
+			"count": len(self.parents),
+			"errors": self.errors,
+			"largestFiles": self.largestFiles
+		}).encode("UTF-8")
+		body=self.parents.tobytes()+self.sizes.tobytes()+self.files.tobytes()+"\n".join(self.names[1:]).encode("UTF-8","surrogatepass")
+		return HEADER.pack(MAGIC,len(meta))+meta+zlib.compress(body)
+
+	@classmethod
+	def Deserialize(cls,data):
+		"""Serialize したバイト列から、木を作る。壊れていれば ValueError を送出する。"""
+		if len(data)<HEADER.size: raise ValueError("size tree file is too short")
+		magic,metaSize=HEADER.unpack_from(data)
+		if magic!=MAGIC: raise ValueError("not a size tree")
+		try:
+			meta=json.loads(data[HEADER.size:HEADER.size+metaSize].decode("UTF-8"))
+			body=zlib.decompress(data[HEADER.size+metaSize:])
+			count=meta["count"]
+			parents=array.array("i")
+			parents.frombytes(body[:4*count])
+			sizes=array.array("q")
+			sizes.frombytes(body[4*count:12*count])
+			files=array.array("q")
+			files.frombytes(body[12*count:20*count])
+			text=body[20*count:].decode("UTF-8","surrogatepass")
+		except (zlib.error,UnicodeDecodeError,json.JSONDecodeError,KeyError,ValueError) as err:
+			raise ValueError(str(err))
+		#end except
+		names=[meta["root"]]+(text.split("\n") if text else [])
+		if len(names)!=count or len(files)!=count: raise ValueError("size tree is truncated")
+		return cls(meta["root"],names,parents,sizes,files,[tuple(elem) for elem in meta["largestFiles"]],meta["created"],meta["errors"])
+
+class SizeTreeStore(object):
+	"""作った木を保存するフォルダを管理し、読み込んだ木をメモリに持っておく。"""
+	def __init__(self,directory,maxRoots=8):
+		self.log=logging.getLogger("falcon.sizeTree")
+		self.directory=directory
+		self.maxRoots=maxRoots
+		self.loaded={}		#正規化したルート→SizeTree
+		self.lock=threading.Lock()
+
+	def Load(self,root):
+		"""root の木を返す。保存されていなければ None 。"""
+		root=os.path.abspath(root)
+		key=os.path.normcase(root)
+		with self.lock:
+			if key in self.loaded: return self.loaded[key]
+		#end lock
+		try:
+			with open(self._makePath(root),"rb") as f:
+				data=f.read()
+			#end with
+		except OSError:
+			return None
+		#end except
+		try:
+			tree=SizeTree.Deserialize(data)
+		except ValueError as err:
+			self.log.error("Broken size tree for %s (%s)" % (root,err))
+			return None
+		#end except
+		with self.lock:
+			self.loaded[key]=tree
+		#end lock
+		return tree
+
+	def Save(self,tree):
+		"""tree を保存する。"""
+		try:
+			os.makedirs(self.directory,exist_ok=True)
+			fd,tmp=tempfile.mkstemp(".tmp","",self.directory)
+			with os.fdopen(fd,"wb") as f:
+				f.write(tree.Serialize())
+			#end with
+			os.replace(tmp,self._makePath(tree.root))
+		except OSError as err:
+			self.log.error("Cannot save size tree for %s (%s)" % (tree.root,err))
+		#end except
+		with self.lock:
+			self.loaded[os.path.normcase(tree.root)]=tree
+		#end lock
+		self._trim()
+
+	def _trim(self):
+		"""保存した木が maxRoots 個を超えたら、古いものから消す。"""
+		try:
+			with os.scandir(self.directory) as it:
+				found=sorted((entry.stat().st_mtime,entry.path) for entry in it if entry.name.endswith(EXTENSION))
+			#end with
+		except OSError:
+			return
+		#end except
+		for t,path in found[:max(0,len(found)-self.maxRoots)]:
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+			#end except
+		#end for
+		with self.lock:
+			self.loaded={k:v for k,v in self.loaded.items() if os.path.exists(self._makePath(v.root))}
+		#end lock
+
+	def _makePath(self,root):
+		return os.path.join(self.directory,hashlib.sha1(os.path.normcase(root).encode("UTF-8","surrogatepass")).hexdigest()+EXTENSION)
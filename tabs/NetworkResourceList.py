@@ -32,7 +32,9 @@ class NetworkResourceListTab(base.FalconTabBase):
 		"MOVE_TOPFILE",
 		"MOVE_OPEN_HERE_",
 		"TOOL_DIRCALC",
+		"TOOL_DIRCALC_REFRESH",
 		"TOOL_HASHCALC",
+		"TOOL_SIZEREPORT",
 		"TOOL_ADDPATH",
 		"TOOL_EXEC_PROGRAM",
 		"TOOL_EJECT_DRIVE",
@@ -7,17 +7,20 @@
 """
 タブは、必ずリストビューです。カラムの数と名前と、それに対応するリストの要素がタブを構成します。たとえば、ファイル一覧では「ファイル名」や「サイズ」などがカラムになり、その情報がリストに格納されています。ファイル操作の状況を示すタブの場合は、「進行率」や「状態」などがカラムの名前として想定されています。リスト上でエンターを押すことで、アクションを実行できます。ファイルビューではファイルやフォルダを開き、ファイル操作では問い合わせに応答することができます。
 """
+import collections
 import copy
 import json
 import logging
 import os
 import pywintypes
 import re
+import win32gui
 
 import wx
 import browsableObjects
 import clipboardHelper
 import constants
+import documentText
 import errorCodes
 import fileOperator
 import fileSystemManager
@@ -32,6 +35,8 @@ from win32com.shell import shell, shellcon
 from . import navigator
 from simpleDialog import *
 
+#仮想リストで、整形済みの行の文字列を保持しておく行数
+ROW_CACHE_SIZE=256
 
 #選択中のアイテム個数によるブロック
 #ここに定義したものが__init__でコピーされる
@@ -58,6 +63,7 @@ selectItemMenuConditions[0].extend([
 	"MOVE_FORWARD_STREAM",
 	"MOVE_EXEC_ORIGINAL_ASSOCIATION",
 	"TOOL_DIRCALC",
+	"TOOL_DIRCALC_REFRESH",
 	"TOOL_HASHCALC",
 	"TOOL_ADDPATH",
 	"TOOL_EJECT_DRIVE",
@@ -93,6 +99,7 @@ class FalconTabBase(object):
 	selectItemTypeMenuConditions[browsableObjects.File]=[]
 	selectItemTypeMenuConditions[browsableObjects.File].extend([
 		"TOOL_DIRCALC",
+		"TOOL_DIRCALC_REFRESH",
 		"MOVE_FORWARD_TAB",
 		"TOOL_ADDPATH",
 		"MOVE_FORWARD_TAB",
@@ -143,6 +150,9 @@ class FalconTabBase(object):
 		self.checkedItem=set()
 		self.hilightIndex=-1
 		self.sortTargetColumnNo=None		#並び替え対象としてアイコン表示中のカラム番号
+		self.rowCache=collections.OrderedDict()	#仮想リストで使う、browsableObject→整形済みの行のタプル
+		self.itemLabels={}					#(browsableObject,カラム番号)→表示を差し替える文字列
+		self.checkedItemAttr=None
 		if self.environment=={}:
 			self.environment["markedPlace"]=None		#マークフォルダ
 			self.environment["selectedItemCount"]=None	#選択中のアイテム数。0or1or2=2以上。
@@ -165,11 +175,17 @@ class FalconTabBase(object):
 	def InstallListCtrl(self,creator,existing_listctrl=None):
 		"""指定された親パネルの子供として、このタブ専用のリストコントロールを生成する。"""
 		if existing_listctrl is None:
-			self.hListCtrl=creator.ListCtrl(1,wx.EXPAND,style=wx.LC_REPORT | wx.LC_EDIT_LABELS | wx.LC_ALIGN_LEFT)
+			virtual=globalVars.app.config.getboolean("view","virtual_list",True)
+			self.hListCtrl=creator.ListCtrl(1,wx.EXPAND,virtual=virtual,style=wx.LC_REPORT | wx.LC_EDIT_LABELS | wx.LC_ALIGN_LEFT)
 			creator.GetPanel().Layout()
 		else:
 			self.hListCtrl=existing_listctrl
 		#end リストコントロールを再利用する
+		if self.hListCtrl.IsVirtual():
+			self.hListCtrl.SetDataSource(self)
+			self.checkedItemAttr=wx.ItemAttr()
+			self.checkedItemAttr.SetBackgroundColour("#0000FF")
+		#end 仮想リスト
 
 		#D&Dの受け入れ
 		self.hListCtrl.SetDropTarget(DropTarget(self))
@@ -313,8 +329,10 @@ class FalconTabBase(object):
 
 		#カラムの並び替え設定を反映
 		try:
-			self.hListCtrl.SetColumnsOrder(json.loads(globalVars.app.config[lst.__class__.__name__]["columns_order"]))
-		except (json.decoder.JSONDecodeError,TypeError):
+			order=json.loads(globalVars.app.config[lst.__class__.__name__]["columns_order"])
+			if len(order)!=len(lst.columns): raise ValueError("column count changed")#カラムが増えた
+			self.hListCtrl.SetColumnsOrder(order)
+		except (json.decoder.JSONDecodeError,TypeError,ValueError):
 			self._updateColumnConfig(type(lst))		#configが壊れているので初期値リセット
 	#end SetListColumns
 
@@ -343,16 +361,30 @@ class FalconTabBase(object):
 		self.DeleteAllItems()
 
 		t=misc.Timer()
-		for elem in content:
-			self._AppendElement(elem)
-		#end 追加
+		if self.hListCtrl.IsVirtual():
+			#仮想リストでは、表示する行の分だけ後から取得されるので、件数を設定するだけ
+			self.hListCtrl.SetItemCount(len(content))
+		else:
+			for elem in content:
+				self._AppendElement(elem)
+			#end 追加
+		#end 仮想リストかどうか
 		self.log.debug("List control updated in %f seconds." % t.elapsed)
 
 	def _AppendElement(self,elem,index=-1):
 		"""
 			browsableObjectを指定して、リストに追加する
 			indexは検索結果一覧でフォルダを正しい位置に挿入するために利用
+			仮想リストでは、elem は先に listObject へ追加しておくこと。
 		"""
+		if self.hListCtrl.IsVirtual():
+			focused=self.hListCtrl.GetFocusedItem()
+			self.hListCtrl.SetItemCount(len(self.listObject))
+			if index>=0 and focused>=index:
+				self._ShiftSelection(index)
+			#end 選択中の項目より前に挿入した
+			return
+		#end 仮想リスト
 		if index>=0:
 			index=self.hListCtrl.InsertItem(index,"")
 			i=0
@@ -367,17 +399,98 @@ class FalconTabBase(object):
 				self.hListCtrl.SetItemImage(index,iconIndex,iconIndex)
 
 	def GetIconIndex(self,hIcon):
-		"""同じhIconから作ったアイコンをImageListに複数追加しようとするとエラーとなるので対策。"""
-		if hIcon in self.iconNumbers:
-			return self.iconNumbers[hIcon]
+		"""
+			同じアイコンをImageListに複数追加しないための対策。キャッシュ(filetypes_cach)から得たアイコンは、ハンドルの値ではなくキャッシュのキーで覚える。ハンドルの値は、破棄された後で別のアイコンに使い回されることがあるため。
+			hIconはアプリ全体のキャッシュが管理しているので、wx.Iconにはコピーを渡す。wx.Iconは破棄されるときにハンドルも破棄してしまうため。
+		"""
+		key=getattr(hIcon,"key",hIcon)
+		if key in self.iconNumbers:
+			return self.iconNumbers[key]
 		else:
+			try:
+				hCopy=win32gui.CopyIcon(hIcon)
+			except pywintypes.error:
+				return -1
 			icon=wx.Icon()
-			if icon.CreateFromHICON(hIcon):
+			if icon.CreateFromHICON(hCopy):
 				iconIndex=self.hIconList.Add(icon)
-				self.iconNumbers[hIcon]=iconIndex
+				self.iconNumbers[key]=iconIndex
 				return iconIndex
+			win32gui.DestroyIcon(hCopy)
 			return -1
 
+	def _ShiftSelection(self,index):
+		"""
+			仮想リストで、index の位置に1行挿入された後に呼ぶ。
+			仮想リストの選択状態は行番号で管理されているので、index 以降の選択とフォーカスを1行ずらして、同じ項目を指し続けるようにする。
+		"""
+		focused=self.hListCtrl.GetFocusedItem()
+		for i in reversed(self._GetSelectedItems(True)):
+			if i<index: break
+			self.hListCtrl.Select(i,0)
+			self.hListCtrl.Select(i+1)
+		#end 選択をずらす
+		if focused>=index and focused+1<self.hListCtrl.GetItemCount():
+			self.hListCtrl.Focus(focused+1)
+
+	def _GetRowTuple(self,elem):
+		"""仮想リストで、elem の表示用タプルを返す。最近使った ROW_CACHE_SIZE 行分だけ保持しておく。"""
+		try:
+			self.rowCache.move_to_end(elem)
+			return self.rowCache[elem]
+		except KeyError:
+			pass
+		#end キャッシュにあった
+		row=elem.GetListTuple()
+		self.rowCache[elem]=row
+		if len(self.rowCache)>ROW_CACHE_SIZE: self.rowCache.popitem(last=False)
+		return row
+
+	def OnGetItemText(self,item,column):
+		"""仮想リストから、表示する文字列を求められたときに呼ばれる。"""
+		elem=self.listObject.GetElement(item) if self.listObject is not None else None
+		if elem is None: return ""
+		label=self.itemLabels.get((elem,column))
+		if label is not None: return label
+		row=self._GetRowTuple(elem)
+		if column>=len(row): return ""
+		return str(row[column])
+
+	def OnGetItemImage(self,item):
+		"""仮想リストから、表示するアイコンの番号を求められたときに呼ばれる。"""
+		elem=self.listObject.GetElement(item) if self.listObject is not None else None
+		if elem is None or elem.hIcon<0: return -1
+		return self.GetIconIndex(elem.hIcon)
+
+	def OnGetItemAttr(self,item):
+		"""仮想リストから、行の表示属性を求められたときに呼ばれる。チェック中の項目の背景色を変える。"""
+		if not self.checkedItem: return None
+		elem=self.listObject.GetElement(item) if self.listObject is not None else None
+		if elem in self.checkedItem: return self.checkedItemAttr
+		return None
+
+	def SetItemLabel(self,index,column,label):
+		"""指定した行・カラムの表示を、label に差し替える。差し替えた内容は、ソートで行が移動しても保たれる。"""
+		elem=self.listObject.GetElement(index)
+		self.itemLabels[(elem,column)]=label
+		self.listObject.InvalidateSortKey(elem)
+		if self.hListCtrl.IsVirtual():
+			self.hListCtrl.RefreshItem(index)
+		else:
+			self.hListCtrl.SetItem(index=index,column=column,label=label)
+		#end 仮想リストかどうか
+
+	def RefreshElement(self,index):
+		"""指定した行の項目の情報が変わったときに呼ぶ。覚えているソートキーを捨て、仮想リストでは保持している表示用の文字列も捨てて再描画する。"""
+		elem=self.listObject.GetElement(index)
+		self.listObject.InvalidateSortKey(elem)
+		self.listObject.InvalidateIndex()
+		if not self.hListCtrl.IsVirtual(): return
+		self.rowCache.pop(elem,None)
+		for key in [k for k in self.itemLabels if k[0] is elem]:
+			del self.itemLabels[key]
+		self.hListCtrl.RefreshItem(index)
+
 	def _InitIconList(self):
 		"""listCtrlにアイコン設定する準備"""
 		if self.listObject==None:
@@ -536,15 +649,14 @@ class FalconTabBase(object):
 				self.checkedItem.discard(item)
 				if len(items)==1 and strict==None:
 					globalVars.app.say(_("チェック解除"), interrupt=True)
-				self.hListCtrl.SetItemBackgroundColour(index,"#000000")
+				self._SetCheckedColour(index,False)
 			else:				#チェック
 				if len(items)==1:
 					globalVars.app.say(_("チェック"), interrupt=True)
 					if not strict:
 						globalVars.app.PlaySound(globalVars.app.config["sounds"]["check"])
 				self.checkedItem.add(item)
-				self.hListCtrl.SetItemBackgroundColour(index,"#0000FF")
-				self.hListCtrl.RefreshItem(index)
+				self._SetCheckedColour(index,True)
 			#カーソルを１つ下へ移動
 			if len(items)==1 and index!=len(self.listObject)-1:		#カーソルが一番下以外にある時
 				#self.hListCtrl.SetItemState(item,0,wx.LIST_STATE_SELECTED)
@@ -553,14 +665,24 @@ class FalconTabBase(object):
 		globalVars.app.hMainView.menu.Enable(menuItemsStore.getRef("EDIT_UNMARKITEM_ALL"),self.hasCheckedItem())
 		globalVars.app.hMainView.menu.Enable(menuItemsStore.getRef("EDIT_MARKITEM_ALL"),len(self.checkedItem)!=len(self.listObject))
 
+	def _SetCheckedColour(self,index,checked):
+		"""チェック状態に合わせて、行の背景色を変える。仮想リストでは OnGetItemAttr で色が決まるので、再描画するだけ。"""
+		if not self.hListCtrl.IsVirtual():
+			self.hListCtrl.SetItemBackgroundColour(index,"#0000FF" if checked else "#000000")
+		#end 通常のリスト
+		self.hListCtrl.RefreshItem(index)
+
 	def BeginDrag(self,event):
 		data=wx.FileDataObject()
 		for f in self.GetSelectedItems():
 			data.AddFile(f.fullpath)
 
-		itemImage=self.hListCtrl.GetImageList(wx.IMAGE_LIST_SMALL).GetBitmap(
-				self.hListCtrl.GetItem(self.GetSelectedItems(True)[0]).GetImage()
-			).ConvertToImage().Scale(128,128).ConvertToBitmap()
+		first=self.GetSelectedItems(True)[0]
+		if self.hListCtrl.IsVirtual():
+			image=self.OnGetItemImage(first)
+		else:
+			image=self.hListCtrl.GetItem(first).GetImage()
+		itemImage=self.hListCtrl.GetImageList(wx.IMAGE_LIST_SMALL).GetBitmap(image).ConvertToImage().Scale(128,128).ConvertToBitmap()
 
 		i=wx.DragImage(itemImage)
 		i.BeginDrag((16,16),globalVars.app.hMainView.hFrame,True,None)
@@ -671,23 +793,110 @@ class FalconTabBase(object):
 
 	def ApplySort(self):
 		self._updateConfig()				#設定の保存
+		t=misc.Timer()
 		old=self.listObject.GetItemList()	#ソート前の並び順のリスト
+		focused=self.GetFocusedItem()
+		selected=self._GetSelectedItems(True)
+		for i in selected:
+			self.hListCtrl.Select(i,0)
+		#end 選択をいったん外す
 		self.listObject.ApplySort()			#リストオブジェクト側をソート
 		new=self.listObject.GetItemList()	#ソート後の並び順のリスト
 
-		#オブジェクトにソート後のインデックスの番号を付ける
-		for i in range(self.hListCtrl.GetItemCount()):
-			self.hListCtrl.SetItemData(i,new.index(old[i]))
+		#要素→ソート後の位置の対応表。list.index で探すと要素数の2乗の時間がかかるので、1回で作っておく
+		position={}
+		for i,elem in enumerate(new):
+			position[id(elem)]=i
+		#end for
 
-		#リストをソートする
-		self.hListCtrl.SortItems(self._compare)
+		if self.hListCtrl.IsVirtual():
+			count=self.hListCtrl.GetItemCount()
+			if count>0: self.hListCtrl.RefreshItems(0,count-1)
+		else:
+			self._ReorderRows(old,new)
+		#end 表示の並べ替え
+
+		#選択とフォーカスを、同じ項目に付け直す
+		for i in selected:
+			self.hListCtrl.Select(position[id(old[i])])
+		#end for
+		if focused>=0:
+			self.hListCtrl.Focus(position[id(old[focused])])
 
 		#画面上のソートアイコンを設定
 		self._SetSortIcon()
+		self.log.debug("List control sorted in %f seconds." % t.elapsed)
 
-	def _compare(self, item1, item2):
-		"""リストのソートでlistObjectから呼ばれる"""
-		return item1>item2
+	def ApplyListChanges(self,func):
+		"""
+			func を呼んで listObject の一部の項目を入れ替え、その結果(FileList.ApplyChanges の戻り値の形式)の分だけリストコントロールを書き換える。
+			全体を作り直さないので、残っている項目のフォーカス・選択・チェックはそのまま保たれる。func の戻り値を返す。
+		"""
+		focused=self.GetFocusedElement()
+		selected=[]
+		for i in self._GetSelectedItems(True):
+			selected.append(self.listObject.GetElement(i))
+			self.hListCtrl.Select(i,0)
+		#end 選択をいったん外す
+		ops=func()
+		if ops:
+			virtual=self.hListCtrl.IsVirtual()
+			if not virtual: self.hListCtrl.Freeze()
+			try:
+				for op,index,elem in ops:
+					self.rowCache.pop(elem,None)
+					for key in [k for k in self.itemLabels if k[0] is elem]:
+						del self.itemLabels[key]
+					#end 差し替えていた表示を捨てる
+					if virtual: continue
+					if op=="remove":
+						self.hListCtrl.DeleteItem(index)
+					else:
+						self._AppendElement(elem,index)
+						if elem in self.checkedItem: self.hListCtrl.SetItemBackgroundColour(index,"#0000FF")
+					#end 削除か挿入か
+				#end for
+			finally:
+				if not virtual: self.hListCtrl.Thaw()
+			#end finally
+			if virtual:
+				count=len(self.listObject)
+				self.hListCtrl.SetItemCount(count)
+				if count>0: self.hListCtrl.RefreshItems(0,count-1)
+			#end 仮想リスト
+			for op,index,elem in ops:
+				if op=="remove" and self.listObject.GetItemIndex(elem)<0: self.checkedItem.discard(elem)
+			#end なくなった項目のチェックを外す
+		#end 変化あり
+		for elem in selected:
+			i=self.listObject.GetItemIndex(elem)
+			if i>=0: self.hListCtrl.Select(i)
+		#end 選択を戻す
+		if focused is not None:
+			i=self.listObject.GetItemIndex(focused)
+			if i>=0: self.hListCtrl.Focus(i)
+		#end フォーカスを戻す
+		return ops
+
+	def _ReorderRows(self,old,new):
+		"""仮想でないリストで、ソート前後で要素が変わった行だけ書き換える。"""
+		self.hListCtrl.Freeze()
+		try:
+			for index,elem in enumerate(new):
+				if old[index] is elem: continue
+				for column,text in enumerate(elem.GetListTuple()):
+					label=self.itemLabels.get((elem,column))
+					self.hListCtrl.SetItem(index,column,label if label is not None else str(text))
+				#end カラム
+				iconIndex=self.GetIconIndex(elem.hIcon) if elem.hIcon>=0 else -1
+				self.hListCtrl.SetItemImage(index,iconIndex,iconIndex)
+				checked=elem in self.checkedItem
+				if checked!=(old[index] in self.checkedItem):
+					self.hListCtrl.SetItemBackgroundColour(index,"#0000FF" if checked else "#000000")
+			#end for
+		finally:
+			self.hListCtrl.Thaw()
+		#end finally
 
 	def _cancelBackgroundTasks(self):
 		"""フォルダ容量計算など、バックグラウンドで走っていて、ファイルリストが更新されるといらなくなるようなものをキャンセルする。"""
@@ -791,6 +1000,8 @@ class FalconTabBase(object):
 		self._cancelBackgroundTasks()
 		self.StopSound()
 		self.hListCtrl.DeleteAllItems()
+		self.rowCache.clear()
+		self.itemLabels.clear()
 		self.checkedItem=set()
 		self.hilightIndex=-1
 		self.ItemSelected()			#メニューバーのアイテムの状態更新処理。選択中アイテムがいったん0になってるため必要
@@ -935,6 +1146,7 @@ class FalconTabBase(object):
 	def Preview(self):
 		ext=self.GetFocusedElement().fullpath.split(".")[-1].lower()
 		if ext in constants.SUPPORTED_AUDIO_FORMATS:
+			globalVars.app.previewService.Cancel()
 			self.StopSound()
 			ret=globalVars.app.PlaySound(self.GetFocusedElement().fullpath,custom_location=True,volume=globalVars.app.config.getint("preview","audio_volume",100,1,300))
 			if ret==-1:
@@ -942,7 +1154,14 @@ class FalconTabBase(object):
 				return errorCodes.FILE_NOT_FOUND
 			self.stopSoundHandle=ret
 		elif misc.isDocumentExt(ext):
-			globalVars.app.say(misc.ExtractText(self.GetFocusedElement().fullpath), interrupt=True)
+			path=self.GetFocusedElement().fullpath
+			if misc.isPlainTextExt(ext):
+				maxBytes=self._GetPreviewMaxBytes()
+				func=lambda: documentText.ReadHeadText(path,maxBytes)
+			else:
+				func=lambda: misc.ExtractText(path)
+			#end プレーンテキスト
+			self._RequestPreview(func,lambda text: globalVars.app.say(text, interrupt=True))
 		else:
 			globalVars.app.say(_("プレビューに対応していないファイル形式です。"), interrupt=True)
 
@@ -953,10 +1172,15 @@ class FalconTabBase(object):
 			return
 		#end 非対応
 		ln=globalVars.app.config.getint("preview","header_line_count",10,1,100)
-		s=misc.ExtractText(self.GetFocusedElement().fullpath).split("\n")
-		if len(s)>ln: s=s[0:ln]
+		path=self.GetFocusedElement().fullpath
+		if misc.isPlainTextExt(ext):
+			maxBytes=self._GetPreviewMaxBytes()
+			func=lambda: documentText.ReadHeadLines(path,ln,maxBytes)
+		else:
+			func=lambda: misc.ExtractText(path).split("\n")[:ln]
+		#end プレーンテキスト
 		prefix=_("先頭%(ln)d行") % {'ln': ln}
-		globalVars.app.say("%s %s" % (prefix,"\n".join(s)), interrupt=True)
+		self._RequestPreview(func,lambda s: globalVars.app.say("%s %s" % (prefix,"\n".join(s)), interrupt=True))
 
 	def ReadFooter(self):
 		ext=self.GetFocusedElement().fullpath.split(".")[-1].lower()
@@ -965,10 +1189,39 @@ class FalconTabBase(object):
 			return
 		#end 非対応
 		ln=globalVars.app.config.getint("preview","footer_line_count",10,1,100)
-		s=misc.ExtractText(self.GetFocusedElement().fullpath).split("\n")
-		if len(s)>10: s=s[-10:]
+		path=self.GetFocusedElement().fullpath
+		if misc.isPlainTextExt(ext):
+			maxBytes=self._GetPreviewMaxBytes()
+			func=lambda: documentText.ReadTailLines(path,ln,maxBytes)
+		else:
+			func=lambda: misc.ExtractText(path).split("\n")[-ln:]
+		#end プレーンテキスト
 		prefix=_("末尾%(ln)d行") % {'ln': ln}
-		globalVars.app.say("%s %s" % (prefix,"\n".join(s)), interrupt=True)
+		self._RequestPreview(func,lambda s: globalVars.app.say("%s %s" % (prefix,"\n".join(s)), interrupt=True))
+
+	def _GetPreviewMaxBytes(self):
+		"""プレーンテキストのプレビューで、読み込むバイト数の上限。"""
+		return globalVars.app.config.getint("preview","max_kb",1024,1,1048576)*1024
+
+	def _RequestPreview(self,func,onResult):
+		"""
+			func をプレビュー用のスレッドで実行し、戻り値を onResult に渡す。
+			preview/latency_budget_ms を過ぎても終わらなければ、先に読み込み中であることを知らせる。
+		"""
+		requestId=globalVars.app.previewService.Request(func,lambda requestId,ret: wx.CallAfter(self._onPreviewResult,requestId,ret,onResult))
+		budget=globalVars.app.config.getint("preview","latency_budget_ms",300,0,10000)
+		if budget>0: wx.CallLater(budget,self._onPreviewBudgetExceeded,requestId)
+
+	def _onPreviewBudgetExceeded(self,requestId):
+		if globalVars.app.previewService.IsPending(requestId): globalVars.app.say(_("読み込み中"), interrupt=True)
+
+	def _onPreviewResult(self,requestId,ret,onResult):
+		if not globalVars.app.previewService.IsCurrent(requestId): return#後から別の要求があった
+		if ret is None:
+			globalVars.app.say(_("読み込みに失敗しました。"), interrupt=True)
+			return
+		#end 失敗
+		onResult(ret)
 
 	def ReadListItemNumber(self,short=False):
 		return errorCodes.NOT_SUPPORTED
@@ -1061,11 +1314,8 @@ class FalconTabBase(object):
 			#end 探索
 		#end さっきフォーカスしてた項目がなくなってた
 		#カーソルをどの項目に動かすか分かった
-		focus_index=0
-		for elem in self.listObject:
-			if elem.fullpath==new_cursor_path: break
-			focus_index+=1
-		#end 検索
+		focus_index=self.listObject.GetIndexByPath(new_cursor_path)
+		if focus_index<0: return len(self.listObject)
 		return focus_index
 
 
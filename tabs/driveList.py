@@ -38,7 +38,9 @@ class DriveListTab(base.FalconTabBase):
 		"MOVE_TOPFILE",
 		"MOVE_OPEN_HERE_",
 		"TOOL_DIRCALC",
+		"TOOL_DIRCALC_REFRESH",
 		"TOOL_HASHCALC",
+		"TOOL_SIZEREPORT",
 		"TOOL_ADDPATH",
 		"TOOL_EXEC_PROGRAM",
 		"READ_CONTENT_PREVIEW",
@@ -8,17 +8,18 @@
 ファイルリストやドライブ一覧リストなどです。一通りのファイル操作を行うことができます。
 """
 
-import datetime
 import os
 import gettext
-import time
 import wx
 import clipboard
+import copyEngine
 import errorCodes
 import lists
 import browsableObjects
+import directoryWatcher
 import globalVars
 import fileOperator
+import menuItemsStore
 import misc
 import views.OperationSelecter
 import workerThreads
@@ -38,6 +39,85 @@ class FileListTab(base.FalconTabBase):
 		"TOOL_EJECT_DEVICE"
 	]
 
+	def __init__(self,environment):
+		super().__init__(environment)
+		self.watcher=None			#表示中のフォルダを監視する directoryWatcher
+		self.pendingChanges=set()	#まだ反映していない、変化のあった名前。None なら全体を比べ直す
+
+	def Update(self,lst,cursor=-1):
+		super().Update(lst,cursor)
+		self._StartWatcher()
+
+	def _StartWatcher(self):
+		"""表示中のフォルダの監視を始める。ファイル一覧以外(検索結果など)では監視しない。"""
+		self._StopWatcher()
+		if type(self.listObject) is not lists.FileList: return
+		if not globalVars.app.config.getboolean("browse","watch_directory",True): return
+		self.watcher=directoryWatcher.CreateWatcher(
+			self.listObject.rootDirectory,
+			self._onDirectoryChanged,
+			globalVars.app.config.getint("browse","watch_interval_ms",200,0,10000)/1000,
+			globalVars.app.config.getint("browse","watch_polling_interval_ms",2000,100,60000)/1000
+		)
+
+	def _StopWatcher(self):
+		if self.watcher is not None:
+			self.watcher.Stop()
+			self.watcher=None
+		#end 監視中
+		self.pendingChanges=set()
+
+	def _onDirectoryChanged(self,watcher,names):
+		"""監視スレッドから呼ばれる。"""
+		wx.CallAfter(self._receiveDirectoryChanges,watcher,names)
+
+	def _receiveDirectoryChanges(self,watcher,names):
+		"""フォルダの変化を、変わった行だけに反映する。names が None の場合は、フォルダ全体を比べ直す。"""
+		if watcher is not self.watcher: return#もう別のフォルダを見ている
+		if self.pendingChanges is not None:
+			if names is None:
+				self.pendingChanges=None
+			else:
+				self.pendingChanges|=names
+		#end 溜めておく
+		if self.isRenaming: return#編集中に行が動くと、編集がキャンセルされてしまうので、終わってから反映する
+		names=self.pendingChanges
+		self.pendingChanges=set()
+		globalVars.app.directorySizeEngine.Invalidate([self.listObject.rootDirectory])#ファイルが書き換わっただけでは、フォルダの更新日時は変わらない
+		if names is None:
+			ops=self.ApplyListChanges(self.listObject.Synchronize)
+		else:
+			ops=self.ApplyListChanges(lambda: self.listObject.ApplyChanges(names))
+		#end 全体か一部か
+		if ops is None:#フォルダが消えた
+			self._StopWatcher()
+			return
+		#end 監視できなくなった
+		if ops:
+			globalVars.app.hMainView.menu.Enable(menuItemsStore.getRef("EDIT_UNMARKITEM_ALL"),self.hasCheckedItem())
+			globalVars.app.hMainView.menu.Enable(menuItemsStore.getRef("EDIT_MARKITEM_ALL"),len(self.checkedItem)!=len(self.listObject))
+		#end 変化あり
+
+	def UpdateFilelist(self,silence=False,cursorTargetName=""):
+		"""ファイル一覧では、列挙し直した結果と比べて、変わった行だけを書き換える。"""
+		if type(self.listObject) is not lists.FileList or not globalVars.app.config.getboolean("browse","incremental_update",True):
+			return super().UpdateFilelist(silence,cursorTargetName)
+		if silence==False:
+			globalVars.app.say(_("更新"), interrupt=True)
+		self.pendingChanges=set()#全体を比べ直すので、溜まっている通知はいらない
+		ops=self.ApplyListChanges(self.listObject.Synchronize)
+		if ops is None:#開けなくなった
+			return super().UpdateFilelist(True,cursorTargetName)
+		self.OnUpdate()
+		if cursorTargetName!="":
+			cursor=self.listObject.Search(cursorTargetName,0)
+			if cursor>=0: self.Focus(cursor)
+		#end ターゲットが指定されている
+
+	def OnClose(self):
+		self._StopWatcher()
+		super().OnClose()
+
 	def OnLabelEditEnd(self,evt):
 		"""
 			ファイル名変更の入力終了イベント
@@ -45,6 +125,9 @@ class FileListTab(base.FalconTabBase):
 		"""
 		self.isRenaming=False
 		self.parent.SetShortcutEnabled(True)
+		if self.pendingChanges!=set():#編集中に溜まったフォルダの変化を、後で反映する
+			wx.CallAfter(self._receiveDirectoryChanges,self.watcher,set())
+		#end 溜まっている
 		if evt.IsEditCancelled():		#ユーザによる編集キャンセル
 			return
 		e=self.hListCtrl.GetEditControl()
@@ -73,6 +156,7 @@ class FileListTab(base.FalconTabBase):
 			f.fullpath=os.path.join(f.directory,f.basename)
 		if isinstance(f,browsableObjects.Stream):
 			f.fullpath=f.file+f.basename
+		self.RefreshElement(self.GetFocusedItem())
 	#end onLabelEditEnd
 
 	def ChangeAttribute(self,attrib_checks):
@@ -137,6 +221,7 @@ class FileListTab(base.FalconTabBase):
 		inst={"operation": "trash", "target": target}
 		op=fileOperator.FileOperator(inst)
 		ret=op.Execute()
+		globalVars.app.directorySizeEngine.Invalidate(target,True)
 		if op.CheckSucceeded()==0:
 			dialog(_("エラー"),_("ファイルをゴミ箱に移動できませんでした。"))
 			return
@@ -163,6 +248,7 @@ class FileListTab(base.FalconTabBase):
 		inst={"operation": "delete", "target": target}
 		op=fileOperator.FileOperator(inst)
 		ret=op.Execute()
+		globalVars.app.directorySizeEngine.Invalidate(target,True)
 		if op.CheckSucceeded()==0:
 			dialog(_("エラー"),_("削除に失敗しました。"))
 			return
@@ -193,30 +279,36 @@ class FileListTab(base.FalconTabBase):
 			self.Focus(self.hListCtrl.GetItemCount()-1)
 			globalVars.app.say(_("ファイルなし"))
 
-	def DirCalc(self):
+	def DirCalc(self,refresh=False):
+		"""選択中のフォルダの容量を計算する。refresh=True なら、前に計算したときの情報を使わずに計算し直す。"""
 		lst=[]
 		for i in self.GetSelectedItems(index_mode=True):
 			elem=self.listObject.GetElement(i)
 			if isinstance(elem,browsableObjects.Folder):
-				self.hListCtrl.SetItem(index=i,column=1,label=_("<計算中>"))
-				lst.append((i,elem.fullpath))
+				self.SetItemLabel(i,1,_("<計算中>"))
+				lst.append((elem,elem.fullpath))
 			#end フォルダだったら
 		#end for
-		param={'lst': lst, 'callback': self._dirCalc_receive}
+		param={'lst': lst, 'callback': self._dirCalc_receive, 'finished_callback': self._dirCalc_finished, 'refresh': refresh}
 		self.background_tasks.append(workerThreads.RegisterTask(workerThreadTasks.DirCalc,param))
 
 	def _dirCalc_receive(self,results,taskState):
-		"""DirCalc の結果を受ける。"""
+		"""DirCalc の結果を受ける。フォルダ1つの計算が終わるごとに呼ばれる。"""
 		for elem in results:
-			self.listObject.GetElement(elem[0]).size=elem[1][0]
+			index=self.listObject.GetItemIndex(elem[0])#計算中にフォルダの中身が変わって、位置がずれているかもしれない
+			if index<0: continue
+			elem[0].size=elem[1][0]
 			if elem[1][0]>=0:
-				self.listObject.GetElement(elem[0]).fileCount=elem[1][1]
-				self.listObject.GetElement(elem[0]).dirCount=elem[1][2]
-				self.hListCtrl.SetItem(index=elem[0],column=1,label=misc.ConvertBytesTo(elem[1][0],misc.UNIT_AUTO,True))
+				elem[0].fileCount=elem[1][1]
+				elem[0].dirCount=elem[1][2]
+				self.SetItemLabel(index,1,misc.ConvertBytesTo(elem[1][0],misc.UNIT_AUTO,True))
 			else:
-				self.hListCtrl.SetItem(index=elem[0],column=1,label="<取得失敗>")
+				self.SetItemLabel(index,1,"<取得失敗>")
 		#end for
-		self.background_tasks.remove(taskState)
+
+	def _dirCalc_finished(self,taskState):
+		"""DirCalc で、全てのフォルダの計算が終わったときに呼ばれる。"""
+		if taskState in self.background_tasks: self.background_tasks.remove(taskState)#ファイルリストの更新で、先にキャンセル済みかもしれない
 
 	def ReadCurrentFolder(self):
 		curdir=os.path.basename(self.listObject.rootDirectory)
@@ -302,52 +394,28 @@ class FileListTab(base.FalconTabBase):
 		if dlg.ShowModal()==wx.ID_NO: return
 
 		#fileOperatorに処理依頼
-		inst={"operation": "past", "target": target, "to": dest, 'copy_move_flag': op}
+		inst={
+			"operation": "past",
+			"target": target,
+			"to": dest,
+			'copy_move_flag': op,
+			"copy_workers": globalVars.app.config.getint("file_operation","copy_threads",1,1,64),
+			"copy_max_workers": globalVars.app.config.getint("file_operation","copy_max_threads",32,1,64),
+			"copy_small_file_size": globalVars.app.config.getint("file_operation","copy_small_file_kb",1024,0,1048576)*1024,
+			"copy_large_file_size": globalVars.app.config.getint("file_operation","copy_large_file_mb",64,1,1048576)*1024*1024,
+			"copy_unbuffered_size": globalVars.app.config.getint("file_operation","copy_unbuffered_mb",256,0,1048576)*1024*1024,
+			"copy_verify": globalVars.app.config.getboolean("file_operation","copy_verify",False),
+			"copy_verify_algorithm": globalVars.app.config.getstring("file_operation","copy_verify_algorithm","sha1",copyEngine.HASH_ALGORITHMS)
+		}
 		op=fileOperator.FileOperator(inst)
-		ret=op.Execute()
-
-		#0.5秒待つ
-		time.sleep(0.5)
-
-		#状況確認
-		#TODO:タブに分ける処理
-		self.log.debug("Start checking confirmation")
-		confs=op.GetConfirmationManager()
-		while(True):
-			confs_list=list(confs.IterateNotResponded())
-			self.log.debug("%d confirmations." % len(confs_list))
-			if len(confs_list)==0: break
-			elem=confs_list[0]
-			e=elem.GetElement()
-			from_path=e.path
-			dest_path=e.destpath
-			from_stat=os.stat(from_path)
-			dest_stat=os.stat(dest_path)
-			info=[
-				(_("名前"),"test.txt","",""),
-				(_("サイズ"),misc.ConvertBytesTo(dest_stat.st_size,misc.UNIT_AUTO,True),"→",misc.ConvertBytesTo(from_stat.st_size,misc.UNIT_AUTO,True)),
-				(_("更新日時"),datetime.datetime.fromtimestamp(dest_stat.st_mtime),"→",datetime.datetime.fromtimestamp(from_stat.st_mtime))
-			]
-			d=views.OperationSelecter.Dialog(_("上書きしますか？"),info,views.OperationSelecter.GetMethod("ALREADY_EXISTS"),False)
-			d.Initialize()
-			d.Show()
-			val=d.GetValue()
-			if val['all'] is True:#「以降も同様に処理」がオン
-				confs.RespondAll(elem,val['response'])
-			else:#この1件だけ
-				elem.SetResponse(d.GetValue())#渓谷に対して、文字列でレスポンスする
-			#end これ以降全てかこれだけか
-		#end while
-		self.log.debug("End checking confirmation.")
-		op.UpdateConfirmation()#これで繁栄する
-		op.Execute()#これでコピーを再実行
-
-		if op.CheckSucceeded()==0 and ret==0:
-			dialog(_("エラー"),_("%(op)sに失敗しました。" % {'op': op_str}))
-		#end failure
-		self.UpdateFilelist(silence=True)
+		#進捗のタブで、バックグラウンドで実行する。上書きの確認も、そのタブで行う
+		globalVars.app.hMainView.Navigate({'action': 'past', 'operator': op, 'basePath': os.path.dirname(target[0]), 'to': dest, 'opString': op_str, 'callback': self._onPastFinished},as_new_tab=True)
 	#end past
 
+	def _onPastFinished(self):
+		"""貼り付けが終わったら、一覧を更新する。タブがもう閉じられていれば、何もしない。"""
+		if self in globalVars.app.hMainView.tabs: self.UpdateFilelist(silence=True)
+
 	def GetTabName(self):
 		"""タブコントロールに表示する名前"""
 		word=os.path.basename(self.listObject.rootDirectory)
@@ -27,3 +27,9 @@ class GrepResultTab(searchResultTabBase.SearchResultTabBase):
 
 	def ReadListInfo(self):
 		globalVars.app.say(_("%(keyword)sのファイル内容検索結果を %(sortkind)sの%(sortad)sで一覧中、 %(max)d個中 %(current)d個目") %{'keyword': self.listObject.GetKeywordString(), 'sortkind': self.listObject.GetSortKindString(), 'sortad': self.listObject.GetSortAdString(), 'max': len(self.listObject), 'current': self.GetFocusedItem()+1}, interrupt=True)
+
+	def OnClose(self):
+		"""検索の後に始めた全文索引の更新が終わっていなければ、それも止める。"""
+		super().OnClose()
+		self.listObject.CancelIndexUpdate()
+		self.tempListObject.CancelIndexUpdate()
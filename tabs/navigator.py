@@ -19,7 +19,7 @@ import globalVars
 import constants
 import misc
 import views.ViewCreator
-from . import fileList,driveList,streamList,searchResult,grepResult,NetworkResourceList,pastProgress
+from . import fileList,driveList,streamList,searchResult,grepResult,NetworkResourceList,pastProgress,sizeReport
 from simpleDialog import dialog
 
 log=logging.getLogger("falcon.navigator")
@@ -40,20 +40,29 @@ def Navigate(target,cursor="",previous_tab=None,create_new_tab_info=None,environ
 		if target['action']=='search':
 			newtab=searchResult.SearchResultTab(environment)
 			newtab.Initialize(parent,creator)
-			newtab.StartSearch(target['basePath'],target['out_lst'],target['keyword'], target['isRegularExpression'])
+			newtab.StartSearch(target['basePath'],target['out_lst'],target['keyword'], target['isRegularExpression'],target.get('filter'),target.get('walkTask'))
 		#end 検索
 		if target['action']=='grep':
 			newtab=grepResult.GrepResultTab(environment)
 			newtab.Initialize(parent,creator)
-			newtab.StartSearch(target['basePath'],target['out_lst'],target['keyword'], target['isRegularExpression'])
+			newtab.StartSearch(target['basePath'],target['out_lst'],target['keyword'], target['isRegularExpression'],target.get('filter'),target.get('walkTask'))
 		#end grep検索
 		if target['action']=='past':
 			newtab=pastProgress.PastProgressTab(environment)
 			newtab.Initialize(parent,creator)
-			lst=lists.PastProgressList()
-			lst.Initialize()
-			newtab.Update(lst)
+			if 'operator' in target:
+				newtab.StartOperation(target['operator'],target['basePath'],target['to'],target['opString'],target.get('callback'))
+			else:
+				lst=lists.PastProgressList()
+				lst.Initialize()
+				newtab.Update(lst)
+			#end 実行する貼り付けがある
 		#end 貼り付け
+		if target['action']=='sizeReport':
+			newtab=sizeReport.SizeReportTab(environment)
+			newtab.Initialize(parent,creator)
+			newtab.StartScan(target['basePath'])
+		#end 容量の大きい項目の一覧
 		#かならずviews.Main.Navigateを経由して呼び出されているはず
 		return newtab
 	#end targetが辞書の時の特殊処理
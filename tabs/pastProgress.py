@@ -6,22 +6,35 @@
 
 """
 コピー/貼り付けの進捗状況を表示するタブ。
+貼り付けはバックグラウンドで実行し、進捗率、速度、残り時間を、一定の間隔でヘッダに表示し直します。タブを閉じると、貼り付けをキャンセルします。
 """
 
+import datetime
+import os
 import wx
 
 import errorCodes
 import globalVars
+import lists
 import misc
 import StringUtil
 import tabs
 import simpleDialog
+import views.OperationSelecter
 
 from . import base
 
+#進捗を表示し直す間隔(ミリ秒)
+PROGRESS_INTERVAL=500
+
 class PastProgressTab(base.FalconTabBase):
 	def Initialize(self,parent,creator,existing_listctrl=None):
 		super().Initialize(parent,creator,existing_listctrl)
+		self.operator=None		#実行中の fileOperator.FileOperator
+		self.poller=None		#進捗を表示し直す wx.CallLater
+		self.opString=""
+		self.onFinished=None
+		self.resumed=False		#確認に応答して、続きを実行しているかどうか
 	blockMenuList=[
 		"FILE_RENAME",
 		"FILE_CHANGEATTRIBUTE",
@@ -49,13 +62,110 @@ class PastProgressTab(base.FalconTabBase):
 		"READ_CONTENT_READHEADER",
 		"READ_CONTENT_READFOOTER",
 		"TOOL_DIRCALC",
+		"TOOL_DIRCALC_REFRESH",
 		"TOOL_HASHCALC",
+		"TOOL_SIZEREPORT",
 		"TOOL_ADDPATH",
 		"TOOL_EJECT_DRIVE",
 		"TOOL_EJECT_DEVICE",
 		"VIEW_DRIVE_INFO",
 	]
 
+	def StartOperation(self,op,source,dest,opString,onFinished=None):
+		"""
+			op (貼り付けの fileOperator.FileOperator) をバックグラウンドで実行し、進捗をヘッダに表示する。
+			確認が必要な項目があれば、実行が終わってから問い合わせ、応答を反映して続きを実行する。全て終わったら、 onFinished() を呼ぶ。
+		"""
+		self.operator=op
+		self.opString=opString
+		self.onFinished=onFinished
+		lst=lists.PastProgressList()
+		lst.InitializeOperation(source,dest,_("%(dest)s に%(op)sしています") % {'dest': dest, 'op': opString})
+		self.Update(lst)
+		self._execute()
+
+	def _execute(self):
+		self.operator.Execute(threaded=True)
+		self.poller=wx.CallLater(PROGRESS_INTERVAL,self._poll)
+
+	def _poll(self):
+		"""進捗をヘッダに表示し直す。実行が終わっていれば、後処理をする。"""
+		self.poller=None
+		if self.operator is None: return#タブが閉じられた
+		self.listObject.header.SetProgress(*self.operator.GetProgress())
+		self._refreshHeader()
+		if self.operator.working:
+			self.poller=wx.CallLater(PROGRESS_INTERVAL,self._poll)
+			return
+		#end 実行中
+		if not self.resumed and not self.operator.canceled and self._confirm():
+			self.resumed=True
+			self.operator.UpdateConfirmation()#これで反映する
+			self._execute()#これで続きを実行
+			return
+		#end 確認した項目がある
+		self._finish()
+
+	def _confirm(self):
+		"""上書きの確認が必要な項目を問い合わせる。問い合わせた項目の数を返す。"""
+		self.log.debug("Start checking confirmation")
+		confs=self.operator.GetConfirmationManager()
+		count=0
+		while(True):
+			confs_list=list(confs.IterateNotResponded())
+			self.log.debug("%d confirmations." % len(confs_list))
+			if len(confs_list)==0: break
+			count+=1
+			elem=confs_list[0]
+			e=elem.GetElement()
+			from_path=e.path
+			dest_path=e.destpath
+			from_stat=os.stat(from_path)
+			dest_stat=os.stat(dest_path)
+			info=[
+				(_("名前"),os.path.basename(dest_path),"",""),
+				(_("サイズ"),misc.ConvertBytesTo(dest_stat.st_size,misc.UNIT_AUTO,True),"→",misc.ConvertBytesTo(from_stat.st_size,misc.UNIT_AUTO,True)),
+				(_("更新日時"),datetime.datetime.fromtimestamp(dest_stat.st_mtime),"→",datetime.datetime.fromtimestamp(from_stat.st_mtime))
+			]
+			d=views.OperationSelecter.Dialog(_("上書きしますか？"),info,views.OperationSelecter.GetMethod("ALREADY_EXISTS"),False)
+			d.Initialize()
+			d.Show()
+			val=d.GetValue()
+			if val['all'] is True:#「以降も同様に処理」がオン
+				confs.RespondAll(elem,val['response'])
+			else:#この1件だけ
+				elem.SetResponse(d.GetValue())#渓谷に対して、文字列でレスポンスする
+			#end これ以降全てかこれだけか
+		#end while
+		self.log.debug("End checking confirmation.")
+		return count
+
+	def _finish(self):
+		"""実行が全て終わったときの処理。失敗した項目を一覧に加える。"""
+		op=self.operator
+		self.operator=None
+		globalVars.app.directorySizeEngine.Invalidate([op.instructions["to"]],True)#上書きしたファイルがあっても、フォルダの更新日時は変わらない
+		header=self.listObject.header
+		header.status=_("キャンセル") if op.canceled else _("完了")
+		header.details=_("%(count)d 項目を%(op)sしました") % {'count': op.CheckSucceeded(), 'op': self.opString}
+		if not op.canceled: header.SetProgress(100,0,None)
+		for failed in op.CheckFailed():
+			self.listObject.AddFailure(failed)
+		#end for
+		self.UpdateListContent(self.listObject.GetItemList())
+		if op.CheckSucceeded()==0 and not op.canceled:
+			simpleDialog.dialog(_("エラー"),_("%(op)sに失敗しました。") % {'op': self.opString})
+		#end failure
+		if self.onFinished is not None: self.onFinished()
+
+	def _refreshHeader(self):
+		"""ヘッダの行を表示し直す。"""
+		self.RefreshElement(0)
+		if self.hListCtrl.IsVirtual(): return
+		for i,text in enumerate(self.listObject.header.GetListTuple()):
+			self.hListCtrl.SetItem(0,i,text)
+		#end for
+
 	def OpenContextMenu(self,event):
 		simpleDialog.dialog("コンテキストメニュー検討中","コンテキストメニューで、問い合わせへの応答などできるようにしたいと思ってます。")
 
@@ -67,7 +177,11 @@ class PastProgressTab(base.FalconTabBase):
 
 	def GetTabName(self):
 		"""タブコントロールに表示する名前"""
-		word="ほにゃぺけからほにゃぺけへの貼り付け"
+		if self.listObject is not None and self.listObject.header is not None:
+			word=_("%(dest)s への%(op)s") % {'dest': self.listObject.rootDirectory, 'op': self.opString}
+		else:
+			word="ほにゃぺけからほにゃぺけへの貼り付け"
+		#end 貼り付け中
 		word=StringUtil.GetLimitedString(word,globalVars.app.config["view"]["header_title_length"])
 		return word
 
@@ -75,9 +189,16 @@ class PastProgressTab(base.FalconTabBase):
 		super().DeleteAllItems()
 
 	def OnClose(self):
-		"""検索の非同期処理が実行中であればキャンセルして、終了を待機する。"""
+		"""貼り付けが実行中であれば、キャンセルする。コピーは、ファイルの塊の区切りで止まる。"""
 		super().OnClose()
-		simpleDialog.dialog("お行儀良く閉じてくださいね","タブを閉じるとキャンセルになるので、本番では、ここで終了していいかどうか確認してくださいね。")
+		if self.poller is not None:
+			self.poller.Stop()
+			self.poller=None
+		#end 表示し直す予定
+		if self.operator is not None:
+			self.operator.Cancel()
+			self.operator=None
+		#end 実行中
 
 	def OnLabelEditStart(self,evt):
 		pass
@@ -39,29 +39,41 @@ class SearchResultTabBase(tabs.fileList.FileListTab):
 		"TOOL_EXEC_PROGRAM"
 	]
 
-	def StartSearch(self,rootPath,searches,keyword, isRegularExpression):
+	def StartSearch(self,rootPath,searches,keyword, isRegularExpression,searchFilter=None,walkTaskState=None):
+		"""searches (pathWalker.PathStream) に流れてくるパスを検索する。walkTaskState には、パスをたどっているタスクを渡す。タブを閉じるときに止める。"""
+		self.walkTaskState=walkTaskState
 		self.listObject=self.listType()
-		self.listObject.Initialize(rootPath,searches,keyword, isRegularExpression)
+		self.listObject.Initialize(rootPath,searches,keyword, isRegularExpression,searchFilter=searchFilter)
 		self.tempListObject=self.listType()
-		self.tempListObject.Initialize(rootPath,searches,keyword, isRegularExpression)
+		self.tempListObject.Initialize(rootPath,searches,keyword, isRegularExpression,searchFilter=searchFilter)
 		self.SetListColumns(self.listObject)
 		self._InitIconList()
-		self.taskState=workerThreads.RegisterTask(workerThreadTasks.PerformSearch,{'listObject': self.tempListObject, 'tabObject': self})
+		self.taskState=workerThreads.RegisterTask(workerThreadTasks.PerformSearch,self._MakeSearchParam(self.tempListObject))
 
 		#タブの名前変更を通知
 		globalVars.app.hMainView.UpdateTabName()
 
+	def _MakeSearchParam(self,listObject):
+		"""PerformSearch に渡すパラメータを作る。"""
+		return {
+			'listObject': listObject,
+			'tabObject': self,
+			'batch_interval': globalVars.app.config.getint("search","batch_interval_ms",50,0,1000)/1000,
+			'batch_size': globalVars.app.config.getint("search","batch_size",500,1,100000)
+		}
+
 	def _onSearchHitCallback(self,hits):
 		"""コールバックで、ヒットしたオブジェクトのリストが降ってくるので、それをリストビューに追加していく。"""
 		globalVars.app.PlaySound("click.ogg")
 		for elem in hits:
+			#仮想リストは listObject から表示内容を取るので、先に listObject へ追加する
 			if isinstance(elem,browsableObjects.Folder):
+				self.listObject.folders.append(elem)
 				self._AppendElement(elem,self.folderCount)
 				self.folderCount+=1
-				self.listObject.folders.append(elem)
 			else:
-				self._AppendElement(elem)
 				self.listObject.lists[-1].append(elem)
+				self._AppendElement(elem)
 		#end 追加
 		if self.tempListObject.GetFinishedStatus() and self.hListCtrl.GetItemCount()==len(self.tempListObject):
 			#ここはcallAfterで実行されるため、検索修了時点でCallAfterのキューに２つ以上のこの関数が貯まってるとソートが２回発生して画面とリストがずれるので条件を二重にして対策した
@@ -77,9 +89,10 @@ class SearchResultTabBase(tabs.fileList.FileListTab):
 		if silence==False:
 			globalVars.app.say(_("再建策"), interrupt=True)
 		#end not silence
+		self._cancelWalk()#たどり終わっているはずだが、念のため
 		self.DeleteAllItems()
 		self.listObject.RedoSearch()
-		workerThreads.RegisterTask(workerThreadTasks.PerformSearch,{'listObject': self.listObject, 'tabObject': self})
+		self.taskState=workerThreads.RegisterTask(workerThreadTasks.PerformSearch,self._MakeSearchParam(self.listObject))
 
 	def GoForward(self,stream,admin=False):
 		"""検索結果表示では、フォルダを開くときに別タブを生成する。"""
@@ -134,9 +147,18 @@ class SearchResultTabBase(tabs.fileList.FileListTab):
 		self.folderCount=0
 
 	def OnClose(self):
-		"""検索の非同期処理が実行中であればキャンセルして、終了を待機する。"""
+		"""検索の非同期処理が実行中であればキャンセルして、終了を待機する。パスをたどっている途中なら、それも止める。"""
 		super().OnClose()
 		if self.taskState.GetFinishState() is not True:
 			self.taskState.Cancel(wait=True)
 		#end 待つ
+		self.listObject.searches.Abandon()#もう読まないので、キューが空くのを待っている場合も止まるようにする
+		self._cancelWalk()
 	#end OnClose
+
+	def _cancelWalk(self):
+		"""パスをたどるタスクが終わっていなければ止める。"""
+		if self.walkTaskState is not None and self.walkTaskState.GetFinishState() is not True:
+			self.walkTaskState.Cancel()
+		#end たどっている途中
+
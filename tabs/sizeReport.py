@@ -0,0 +1,124 @@
+﻿# -*- coding: utf-8 -*-
+#Falcon size report tab
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+ドライブやフォルダの中で、容量の大きいフォルダとファイルを一覧します。フォルダのサイズは、中身の合計です。
+一覧を作る前に全体を1回たどるので、大きなドライブでは時間がかかります。前回の結果が保存されていれば、まずそれを表示します。更新すると、たどり直します。
+"""
+
+import browsableObjects
+import errorCodes
+import globalVars
+import lists
+import misc
+import StringUtil
+import tabs
+import workerThreads
+import workerThreadTasks
+
+class SizeReportTab(tabs.fileList.FileListTab):
+	"""容量の大きい項目の一覧が表示されているタブ。"""
+
+	blockMenuList=[
+		"FILE_MKDIR",
+		"EDIT_PAST",
+		"EDIT_SEARCH",
+		"MOVE_BACKWARD",
+		"MOVE_HIST_PREV",
+		"MOVE_HIST_NEXT",
+		"MOVE_MARKSET",
+		"MOVE_MARK",
+		"TOOL_ADDPATH",
+		"TOOL_EJECT_DRIVE",
+		"TOOL_EJECT_DEVICE",
+		"TOOL_EXEC_PROGRAM",
+		"TOOL_SIZEREPORT"
+	]
+
+	#内部で利用するリストの種類を定義
+	listType = lists.SizeReportList
+
+	def __init__(self,environment):
+		super().__init__(environment)
+		self.taskState=None
+
+	def StartScan(self,rootPath):
+		"""rootPath の一覧を作り始める。保存した結果があれば、それを使う。"""
+		self.listObject=self.listType()
+		self.listObject.Initialize(rootPath)
+		self.SetListColumns(self.listObject)
+		self._InitIconList()
+		self._scan(True)
+
+		#タブの名前変更を通知
+		globalVars.app.hMainView.UpdateTabName()
+
+	def _scan(self,reuse):
+		count=globalVars.app.config.getint("size_report","top_count",100,1,10000)
+		self.taskState=workerThreads.RegisterTask(workerThreadTasks.BuildSizeTree,{
+			'path': self.listObject.rootDirectory,
+			'reuse': reuse,
+			'count': count,
+			'max_files': count,
+			'count_hardlinks_once': globalVars.app.config.getboolean("size_report","count_hardlinks_once",False),
+			'callback': self._onScanFinished
+		})
+
+	def _onScanFinished(self,lst,taskState):
+		if taskState is not self.taskState: return#もう次の一覧を作り始めている
+		globalVars.app.PlaySound("complete.ogg")
+		self.Update(lst)
+		globalVars.app.say(_("%(dir)s の合計 %(size)s") % {'dir': lst.rootDirectory, 'size': misc.ConvertBytesTo(lst.tree.GetSizeByIndex(0)[0],misc.UNIT_AUTO,True)})
+
+	def IsScanning(self):
+		return self.taskState is not None and self.taskState.GetFinishState() is not True
+
+	def UpdateFilelist(self,silence=False,cursorTargetName=""):
+		"""全体をたどり直して、一覧を作り直す。非同期処理なので、cursorTargetNameは使用されない。"""
+		if self.IsScanning():
+			globalVars.app.say(_("現在集計中です。"), interrupt=True)
+			return
+		#end まだ終わってない
+		if silence==False:
+			globalVars.app.say(_("再集計"), interrupt=True)
+		#end not silence
+		self._scan(False)
+
+	def GoForward(self,stream,admin=False):
+		"""フォルダは、別タブで開く。"""
+		index=self.GetFocusedItem()
+		elem=self.listObject.GetElement(index)
+		if (not stream) and (not isinstance(elem,browsableObjects.Folder)): #このファイルを開く
+			misc.RunFile(elem.fullpath,admin)
+			return
+		else:
+			#新しいタブで開く
+			globalVars.app.hMainView.Navigate(elem.fullpath,as_new_tab=True)
+		#end ファイルを開くか移動するか
+	#end GoForward
+
+	def GoBackward(self):
+		return errorCodes.BOUNDARY
+
+	def ReadCurrentFolder(self):
+		state=_("集計中") if self.IsScanning() else _("集計完了")
+		globalVars.app.say(_("%(dir)s の容量の大きい項目、%(state)s") % {'dir': self.listObject.rootDirectory, 'state': state}, interrupt=True)
+
+	def ReadListInfo(self):
+		globalVars.app.say(_("%(dir)s の容量の大きい項目を %(sortkind)sの%(sortad)sで一覧中、 %(max)d個中 %(current)d個目") %{'dir': self.listObject.rootDirectory, 'sortkind': self.listObject.GetSortKindString(), 'sortad': self.listObject.GetSortAdString(), 'max': len(self.listObject), 'current': self.GetFocusedItem()+1}, interrupt=True)
+
+	def GetTabName(self):
+		"""タブコントロールに表示する名前"""
+		word=StringUtil.GetLimitedString(self.listObject.rootDirectory,globalVars.app.config["view"]["header_title_length"])
+		return _("%(dir)sの容量") % {"dir": word}
+
+	def OnClose(self):
+		"""集計中であればキャンセルして、終了を待機する。"""
+		super().OnClose()
+		if self.IsScanning():
+			self.taskState.Cancel(wait=True)
+		#end 待つ
+	#end OnClose
@@ -39,7 +39,9 @@ class StreamListTab(base.FalconTabBase):
 		"MOVE_TOPFILE",
 		"MOVE_OPEN_HERE_",
 		"TOOL_DIRCALC",
+		"TOOL_DIRCALC_REFRESH",
 		"TOOL_HASHCALC",
+		"TOOL_SIZEREPORT",
 		"TOOL_ADDPATH",
 		"TOOL_EJECT_DRIVE",
 		"TOOL_EJECT_DEVICE",
@@ -0,0 +1,102 @@
+#大きいファイルのコピーのベンチマーク
+#大きいファイルを1つ作り、今までの方法(shutil.copyfile)と、copyEngine.CopyFile(キャッシュを通す場合と通さない場合、進捗を通知する場合)でコピーし、かかった時間を比べる。
+#コピーしたファイルが元と同じことと、キャンセルしたときに止まるまでの時間と、書きかけのファイルが残らないことも確かめる。
+#Windows の貼り付けでは CopyFileEx を使うが、塊ごとに読み書きして進捗を通知する流れは同じ。
+#使い方: python tests/benchCopyEngine.py [MB]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import filecmp
+import shutil
+import tempfile
+import threading
+import time
+
+import benchmarkUtil
+import copyEngine
+
+class TaskState(object):
+	canceled=False
+
+def MakeLargeFile(path,size):
+	block=os.urandom(1024*1024)
+	with open(path,"wb") as f:
+		for i in range(size//len(block)):
+			f.write(block)
+		#end for
+		f.write(block[:size%len(block)])
+	#end with
+
+def Copy(label,func,src,dest,size):
+	def run():
+		if os.path.exists(dest): os.remove(dest)
+		return func()
+	#end run
+	t,r=benchmarkUtil.Measure(run)
+	if not filecmp.cmp(src,dest,shallow=False): raise AssertionError("%s: the copy differs from the source" % label)
+	benchmarkUtil.Report(label,t,size/1024/1024,"MB")
+	return r
+
+def CancelLatency(src,dest):
+	"""コピーを始めてすぐにキャンセルし、止まるまでの秒数を返す。"""
+	state=TaskState()
+	started=threading.Event()
+	def progress(n):
+		started.set()
+	#end progress
+	def run():
+		try:
+			copyEngine.CopyFile(src,dest,progress=progress,taskState=state)
+		except copyEngine.CopyCanceled:
+			pass
+		finally:
+			started.set()
+		#end finally
+	#end run
+	if os.path.exists(dest): os.remove(dest)
+	thread=threading.Thread(target=run)
+	thread.start()
+	started.wait()
+	start=time.perf_counter()
+	state.canceled=True
+	thread.join()
+	t=time.perf_counter()-start
+	if os.path.exists(dest): raise AssertionError("the partial copy was left")
+	return t
+
+def main():
+	size=int(sys.argv[1])*1024*1024 if len(sys.argv)>1 else 256*1024*1024
+	work=tempfile.mkdtemp(prefix="falconbench")
+	try:
+		src=os.path.join(work,"large.bin")
+		dest=os.path.join(work,"copied.bin")
+		print("Creating a %d MB file..." % (size//1024//1024))
+		MakeLargeFile(src,size)
+		Copy("shutil.copyfile",lambda: shutil.copyfile(src,dest),src,dest,size)
+		Copy("CopyFile",lambda: copyEngine.CopyFile(src,dest),src,dest,size)
+		Copy("CopyFile, unbuffered",lambda: copyEngine.CopyFile(src,dest,unbuffered=True),src,dest,size)
+		def tracked():
+			tracker=copyEngine.ProgressTracker(size,0.05)
+			calls=[0]
+			def progress(n):
+				tracker.Add(n)
+				tracker.GetPercentage()
+				tracker.GetETA()
+				calls[0]+=1
+			#end progress
+			copyEngine.CopyFile(src,dest,progress=progress,taskState=TaskState())
+			return calls[0],tracker.GetBytesPerSecond()
+		#end tracked
+		calls,rate=Copy("CopyFile, with progress",tracked,src,dest,size)
+		print("%d progress callbacks, last measured rate %.1f MB/s" % (calls,rate/1024/1024))
+		print("Canceled within %.1f ms" % (CancelLatency(src,dest)*1000))
+		print("OK")
+	finally:
+		benchmarkUtil.Remove(work)
+	#end finally
+
+if __name__=="__main__":
+	main()
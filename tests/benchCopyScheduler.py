@@ -0,0 +1,101 @@
+#コピーのスケジューラのベンチマーク
+#小さいファイルがたくさんあるツリーを、今までの方法(1ファイルずつ順番にコピーする)と、copyScheduler.CopyScheduler でコピーし、かかった時間を比べる。
+#SMB のように、1ファイルごとに時間がかかる環境を再現したい場合は、ファイルごとの待ち時間をミリ秒で指定する。
+#使い方: python tests/benchCopyScheduler.py [ファイル数] [ファイルごとの待ち時間(ms)]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import shutil
+import tempfile
+import time
+
+import benchmarkUtil
+import copyScheduler
+
+class Element(object):
+	"""fileOperator.past.Element と同じ属性を持つ。"""
+	def __init__(self,path,destpath,isfile,size):
+		self.path=path
+		self.destpath=destpath
+		self.isfile=isfile
+		self.size=size
+
+def MakeElements(root,dest):
+	"""root 以下を、フォルダを中身より先にして並べる。"""
+	lst=[Element(root,dest,False,-1)]
+	stack=[(root,dest)]
+	while stack:
+		path,destpath=stack.pop()
+		with os.scandir(path) as it:
+			entries=sorted(it,key=lambda e: e.name)
+		#end with
+		for entry in entries:
+			if entry.is_dir():
+				lst.append(Element(entry.path,os.path.join(destpath,entry.name),False,-1))
+				stack.append((entry.path,os.path.join(destpath,entry.name)))
+			else:
+				lst.append(Element(entry.path,os.path.join(destpath,entry.name),True,entry.stat().st_size))
+			#end フォルダかファイルか
+		#end for
+	#end while
+	return lst
+
+def MakeCopy(latency):
+	def copy(elem):
+		if latency>0: time.sleep(latency)
+		shutil.copyfile(elem.path,elem.destpath)
+	#end copy
+	return copy
+
+def Serial(elements,latency):
+	"""今までの past.Execute と同じく、1つずつ順番に処理する。"""
+	copy=MakeCopy(latency)
+	done=0
+	for elem in elements:
+		if elem.isfile:
+			copy(elem)
+		else:
+			os.mkdir(elem.destpath)
+		#end ファイルかフォルダか
+		done+=1
+	#end for
+	return done
+
+def Scheduled(elements,latency,workers):
+	scheduler=copyScheduler.CopyScheduler(workers)
+	result={"done": 0,"errors": 0}
+	def onDone(elem):
+		result["done"]+=1
+	def onError(elem,err):
+		result["errors"]+=1
+	scheduler.Run(elements,MakeCopy(latency),lambda elem: os.mkdir(elem.destpath),onDone,onError)
+	if result["errors"]: print("%d errors" % result["errors"])
+	return result["done"],scheduler.peakWorkers
+
+def main():
+	count=int(sys.argv[1]) if len(sys.argv)>1 else 100000
+	latency=float(sys.argv[2])/1000 if len(sys.argv)>2 else 0
+	print("Creating a synthetic tree...")
+	filesPerDir=100
+	root,files,dirs=benchmarkUtil.MakeSyntheticTree(2,max(1,int((count/filesPerDir)**0.5)),filesPerDir,size=512)
+	print("%d files, %d directories" % (files,dirs))
+	work=tempfile.mkdtemp(prefix="falconbench")
+	try:
+		elements=MakeElements(root,os.path.join(work,"serial"))
+		t,r=benchmarkUtil.Measure(lambda: Serial(elements,latency),1)
+		benchmarkUtil.Report("serial",t,r,"items")
+		for workers in (1,4,16):
+			elements=MakeElements(root,os.path.join(work,"scheduled%d" % workers))
+			t,r=benchmarkUtil.Measure(lambda: Scheduled(elements,latency,workers),1)
+			benchmarkUtil.Report("scheduler, %2d workers (peak %d)" % (workers,r[1]),t,r[0],"items")
+		#end for
+	finally:
+		benchmarkUtil.Remove(root)
+		benchmarkUtil.Remove(work)
+	#end finally
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,80 @@
+#ディレクトリ列挙のベンチマーク
+#FileList.Initialize の旧方式(FindFiles のあと、項目ごとに SHGetFileInfo と isfile を呼ぶ)と、directoryEnumerator による1パス列挙の速度を比較する。
+#Windows 以外では、旧方式の代わりに「列挙のあと項目ごとに stat と isfile を呼ぶ」処理で比較する。
+#使い方: python tests/benchDirectoryEnumeration.py [ファイル数] [計測するフォルダ]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import benchmarkUtil
+import directoryEnumerator
+
+def LegacyWindows(path):
+	import win32api
+	from win32com.shell import shell, shellcon
+	n=0
+	for elem in win32api.FindFiles(os.path.join(path,"*")):
+		if elem[8]=="." or elem[8]=="..": continue
+		fullpath=os.path.join(path,elem[8])
+		shell.SHGetFileInfo(fullpath,0,shellcon.SHGFI_ICON | shellcon.SHGFI_TYPENAME)
+		os.path.isfile(fullpath)
+		n+=1
+	#end for
+	return n
+
+def LegacyPortable(path):
+	n=0
+	for name in os.listdir(path):
+		fullpath=os.path.join(path,name)
+		os.stat(fullpath)
+		os.path.isfile(fullpath)
+		n+=1
+	#end for
+	return n
+
+def SinglePass(enumerator,path):
+	n=0
+	types=set()
+	for entry in enumerator.Iterate(path):
+		types.add((directoryEnumerator.GetExtension(entry.name),entry.IsDirectory()))
+		n+=1
+	#end for
+	return n
+
+def main():
+	count=int(sys.argv[1]) if len(sys.argv)>1 else 20000
+	if len(sys.argv)>2:
+		path=sys.argv[2]
+		created=False
+	else:
+		print("Creating %d files..." % count)
+		path=benchmarkUtil.MakeFlatDirectory(count)
+		created=True
+	#end 計測対象
+	try:
+		try:
+			import win32api
+			legacy=("legacy FindFiles+SHGetFileInfo+isfile",LegacyWindows)
+		except ImportError:
+			legacy=("legacy emulation listdir+stat+isfile",LegacyPortable)
+		#end except
+		t,n=benchmarkUtil.Measure(lambda: legacy[1](path))
+		benchmarkUtil.Report(legacy[0],t,n)
+		enumerators=[directoryEnumerator.ScandirEnumerator()]
+		try:
+			enumerators.insert(0,directoryEnumerator.FindFilesEnumerator())
+		except ImportError:
+			pass
+		#end except
+		for e in enumerators:
+			t,n=benchmarkUtil.Measure(lambda: SinglePass(e,path))
+			benchmarkUtil.Report("single pass (%s)" % e.name,t,n)
+		#end for
+	finally:
+		if created: benchmarkUtil.Remove(path)
+	#end finally
+
+if __name__=="__main__":
+	main()
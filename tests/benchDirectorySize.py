@@ -0,0 +1,85 @@
+#フォルダのサイズ計算のベンチマーク
+#合成したツリーのサイズを、今までの方法(os.scandir で1スレッドで再帰し、項目ごとにリンクかどうかを問い合わせる)と、directorySize.DirectorySizeEngine で計算し、かかった時間を比べる。
+#DirectorySizeEngine は、スレッド数を変えて1回目(覚えた情報なし)を計り、最後に、同じツリーを計算し直す場合(覚えた情報あり)を計る。
+#NASのように、フォルダ1つの列挙に時間がかかる環境を再現したい場合は、フォルダごとの待ち時間をミリ秒で指定する。
+#使い方: python tests/benchDirectorySize.py [フォルダごとの待ち時間(ms)] [計測するフォルダ]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+
+import benchmarkUtil
+import directoryEnumerator
+import directorySize
+
+WORKERS=(1,4,16)
+
+class LatencyEnumerator(directoryEnumerator.EnumeratorBase):
+	"""フォルダを開くたびに、指定した時間だけ待つ。ネットワーク越しの列挙の遅さを再現する。"""
+	def __init__(self,base,latency):
+		self.base=base
+		self.latency=latency
+
+	def Iterate(self,path):
+		time.sleep(self.latency)
+		yield from self.base.Iterate(path)
+
+	def GetEntry(self,fullpath):
+		return self.base.GetEntry(fullpath)
+
+def SerialSize(path,latency):
+	"""今までの misc.GetDirectorySize と同じ方法で計算する。"""
+	time.sleep(latency)
+	total=files=dirs=0
+	with os.scandir(path) as it:
+		for entry in it:
+			if os.path.islink(entry.path): continue#今までは、ここで GetFileAttributes を呼んでいた
+			if entry.is_file(follow_symlinks=False):
+				total+=entry.stat().st_size
+				files+=1
+			elif entry.is_dir(follow_symlinks=False):
+				r=SerialSize(entry.path,latency)
+				total+=r[0]
+				files+=r[1]
+				dirs+=r[2]+1
+			#end ファイルかフォルダか
+		#end for
+	#end with
+	return total,files,dirs
+
+def MakeEngine(workers,latency):
+	engine=directorySize.DirectorySizeEngine(workers)
+	if latency>0: engine.enumerator=LatencyEnumerator(engine.enumerator,latency)
+	return engine
+
+def main():
+	latency=float(sys.argv[1])/1000 if len(sys.argv)>1 else 0.002
+	if len(sys.argv)>2:
+		root=sys.argv[2]
+		created=False
+	else:
+		print("Creating a synthetic tree...")
+		root,files,dirs=benchmarkUtil.MakeSyntheticTree(4,5,10,size=100)
+		print("%d files, %d directories" % (files,dirs))
+		created=True
+	#end 計測対象
+	try:
+		t,r=benchmarkUtil.Measure(lambda: SerialSize(root,latency),1)
+		benchmarkUtil.Report("serial scandir %s" % (r,),t)
+		for workers in WORKERS:
+			t,r=benchmarkUtil.Measure(lambda: MakeEngine(workers,latency).Calculate([root])[0],1)
+			benchmarkUtil.Report("%2d workers, cold %s" % (workers,r),t)
+		#end for
+		engine=MakeEngine(4,latency)
+		engine.Calculate([root])
+		t,r=benchmarkUtil.Measure(lambda: engine.Calculate([root])[0])
+		benchmarkUtil.Report(" 4 workers, memoised %s" % (r,),t)
+	finally:
+		if created: benchmarkUtil.Remove(root)
+	#end finally
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,61 @@
+#ファイル名の索引のベンチマーク
+#合成したパスのリストから索引を作り、作成時間、ディスク上のサイズ、読み込み時間、検索にかかる時間を表示する。
+#検索時間は、今までの検索と同じく、全てのパスに正規表現を当てた場合と比べる。
+#使い方: python tests/benchFileNameIndex.py [パスの数]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import random
+import re
+import tempfile
+
+import benchmarkUtil
+import fileNameIndex
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lists'))
+KEYWORDS=(("report",False),("*.docx",False),("2019*見積",False),(r"file0123\d\d\.txt$",True),(r"^(dir001|dir002)",True))
+
+def MakePaths(count):
+	"""フォルダの階層とファイル名が、それらしく散らばったパスのリストを作る。"""
+	rnd=random.Random(0)
+	names=("report","memo","見積","請求書","image","backup","data","README")
+	dirs=[os.path.join("dir%03d" % rnd.randrange(200),"sub%02d" % rnd.randrange(30),"year%d" % rnd.choice((2018,2019,2020))) for i in range(2000)]
+	return [os.path.join(rnd.choice(dirs),"%s_file%07d.%s" % (rnd.choice(names),i,benchmarkUtil.EXTENSIONS[i%len(benchmarkUtil.EXTENSIONS)])) for i in range(count)]
+
+def Compile(keyword,isRegularExpression):
+	#lists.searchResultBase.MakeKeywordPattern と同じ変換。lists は wx を必要とするので、ここで同じことをする
+	if not isRegularExpression:
+		keyword=re.sub(r"([\\\+\.\{\}\(\)\[\]\^\$\-\|\/])",r"\\\1",keyword).replace("*",".*").replace("?",".")
+	return re.compile(keyword,re.IGNORECASE)
+
+def main():
+	count=int(sys.argv[1]) if len(sys.argv)>1 else 1000000
+	paths=MakePaths(count)
+	directory=tempfile.mkdtemp(prefix="falconbench")
+	try:
+		store=fileNameIndex.FileNameIndexStore(directory)
+		t,index=benchmarkUtil.Measure(lambda: store.Save("C:\\bench",paths),1)
+		benchmarkUtil.Report("build and save",t,count,"paths")
+		size=sum(os.path.getsize(os.path.join(directory,name)) for name in os.listdir(directory))
+		print("%-40s %10.1f MB (%.1f bytes/path)" % ("size on disk",size/1024/1024,size/count))
+		t,loaded=benchmarkUtil.Measure(lambda: fileNameIndex.FileNameIndexStore(directory).Find("C:\\bench")[0],1)
+		benchmarkUtil.Report("load",t,count,"paths")
+		for keyword,isRegularExpression in KEYWORDS:
+			pattern=Compile(keyword,isRegularExpression)
+			t1,hits1=benchmarkUtil.Measure(lambda: [p for p in paths if pattern.search(p)])
+			t2,hits2=benchmarkUtil.Measure(lambda: loaded.Query(pattern))
+			if sorted(hits1)!=sorted(hits2): print("  results differ for %s" % keyword)
+			benchmarkUtil.Report("  scan  %s (%d hits)" % (keyword,len(hits1)),t1)
+			benchmarkUtil.Report("  index %s (x%.1f)" % (keyword,t1/t2 if t2>0 else 0),t2)
+		#end for
+		t,hits=benchmarkUtil.Measure(lambda: loaded.Query(Compile("report",False),os.path.join("dir010","sub05")))
+		benchmarkUtil.Report("  index report in dir010\\sub05 (%d hits)" % len(hits),t)
+	finally:
+		benchmarkUtil.Remove(directory)
+	#end finally
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,79 @@
+#ファイル内容検索の転置索引のベンチマーク
+#小さなテキストファイルをたくさん作り、索引の作成時間、データベースのサイズ、問い合わせにかかる時間を表示する。
+#検索時間は、全てのファイルを読んで正規表現を当てる場合と、索引で絞り込んだファイルだけを読む場合とで比べる。
+#使い方: python tests/benchFullTextIndex.py [ファイルの数]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import random
+import re
+import tempfile
+
+import benchmarkUtil
+import fullTextIndex
+
+WORDS=("会議","議事録","予算","報告","確認","resume","invoice","project","schedule","担当","連絡","meeting")
+KEYWORDS=("議事録",r"invoice\s+2019","予算超過のお知らせ","nothing matches this")
+
+def MakeFiles(root,count):
+	"""count 個の小さなテキストファイルを作り、フルパスのリストを返す。まれに、検索語を含むファイルを混ぜる。"""
+	rnd=random.Random(0)
+	ret=[]
+	for i in range(count):
+		directory=os.path.join(root,"dir%03d" % (i%100))
+		if i<100: os.makedirs(directory,exist_ok=True)
+		path=os.path.join(directory,"file%06d.txt" % i)
+		text=" ".join(rnd.choice(WORDS) for j in range(rnd.randint(20,200)))
+		if i%500==0: text+=" invoice 2019 予算超過のお知らせ"
+		with open(path,"w",encoding="UTF-8") as f:
+			f.write(text)
+		#end with
+		ret.append(path)
+	#end for
+	return ret
+
+def ReadText(path):
+	with open(path,encoding="UTF-8") as f:
+		return f.read()
+	#end with
+
+def Scan(paths,pattern):
+	return [path for path in paths if pattern.search(ReadText(path))]
+
+def main():
+	count=int(sys.argv[1]) if len(sys.argv)>1 else 50000
+	root=tempfile.mkdtemp(prefix="falconbench")
+	try:
+		data=os.path.join(root,"data")
+		paths=MakeFiles(data,count)
+		db=os.path.join(root,"fulltext.db")
+		index=fullTextIndex.FullTextIndex(db)
+		t,ret=benchmarkUtil.Measure(lambda: index.Update(data,paths,ReadText),1)
+		benchmarkUtil.Report("build",t,count,"files")
+		size=sum(os.path.getsize(db+suffix) for suffix in ("","-wal") if os.path.exists(db+suffix))
+		print("%-40s %10.1f MB (%.1f bytes/file)" % ("size on disk",size/1024/1024,size/count))
+		t,ret=benchmarkUtil.Measure(lambda: index.Update(data,paths,ReadText),1)
+		benchmarkUtil.Report("update without changes",t,count,"files")
+		for keyword in KEYWORDS:
+			pattern=re.compile(keyword,re.IGNORECASE)
+			t1,hits1=benchmarkUtil.Measure(lambda: Scan(paths,pattern),1)
+			def indexed():
+				shortlist=index.Query(pattern,data)
+				return [path for path in paths if not shortlist.CanSkip(path) and pattern.search(ReadText(path))]
+			#end indexed
+			t2,hits2=benchmarkUtil.Measure(indexed,1)
+			if hits1!=hits2: print("  results differ for %s" % keyword)
+			t3,shortlist=benchmarkUtil.Measure(lambda: index.Query(pattern,data))
+			benchmarkUtil.Report("  scan  %s (%d hits)" % (keyword,len(hits1)),t1)
+			benchmarkUtil.Report("  index %s (x%.1f)" % (keyword,t1/t2 if t2>0 else 0),t2)
+			benchmarkUtil.Report("  query only (%d candidates)" % len(shortlist),t3)
+		#end for
+	finally:
+		benchmarkUtil.Remove(root)
+	#end finally
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,63 @@
+#ファイル名検索のキーワード判定のベンチマーク
+#合成したパスのリストに対して、判定の方法ごとに、keywordMatcher の速さを、今までの正規表現(パス全体に re.search)と比べる。
+#同じ判定をする正規表現(KeywordMatcher.regex)の結果と一致するかも確かめる。
+#使い方: python tests/benchKeywordMatcher.py [パスの数]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import random
+import re
+
+import benchmarkUtil
+import keywordMatcher
+
+KEYWORDS=(
+	("report",False),			#部分一致
+	("*.docx",False),			#末尾一致
+	("report*",False),			#先頭一致
+	("*見積*",False),			#部分一致
+	("report*.pdf",False),		#先頭一致かつ末尾一致
+	("*.jpg;*.png;*.pdf",False),	#拡張子の集合
+	("memo_file??1*",False),	#正規表現に直す
+	("year2019",True),			#特別な文字のない正規表現
+	(r"file00123\d\d\.txt$",True),	#正規表現
+)
+
+def MakePaths(count):
+	"""フォルダの階層とファイル名が、それらしく散らばったパスのリストを作る。"""
+	rnd=random.Random(0)
+	names=("report","memo","見積","請求書","image","backup","data","README")
+	dirs=[os.path.join("dir%03d" % rnd.randrange(200),"sub%02d" % rnd.randrange(30),"year%d" % rnd.choice((2018,2019,2020))) for i in range(2000)]
+	return [os.path.join(rnd.choice(dirs),"%s_file%07d.%s" % (rnd.choice(names),i,benchmarkUtil.EXTENSIONS[i%len(benchmarkUtil.EXTENSIONS)])) for i in range(count)]
+
+def OldPattern(keyword,isRegularExpression):
+	#lists.searchResultBase.MakeKeywordPattern と同じ変換。lists は wx を必要とするので、ここで同じことをする
+	if not isRegularExpression:
+		keyword=re.sub(r"([\\\+\.\{\}\(\)\[\]\^\$\-\|\/])",r"\\\1",keyword).replace("*",".*").replace("?",".")
+	return re.compile(keyword,re.IGNORECASE)
+
+def main():
+	count=int(sys.argv[1]) if len(sys.argv)>1 else 1000000
+	paths=MakePaths(count)
+	for keyword,isRegularExpression in KEYWORDS:
+		matcher=keywordMatcher.Compile(keyword,isRegularExpression)
+		old=OldPattern(keyword,isRegularExpression)
+		t1,hits1=benchmarkUtil.Measure(lambda: [p for p in paths if old.search(p)])
+		t2,hits2=benchmarkUtil.Measure(lambda: [p for p in paths if matcher.Match(p)])
+		regex=matcher.regex
+		if matcher.basenameOnly:
+			expected=[p for p in paths if regex.search(p.rpartition(os.sep)[2])]
+		else:
+			expected=[p for p in paths if regex.search(p)]
+		#end ファイル名だけか
+		if hits2!=expected: print("  results differ for %s" % keyword)
+		print("%s (%s)" % (keyword,matcher))
+		benchmarkUtil.Report("  regex    (%d hits)" % len(hits1),t1,count,"paths")
+		benchmarkUtil.Report("  matcher  (%d hits, x%.1f)" % (len(hits2),t1/t2 if t2>0 else 0),t2,count,"paths")
+	#end for
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,105 @@
+#複数キーワードのgrepのベンチマーク
+#顧客IDのような文字列を含むテキストを作り、キーワードの数を 1 から 10000 まで増やしながら、grepEngine.MultiPattern で1回走査する場合の速さを MB/s で表示する。
+#比較として、キーワードを正規表現の選択(|)でつないだ場合と、キーワードごとに走査し直す場合(今までの方法)も計測する。時間がかかりすぎるものは、キーワード数を減らしたところだけ計測する。
+#最後に、Windows と同じ spawn で起動したプロセスプール(grepEngine.GrepEngine)に小さなファイルをたくさん投げて、ファイル毎秒を表示する。ワーカープロセスでオートマトンを作り直さなければ、キーワードが多くても速さはあまり変わらない。
+#使い方: python tests/benchMultiPatternGrep.py [テキストのサイズ(MB)] [プールに投げるファイル数]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import multiprocessing
+import random
+import re
+import tempfile
+
+import benchmarkUtil
+import grepEngine
+
+WORDS=("請求","納品","顧客","担当","確認","完了","order","invoice","status","ok")
+COUNTS=(1,10,100,1000,10000)
+#これより多いキーワードでは、比較対象の方法を計測しない
+MAX_ALTERNATION=1000
+MAX_RESCAN=100
+#プールに投げるファイルの大きさ
+POOL_FILE_SIZE=16*1024
+POOL_PROCESSES=2
+
+def MakeText(size):
+	"""size バイトほどの、顧客IDを含む行が並んだテキストを作る。"""
+	rnd=random.Random(0)
+	lines=[]
+	total=0
+	while total<size:
+		line=" ".join(rnd.choice(WORDS) for j in range(rnd.randint(4,12)))+" C%06d" % rnd.randrange(1000000)
+		lines.append(line)
+		total+=len(line.encode("UTF-8"))+1
+	#end while
+	return "\n".join(lines)
+
+def MeasurePool(files,keywords):
+	"""files を、新しく作ったプールで検索して、かかった時間とヒット数を返す。プールの起動にかかる時間は含めない。"""
+	engine=grepEngine.GrepEngine(POOL_PROCESSES)
+	try:
+		engine.Result(engine.Submit(files[0],re.compile("x")))#プールを起動しておく
+		pattern=grepEngine.MultiPattern(keywords)
+		def run():
+			futures=[engine.Submit(path,pattern,True) for path in files]
+			return sum(len(engine.Result(future)) for future in futures)
+		#end run
+		return benchmarkUtil.Measure(run,1)
+	finally:
+		engine.Shutdown()
+	#end finally
+
+def BenchPool(count,rnd):
+	work=tempfile.mkdtemp(prefix="falconbench")
+	try:
+		files=[]
+		for i in range(count):
+			path=os.path.join(work,"file%04d.txt" % i)
+			with open(path,"w",encoding="UTF-8") as f:
+				f.write(MakeText(POOL_FILE_SIZE))
+			#end with
+			files.append(path)
+		#end for
+		print("Process pool (spawn, %d processes), %d files of %d KB" % (POOL_PROCESSES,count,POOL_FILE_SIZE//1024))
+		for n in COUNTS:
+			keywords=["C%06d" % rnd.randrange(1000000) for i in range(n)]
+			t,hits=MeasurePool(files,keywords)
+			benchmarkUtil.Report("%5d keywords (%d hits)" % (n,hits),t,count,"files")
+		#end for
+	finally:
+		benchmarkUtil.Remove(work)
+	#end finally
+
+def main():
+	size=int(sys.argv[1])*1024*1024 if len(sys.argv)>1 else 8*1024*1024
+	poolFiles=int(sys.argv[2]) if len(sys.argv)>2 else 500
+	text=MakeText(size)
+	mb=len(text.encode("UTF-8"))/1024/1024
+	print("%.1f MB, %d lines" % (mb,text.count("\n")+1))
+	rnd=random.Random(1)
+	for count in COUNTS:
+		keywords=["C%06d" % rnd.randrange(1000000) for i in range(count)]
+		t,pattern=benchmarkUtil.Measure(lambda: grepEngine.MultiPattern(keywords),1)
+		benchmarkUtil.Report("%5d keywords: build" % count,t,count,"keywords")
+		t1,hits1=benchmarkUtil.Measure(lambda: grepEngine.MatchLines(text,pattern),1)
+		benchmarkUtil.Report("  aho-corasick (%d hits)" % len(hits1),t1,mb,"MB")
+		if count<=MAX_ALTERNATION:
+			alternation=re.compile("|".join(re.escape(k) for k in keywords),re.IGNORECASE)
+			t2,hits2=benchmarkUtil.Measure(lambda: grepEngine.MatchLines(text,alternation),1)
+			if [h[0] for h in hits1]!=[h[0] for h in hits2]: print("  results differ")
+			benchmarkUtil.Report("  regex alternation",t2,mb,"MB")
+		#end 選択
+		if count<=MAX_RESCAN:
+			t3,ret=benchmarkUtil.Measure(lambda: [grepEngine.MatchLines(text,re.compile(re.escape(k),re.IGNORECASE)) for k in keywords],1)
+			benchmarkUtil.Report("  one scan per keyword",t3,mb,"MB")
+		#end 走査し直し
+	#end for
+	BenchPool(poolFiles,rnd)
+
+if __name__=="__main__":
+	multiprocessing.set_start_method("spawn")#Windows と同じく、ワーカープロセスは何も引き継がない
+	main()
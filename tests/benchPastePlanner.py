@@ -0,0 +1,94 @@
+#貼り付けの計画のベンチマーク
+#合成したツリーについて、今までの方法(全てのパスを先に展開し、項目ごとにファイルかどうかとサイズを問い合わせてから、合計を計算する)と、pastePlanner.PastePlanner で、最初の項目をコピーに渡せるまでの時間、全て流し終わるまでの時間、使ったメモリの最大量を比べる。
+#past は win32 のモジュールがないと読み込めないので、Element は、ここで同じものを定義する。
+#使い方: python tests/benchPastePlanner.py [ファイル数]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import tracemalloc
+
+import benchmarkUtil
+import pastePlanner
+
+class OldElement(object):
+	"""今までの fileOperator.past.Element 。"""
+	def __init__(self,path,basepath,destpath):
+		self.path=path
+		self.isfile=os.path.isfile(path)
+		self.size=os.path.getsize(path) if self.isfile else -1
+		self.destpath=path.replace(basepath,destpath)
+
+class Element(object):
+	"""今の fileOperator.past.Element 。"""
+	__slots__=["path","isfile","size","destpath"]
+
+	def __init__(self,path,basepath,destpath,isfile,size):
+		self.path=path
+		self.isfile=isfile
+		self.size=size
+		self.destpath=path.replace(basepath,destpath)
+
+def IteratePaths_dirFirst(path):
+	for entry in os.scandir(path):
+		yield entry.path
+		if entry.is_dir(): yield from IteratePaths_dirFirst(entry.path)
+	#end for
+
+def Old(root,basepath,destpath):
+	"""(最初の項目を渡せるまでの秒数, 項目数)"""
+	start=time.perf_counter()
+	lst=[OldElement(root,basepath,destpath)]
+	for path in IteratePaths_dirFirst(root):
+		lst.append(OldElement(path,basepath,destpath))
+	#end for
+	total=0
+	for elem in lst:
+		if elem.size!=-1: total+=elem.size
+	#end for
+	first=time.perf_counter()-start
+	for elem in lst:
+		pass#ここでコピーする
+	#end for
+	return first,len(lst)
+
+def Planned(root,basepath,destpath):
+	start=time.perf_counter()
+	first=None
+	planner=pastePlanner.PastePlanner([root],lambda path,isfile,size: Element(path,basepath,destpath,isfile,size))
+	count=0
+	for elem in planner:
+		if first is None: first=time.perf_counter()-start
+		count+=1
+	#end for
+	return first,count
+
+def Run(label,func,root):
+	basepath=os.path.dirname(root)
+	t,r=benchmarkUtil.Measure(lambda: func(root,basepath,"/dest"),1)
+	benchmarkUtil.Report("%s, all items" % label,t,r[1],"items")
+	benchmarkUtil.Report("%s, first item" % label,r[0])
+	tracemalloc.start()#計測が遅くなるので、メモリは別に計る
+	func(root,basepath,"/dest")
+	current,peak=tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	print("%-40s %10.1f MB" % ("%s, peak memory" % label,peak/1024/1024))
+
+def main():
+	count=int(sys.argv[1]) if len(sys.argv)>1 else 200000
+	print("Creating a synthetic tree...")
+	filesPerDir=100
+	root,files,dirs=benchmarkUtil.MakeSyntheticTree(2,max(1,int((count/filesPerDir)**0.5)),filesPerDir)
+	print("%d files, %d directories" % (files,dirs))
+	try:
+		Run("expand first",Old,root)
+		Run("planner",Planned,root)
+	finally:
+		benchmarkUtil.Remove(root)
+	#end finally
+
+if __name__=="__main__":
+	main()
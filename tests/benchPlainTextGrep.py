@@ -0,0 +1,74 @@
+#プレーンテキストのgrepのベンチマーク
+#大きなログファイルを作り、ドキュメントとしてテキストを取り出してから検索する経路と、grepEngine.GrepPlainText で mmap したまま検索する経路の速さを、MB/s で比べる。
+#falconHelper.dll が読み込める環境では、取り出しには xd2txlib を使う。読み込めない環境では、ファイル全体をデコードして文字列にするところまでを計測する。
+#使い方: python tests/benchPlainTextGrep.py [ファイルサイズ(MB)]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import random
+import re
+import tempfile
+
+import benchmarkUtil
+import documentText
+import grepEngine
+
+WORDS=("INFO","DEBUG","WARN","request","response","user","接続","完了","タイムアウト","処理","id=","path=")
+KEYWORDS=("timeout",r"error.*id=42","タイムアウト発生")
+
+def MakeLog(path,size,encoding):
+	"""size バイトほどのログファイルを作る。まれに、検索語を含む行を混ぜる。"""
+	rnd=random.Random(0)
+	lines=[]
+	for i in range(1000):
+		line=" ".join(rnd.choice(WORDS) for j in range(rnd.randint(4,12)))
+		if i%97==0: line+=" ERROR id=42 Timeout タイムアウト発生"
+		lines.append(line)
+	#end for
+	block=("\r\n".join(lines)+"\r\n").encode(encoding)
+	with open(path,"wb") as f:
+		for i in range(max(1,size//len(block))):
+			f.write(block)
+		#end for
+	#end with
+	return os.path.getsize(path)
+
+def Extract(path):
+	"""ドキュメントとして取り出す経路。"""
+	try:
+		return documentText.ExtractText(path)
+	except OSError:#falconHelper.dll がない
+		with open(path,"rb") as f:
+			data=f.read()
+		#end with
+		encoding,offset=documentText.DetectEncoding(data[:documentText.DETECT_SIZE])
+		return data[offset:].decode(encoding,"replace").replace("\r\n","\n")
+	#end except
+
+def main():
+	size=int(sys.argv[1])*1024*1024 if len(sys.argv)>1 else 64*1024*1024
+	root=tempfile.mkdtemp(prefix="falconbench")
+	try:
+		for encoding in ("UTF-8","cp932"):
+			path=os.path.join(root,"bench_%s.log" % encoding)
+			actual=MakeLog(path,size,encoding)
+			mb=actual/1024/1024
+			print("%s, %.1f MB" % (encoding,mb))
+			for keyword in KEYWORDS:
+				pattern=re.compile(keyword,re.IGNORECASE)
+				t1,hits1=benchmarkUtil.Measure(lambda: grepEngine.MatchLines(Extract(path),pattern))
+				t2,hits2=benchmarkUtil.Measure(lambda: grepEngine.GrepPlainText(path,pattern))
+				if hits1!=hits2: print("  results differ for %s" % keyword)
+				benchmarkUtil.Report("  extract  %s" % keyword,t1,mb,"MB")
+				benchmarkUtil.Report("  mmap     %s (x%.1f)" % (keyword,t1/t2 if t2>0 else 0),t2,mb,"MB")
+			#end for
+		#end for
+	finally:
+		benchmarkUtil.Remove(root)
+	#end finally
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,78 @@
+#同じボリューム内での移動のベンチマーク
+#合成したツリーを、今までの方法(フォルダを展開して、ファイルを1つずつコピーしてから消す)と、fileOperator.past の同じボリュームでの移動(フォルダごと名前を変える)で移動し、かかった時間を比べる。
+#どちらの方法でも、移動後のツリーのファイル数と合計バイト数が、移動前と同じで、移動元が残っていないことを確かめる。
+#past は win32 のモジュールがないと読み込めないので、MoveFileEx の代わりに os.rename を、CopyFileEx の代わりに shutil.copyfile を使う。コピーは copyScheduler で行う。
+#使い方: python tests/benchSameVolumeMove.py [ファイルごとのバイト数]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import shutil
+import tempfile
+
+import benchmarkUtil
+import copyScheduler
+from benchCopyScheduler import MakeElements
+
+def Summarize(root):
+	"""root 以下の (ファイル数, 合計バイト数) を返す。"""
+	files=total=0
+	for path,dirs,names in os.walk(root):
+		for name in names:
+			files+=1
+			total+=os.path.getsize(os.path.join(path,name))
+		#end for
+	#end for
+	return files,total
+
+def CopyAndDelete(src,dest):
+	"""今までの移動。ファイルごとにコピーして消し、最後にフォルダを消す。"""
+	elements=MakeElements(src,dest)
+	def copy(elem):
+		shutil.copyfile(elem.path,elem.destpath)
+		os.remove(elem.path)
+	#end copy
+	def onError(elem,err):
+		raise err
+	copyScheduler.CopyScheduler().Run(elements,copy,lambda elem: os.mkdir(elem.destpath),lambda elem: None,onError)
+	for elem in reversed(elements):
+		if not elem.isfile: os.rmdir(elem.path)
+	#end 空になったフォルダを消す
+
+def Rename(src,dest):
+	"""同じボリュームでの移動。"""
+	if os.stat(src).st_dev!=os.stat(os.path.dirname(dest)).st_dev: raise RuntimeError("not on the same volume")
+	os.rename(src,dest)
+
+def Check(label,expected,src,dest):
+	actual=Summarize(dest)
+	if actual!=expected or os.path.exists(src): raise AssertionError("%s: expected %s, got %s (source exists: %s)" % (label,expected,actual,os.path.exists(src)))
+
+def main():
+	size=int(sys.argv[1]) if len(sys.argv)>1 else 256*1024
+	work=tempfile.mkdtemp(prefix="falconbench")
+	try:
+		print("Creating a synthetic tree...")
+		src=os.path.join(work,"src")
+		os.mkdir(src)
+		benchmarkUtil.MakeSyntheticTree(3,4,20,src,size)
+		expected=Summarize(src)
+		print("%d files, %d bytes" % expected)
+		dest=os.path.join(work,"copied")
+		t,r=benchmarkUtil.Measure(lambda: CopyAndDelete(src,dest),1)
+		Check("copy and delete",expected,src,dest)
+		benchmarkUtil.Report("copy and delete",t,expected[1]/1024/1024,"MB")
+		src=dest
+		dest=os.path.join(work,"renamed")
+		t,r=benchmarkUtil.Measure(lambda: Rename(src,dest),1)
+		Check("rename",expected,src,dest)
+		benchmarkUtil.Report("rename",t,expected[1]/1024/1024,"MB")
+		print("OK")
+	finally:
+		benchmarkUtil.Remove(work)
+	#end finally
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,81 @@
+#検索の絞り込み条件のベンチマーク
+#合成したツリーの一部のファイルを大きくし、「1GB以上で今年更新したもの」を探す。
+#絞り込み条件を pathWalker.ParallelWalker に渡して列挙の情報で判定する場合と、全てのパスを流してから1つずつ os.stat で判定する場合(今までの方法)を、何もしない列挙と比べる。
+#使い方: python tests/benchSearchFilter.py [計測するフォルダ]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import datetime
+import threading
+
+import benchmarkUtil
+import pathWalker
+import searchFilter
+
+#このファイル数ごとに1つ、大きなファイルにする
+LARGE_FILE_INTERVAL=100
+LARGE_FILE_SIZE=2*1024**3
+
+def Walk(root,searchFilter=None):
+	"""root をたどり、流れてきたパスのリストを返す。"""
+	stream=pathWalker.PathStream(1000)
+	walker=pathWalker.ParallelWalker(root,stream,4,searchFilter)
+	t=threading.Thread(target=walker.Run)
+	t.start()
+	position=0
+	while True:
+		position,finished=stream.Read(position,None)
+		if finished: break
+	#end while
+	t.join()
+	return stream.paths
+
+def WalkAndStat(root,minSize,modifiedAfter):
+	"""全てのパスを流してから、1つずつ stat して絞り込む。"""
+	ret=[]
+	for path in Walk(root):
+		st=os.stat(os.path.join(root,path))
+		if os.path.isfile(os.path.join(root,path)) and st.st_size>=minSize and st.st_mtime>=modifiedAfter.timestamp(): ret.append(path)
+	#end for
+	return ret
+
+def MakeLargeFiles(root):
+	"""ツリーの中のファイルを、一定の間隔で大きくする(スパースファイルなので、ディスクは使わない)。"""
+	count=0
+	for dirpath,dirnames,filenames in os.walk(root):
+		for name in filenames:
+			count+=1
+			if count%LARGE_FILE_INTERVAL==0: os.truncate(os.path.join(dirpath,name),LARGE_FILE_SIZE)
+		#end for
+	#end for
+
+def main():
+	if len(sys.argv)>1:
+		root=sys.argv[1]
+		created=False
+	else:
+		print("Creating a synthetic tree...")
+		root,files,dirs=benchmarkUtil.MakeSyntheticTree(4,5,20)
+		MakeLargeFiles(root)
+		print("%d files, %d directories" % (files,dirs))
+		created=True
+	#end 計測対象
+	try:
+		thisYear=searchFilter.ParseDate("%d/01/01" % datetime.date.today().year)
+		f=searchFilter.SearchFilter(minSize=searchFilter.ParseSize("1GB"),modifiedAfter=thisYear,kind=searchFilter.KIND_FILES)
+		t,paths=benchmarkUtil.Measure(lambda: Walk(root))
+		benchmarkUtil.Report("bare walk",t,len(paths),"paths")
+		total=len(paths)
+		t,paths=benchmarkUtil.Measure(lambda: Walk(root,f))
+		benchmarkUtil.Report("filter in walker (%d hits)" % len(paths),t,total,"paths")
+		t,paths=benchmarkUtil.Measure(lambda: WalkAndStat(root,f.minSize,thisYear))
+		benchmarkUtil.Report("stat after walk (%d hits)" % len(paths),t,total,"paths")
+	finally:
+		if created: benchmarkUtil.Remove(root)
+	#end finally
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,53 @@
+#容量の木のベンチマーク
+#合成したツリーから sizeTree.SizeTree を作る速さ(フォルダ数/秒、ファイル数/秒)と、作った木で全てのフォルダのサイズを答える速さを計る。
+#比べるために、今までの方法(フォルダごとに directorySize.DirectorySizeEngine で計算する)で、全てのフォルダのサイズを求める時間も計る。
+#保存と読み込みにかかる時間も表示する。
+#ハードリンクを1回だけ数える場合、Windows ではファイルごとに os.stat が必要になるので、全てのファイルを os.stat する時間も計る(Windows 以外では、列挙の結果でリンク数が分かるので、build には含まれない)。
+#使い方: python tests/benchSizeTree.py [計測するフォルダ]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import benchmarkUtil
+import directorySize
+import sizeTree
+
+def main():
+	if len(sys.argv)>1:
+		root=sys.argv[1]
+		created=False
+	else:
+		print("Creating a synthetic tree...")
+		root,files,dirs=benchmarkUtil.MakeSyntheticTree(4,6,20,size=100)
+		print("%d files, %d directories" % (files,dirs))
+		created=True
+	#end 計測対象
+	try:
+		t,tree=benchmarkUtil.Measure(lambda: sizeTree.SizeTree.Build(root))
+		size,files,dirs=tree.GetSizeByIndex(0)
+		benchmarkUtil.Report("build %d bytes" % size,t,dirs+1,"dirs")
+		benchmarkUtil.Report("build",t,files,"files")
+		t,r=benchmarkUtil.Measure(lambda: sizeTree.SizeTree.Build(root,countHardLinksOnce=True))
+		benchmarkUtil.Report("build, hard links counted once",t,dirs+1,"dirs")
+		filePaths=[os.path.join(d,name) for d,dirnames,filenames in os.walk(root) for name in filenames]
+		t,r=benchmarkUtil.Measure(lambda: [os.stat(path,follow_symlinks=False) for path in filePaths])
+		benchmarkUtil.Report("os.stat of every file",t,len(filePaths),"files")
+		paths=[tree.GetPath(i) for i in range(len(tree))]
+		t,r=benchmarkUtil.Measure(lambda: [tree.GetSize(path) for path in paths])
+		benchmarkUtil.Report("size of every folder from the tree",t,len(paths),"dirs")
+		t,r=benchmarkUtil.Measure(lambda: directorySize.DirectorySizeEngine(4,0).Calculate(paths),1)
+		benchmarkUtil.Report("size of every folder, engine",t,len(paths),"dirs")
+		t,r=benchmarkUtil.Measure(lambda: (tree.LargestFolders(100),tree.LargestFiles(100)))
+		benchmarkUtil.Report("top 100 folders and files",t)
+		t,data=benchmarkUtil.Measure(tree.Serialize)
+		benchmarkUtil.Report("serialize %d bytes" % len(data),t)
+		t,r=benchmarkUtil.Measure(lambda: sizeTree.SizeTree.Deserialize(data))
+		benchmarkUtil.Report("deserialize",t,len(r),"dirs")
+	finally:
+		if created: benchmarkUtil.Remove(root)
+	#end finally
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,85 @@
+#タブのソートのベンチマーク
+#FalconTabBase.ApplySort の旧方式(ソート後に list.index で1行ずつ新しい位置を探す)と、要素→位置の対応表を1回で作る方式の処理時間を比較する。
+#あわせて、ソートキーを覚えておく場合と、毎回作り直す場合で、カラムを切り替えながら繰り返しソートしたときの時間を比較する。
+#リストコントロールの描画はここには含まない。ソートと並べ替え情報の計算にかかる時間だけを計る。
+#使い方: python tests/benchTabSort.py [件数...]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import random
+
+import benchmarkUtil
+
+class Item(object):
+	"""browsableObjects.File と同じく、 __slots__ を持ち、同一性で比較される要素。"""
+	__slots__=["basename","size","modDate"]
+
+	def __init__(self,basename,size,modDate):
+		self.basename=basename
+		self.size=size
+		self.modDate=modDate
+
+SORT_FUNCTIONS=[
+	lambda x: x.basename.lower(),
+	lambda x: x.size,
+	lambda x: x.modDate
+]
+
+def MakeItems(count):
+	rnd=random.Random(count)
+	return [Item("File%07d.%s" % (rnd.randrange(count*10),benchmarkUtil.EXTENSIONS[i%len(benchmarkUtil.EXTENSIONS)]),rnd.randrange(1<<30),rnd.randrange(1<<31)) for i in range(count)]
+
+def Legacy(items):
+	"""旧方式。ソートのたびにキーを作り、list.index で新しい位置を求める。"""
+	for f in SORT_FUNCTIONS:
+		old=list(items)
+		items.sort(key=f)
+		data=[items.index(old[i]) for i in range(len(old))]
+	#end for
+	return len(data)
+
+def IdentityMap(items,cache):
+	"""新方式。覚えておいたソートキーを使い、対応表で新しい位置を求める。"""
+	for n,f in enumerate(SORT_FUNCTIONS):
+		keys=cache.setdefault(n,{})
+		def key(elem):
+			try:
+				return keys[elem]
+			except KeyError:
+				k=f(elem)
+				keys[elem]=k
+				return k
+			#end except
+		old=list(items)
+		items.sort(key=key)
+		position={}
+		for i,elem in enumerate(items):
+			position[id(elem)]=i
+		#end for
+		data=[position[id(e)] for e in old]
+	#end for
+	return len(data)
+
+def main():
+	counts=[int(c) for c in sys.argv[1:]] or [1000,10000,100000]
+	for count in counts:
+		items=MakeItems(count)
+		if count<=20000:
+			t,n=benchmarkUtil.Measure(lambda: Legacy(list(items)),1)
+			benchmarkUtil.Report("legacy list.index (%d items)" % count,t/len(SORT_FUNCTIONS))
+		else:
+			print("%-40s %s" % ("legacy list.index (%d items)" % count,"skipped (too slow)"))
+		#end 旧方式は件数が多いと終わらない
+		cache={}
+		t,n=benchmarkUtil.Measure(lambda: IdentityMap(list(items),{}),1)
+		benchmarkUtil.Report("identity map, cold keys (%d items)" % count,t/len(SORT_FUNCTIONS))
+		IdentityMap(list(items),cache)
+		t,n=benchmarkUtil.Measure(lambda: IdentityMap(list(items),cache))
+		benchmarkUtil.Report("identity map, cached keys (%d items)" % count,t/len(SORT_FUNCTIONS))
+	#end for
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,114 @@
+#コピーの確認のベンチマーク
+#ファイルを、確認せずにコピーする場合、コピーしてから両方のハッシュを計算する場合(今まで手でやっていた方法)、copyEngine.CopyAndVerify(コピーしながらコピー元のハッシュを計算し、コピー先だけを読み直す)で、かかった時間を比べる。
+#確認にかかった時間は、確認せずにコピーした時間との差で表す。
+#大きな貼り付けの後では、コピー元もコピー先もキャッシュに残っていないので、確認のための読み込みは、どちらもキャッシュを通さない(O_DIRECT か、Windows の FILE_FLAG_NO_BUFFERING が使える場合)。
+#USB メモリや NAS のように、コピー先が遅い環境を再現したい場合は、コピー先の読み書きの速さを MB/s で指定する(塊ごとに、その分だけ待つ)。
+#コピー先を書き換えた場合に、CopyAndVerify が VerificationError を送出することも確かめる。
+#使い方: python tests/benchVerifyCopy.py [ファイル数] [ファイルごとのMB] [コピー先の MB/s]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import tempfile
+import time
+
+import benchmarkUtil
+import copyEngine
+
+ALGORITHM=copyEngine.DEFAULT_HASH_ALGORITHM
+throttle=None#コピー先を読み書きした塊ごとに呼ぶ
+
+def MakeThrottle(rate):
+	"""rate バイト毎秒の速さを再現するために、塊の大きさに応じて待つ関数を返す。"""
+	if rate<=0: return None
+	def wait(n):
+		time.sleep(n/rate)
+	#end wait
+	return wait
+
+def MakeFiles(directory,count,size):
+	lst=[]
+	for i in range(count):
+		path=os.path.join(directory,"file%04d.bin" % i)
+		with open(path,"wb") as f:
+			f.write(os.urandom(size))
+		#end with
+		lst.append(path)
+	#end for
+	return lst
+
+def Run(files,dest,func):
+	"""files を dest にコピーする。毎回、前のコピーは消す。"""
+	benchmarkUtil.Remove(dest)
+	os.mkdir(dest)
+	for path in files:
+		func(path,os.path.join(dest,os.path.basename(path)))
+	#end for
+
+def CopyOnly(src,dest):
+	copyEngine.CopyFile(src,dest,progress=throttle)
+
+def CopyThenHash(src,dest):
+	"""コピーしてから、 misc.calcHash のように、両方を読み直してハッシュを比べる。"""
+	copyEngine.CopyFile(src,dest,progress=throttle)
+	if copyEngine.HashFile(src,ALGORITHM,unbuffered=True)!=copyEngine.HashFile(dest,ALGORITHM,unbuffered=True,progress=throttle): raise AssertionError("%s differs" % dest)
+
+def CopyAndVerify(src,dest):
+	copyEngine.CopyAndVerify(src,dest,ALGORITHM,progress=throttle,verifyProgress=throttle)
+
+def CheckCorruption(src,dest):
+	"""コピー先が壊れた場合に、検出できることを確かめる。"""
+	original=copyEngine.CopyFile
+	def corrupt(src,dest,*args,**kwargs):
+		original(src,dest,*args,**kwargs)
+		with open(dest,"r+b") as f:
+			f.seek(os.path.getsize(dest)//2)
+			b=f.read(1)
+			f.seek(-1,os.SEEK_CUR)
+			f.write(bytes([b[0]^1]))
+		#end with
+	#end corrupt
+	copyEngine.CopyFile=corrupt
+	try:
+		copyEngine.CopyAndVerify(src,dest,ALGORITHM)
+	except copyEngine.VerificationError as err:
+		print("Detected: %s" % err)
+		return
+	finally:
+		copyEngine.CopyFile=original
+	#end finally
+	raise AssertionError("the corrupted copy was not detected")
+
+def main():
+	global throttle
+	count=int(sys.argv[1]) if len(sys.argv)>1 else 16
+	size=int(sys.argv[2])*1024*1024 if len(sys.argv)>2 else 32*1024*1024
+	throttle=MakeThrottle(float(sys.argv[3])*1024*1024 if len(sys.argv)>3 else 0)
+	work=tempfile.mkdtemp(prefix="falconbench")
+	try:
+		src=os.path.join(work,"src")
+		dest=os.path.join(work,"dest")
+		os.mkdir(src)
+		print("Creating %d files of %d MB..." % (count,size//1024//1024))
+		files=MakeFiles(src,count,size)
+		mb=count*size/1024/1024
+		base,r=benchmarkUtil.Measure(lambda: Run(files,dest,CopyOnly))
+		benchmarkUtil.Report("copy only",base,mb,"MB")
+		for label,func in (
+			("copy, then hash both",CopyThenHash),
+			("copy and verify",CopyAndVerify),
+		):
+			t,r=benchmarkUtil.Measure(lambda: Run(files,dest,func))
+			benchmarkUtil.Report(label,t,mb,"MB")
+			print("%-40s %10.4f sec" % ("  verification overhead",t-base))
+		#end for
+		CheckCorruption(files[0],os.path.join(work,"corrupted.bin"))
+		print("OK")
+	finally:
+		benchmarkUtil.Remove(work)
+	#end finally
+
+if __name__=="__main__":
+	main()
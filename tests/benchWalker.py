@@ -0,0 +1,68 @@
+#検索用の再帰的なパス列挙のベンチマーク
+#合成したツリーを、pathWalker.ParallelWalker でスレッド数を変えながらたどり、1スレッドのときと比べてどれだけ速くなるかを表示する。
+#NASのように、フォルダ1つの列挙に時間がかかる環境を再現したい場合は、フォルダごとの待ち時間をミリ秒で指定する。
+#使い方: python tests/benchWalker.py [フォルダごとの待ち時間(ms)] [計測するフォルダ]
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+
+import benchmarkUtil
+import directoryEnumerator
+import pathWalker
+
+WORKERS=(1,2,4,8,16)
+
+class LatencyEnumerator(directoryEnumerator.EnumeratorBase):
+	"""フォルダを開くたびに、指定した時間だけ待つ。ネットワーク越しの列挙の遅さを再現する。"""
+	def __init__(self,base,latency):
+		self.base=base
+		self.latency=latency
+		self.name="%s+%dms" % (base.name,latency*1000)
+
+	def Iterate(self,path):
+		time.sleep(self.latency)
+		yield from self.base.Iterate(path)
+
+def Walk(root,workers,latency):
+	stream=pathWalker.PathStream(1000)
+	walker=pathWalker.ParallelWalker(root,stream,workers)
+	if latency>0: walker.enumerator=LatencyEnumerator(walker.enumerator,latency)
+	t=threading.Thread(target=walker.Run)
+	t.start()
+	position=0
+	while True:#検索と同じく、別スレッドで読み出す
+		position,finished=stream.Read(position,None)
+		if finished: break
+	#end while
+	t.join()
+	return position
+
+def main():
+	latency=float(sys.argv[1])/1000 if len(sys.argv)>1 else 0.002
+	if len(sys.argv)>2:
+		root=sys.argv[2]
+		created=False
+	else:
+		print("Creating a synthetic tree...")
+		root,files,dirs=benchmarkUtil.MakeSyntheticTree(4,5,10)
+		print("%d files, %d directories" % (files,dirs))
+		created=True
+	#end 計測対象
+	try:
+		base=None
+		for workers in WORKERS:
+			t,n=benchmarkUtil.Measure(lambda: Walk(root,workers,latency))
+			if base is None: base=t
+			benchmarkUtil.Report("%2d workers (x%.2f)" % (workers,base/t if t>0 else 0),t,n,"paths")
+		#end for
+	finally:
+		if created: benchmarkUtil.Remove(root)
+	#end finally
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,65 @@
+#ベンチマーク用の共通処理
+#合成したディレクトリツリーの作成と、処理時間の計測を行う。
+
+import os
+import shutil
+import tempfile
+import time
+
+EXTENSIONS=("txt","log","csv","py","jpg","png","docx","pdf")
+
+def MakeFlatDirectory(count,root=None,size=0):
+	"""count 個のファイルを持つフォルダを作り、そのパスを返す。"""
+	if root is None: root=tempfile.mkdtemp(prefix="falconbench")
+	data=b"x"*size
+	for i in range(count):
+		with open(os.path.join(root,"file%06d.%s" % (i,EXTENSIONS[i%len(EXTENSIONS)])),"wb") as f:
+			f.write(data)
+	#end for
+	return root
+
+def MakeSyntheticTree(depth,dirsPerLevel,filesPerDir,root=None,size=0):
+	"""深さ depth 、各フォルダに dirsPerLevel 個のサブフォルダと filesPerDir 個のファイルを持つツリーを作る。(ルート, ファイル数, フォルダ数) を返す。"""
+	if root is None: root=tempfile.mkdtemp(prefix="falconbench")
+	data=b"x"*size
+	files=0
+	dirs=0
+	stack=[(root,0)]
+	while stack:
+		path,level=stack.pop()
+		for i in range(filesPerDir):
+			with open(os.path.join(path,"file%04d.%s" % (i,EXTENSIONS[i%len(EXTENSIONS)])),"wb") as f:
+				f.write(data)
+			files+=1
+		#end ファイル
+		if level>=depth: continue
+		for i in range(dirsPerLevel):
+			p=os.path.join(path,"dir%03d" % i)
+			os.mkdir(p)
+			dirs+=1
+			stack.append((p,level+1))
+		#end フォルダ
+	#end while
+	return root,files,dirs
+
+def Remove(root):
+	shutil.rmtree(root,ignore_errors=True)
+
+def Measure(func,repeat=3):
+	"""func を repeat 回実行し、最も速かった時間(秒)と、そのときの戻り値を返す。"""
+	best=None
+	ret=None
+	for i in range(repeat):
+		t=time.perf_counter()
+		ret=func()
+		elapsed=time.perf_counter()-t
+		if best is None or elapsed<best: best=elapsed
+	#end for
+	return best,ret
+
+def Report(label,seconds,count=None,unit="entries"):
+	"""結果を1行で表示する。"""
+	if count is None:
+		print("%-40s %10.4f sec" % (label,seconds))
+	else:
+		print("%-40s %10.4f sec %14.0f %s/sec" % (label,seconds,count/seconds if seconds>0 else 0,unit))
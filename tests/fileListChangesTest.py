@@ -0,0 +1,84 @@
+#ファイルリストの差分反映テスト
+#ファイルサイズで並べ替えたリストに、ApplyChanges で変更を反映し、変更したファイルの要素だけが正しい位置で書き換わることを確かめる。
+#並べ替えた後の索引が古いままだと、別のファイルの要素が書き換えられてしまう。
+#wx と pywin32 がインストールされた Windows で実行する。
+#使い方: python tests/fileListChangesTest.py
+
+#自分自身より上のディレクトリのものをimportするためのおまじない
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import builtins
+import datetime
+import tempfile
+import time
+
+import DefaultSettings
+import fileTypeCache
+import globalVars
+
+class App(object):
+	"""リストが使う globalVars.app の機能だけを持つ。"""
+	def __init__(self):
+		self.config=DefaultSettings.DefaultSettings.get()
+		self.filetypes_cach=fileTypeCache.FileTypeCache(512)
+		self.timezone=datetime.timezone.utc
+
+	def say(self,*args,**kwargs):
+		pass
+
+builtins._=lambda s: s#翻訳は初期化しない
+globalVars.app=App()
+
+import benchmarkUtil
+import lists
+from lists.constants import SORT_TYPE_FILESIZE
+
+def Write(path,size):
+	with open(path,"wb") as f:
+		f.write(b"x"*size)
+	#end with
+
+def Names(lst):
+	return [elem.basename for elem in lst]
+
+def Check(label,actual,expected):
+	if actual!=expected: raise AssertionError("%s: expected %s, got %s" % (label,expected,actual))
+
+def main():
+	work=tempfile.mkdtemp(prefix="falcontest")
+	try:
+		Write(os.path.join(work,"c.txt"),3)
+		Write(os.path.join(work,"a.txt"),1)
+		Write(os.path.join(work,"b.txt"),2)
+		lst=lists.FileList()
+		lst.Initialize(work,True)
+		for i,name in enumerate(Names(lst)):#表示するときと同じく、並べ替える前に索引を作っておく
+			Check("index of %s" % name,lst.GetIndexByName(name),i)
+		#end for
+		lst.SetSortCursor(lst.supportedSorts.index(SORT_TYPE_FILESIZE))
+		lst.SetSortDescending(1)
+		lst.ApplySort()
+		Check("sorted",Names(lst),["c.txt","b.txt","a.txt"])
+		for i,name in enumerate(Names(lst)):
+			Check("index of %s after sorting" % name,lst.GetIndexByName(name),i)
+		#end for
+		time.sleep(0.1)#更新日時を変える
+		Write(os.path.join(work,"a.txt"),10)
+		ops=lst.ApplyChanges(["a.txt"])
+		Check("operations",[(op[0],op[1],op[2].basename) for op in ops],[("remove",2,"a.txt"),("insert",0,"a.txt")])
+		Check("after the change",[(elem.basename,elem.size) for elem in lst],[("a.txt",10),("c.txt",3),("b.txt",2)])
+		for i,name in enumerate(Names(lst)):
+			Check("index of %s after the change" % name,lst.GetIndexByName(name),i)
+		#end for
+		missing=lst.files.pop(1)#リストから外れた要素を消そうとしても、他の要素は消さない
+		Check("removing a missing element",lst._removeElement(missing),-1)
+		Check("after removing a missing element",Names(lst),["a.txt","b.txt"])
+		print("OK")
+	finally:
+		benchmarkUtil.Remove(work)
+	#end finally
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+#Falcon extracted text cache
+#Copyright (C) 2020 Yukio Nozawa <personal@nyanchangames.com>
+#Copyright (C) 2020 yamahubuki <itiro.ishino@gmail.com>
+#Note: All comments except these top lines will be written in Japanese.
+
+"""
+ドキュメントから取り出したテキストを、ディスクに保存しておくキャッシュです。
+キーはフルパスで、保存時のファイルサイズと更新日時が今と違えば、キャッシュは無効とみなします。
+テキストは zlib で圧縮して、1ファイルにつき1つのキャッシュファイルとして保存します。合計サイズには上限があり、超えた場合は最も長く使われていないものから削除します(LRU)。
+grep のワーカープロセスは、Load と Store でキャッシュファイルを直接読み書きし、その結果を親プロセスの Record に渡します。使用順序と合計サイズの管理は、親プロセスのインスタンスだけが行います。
+このモジュールは、標準ライブラリだけで動きます。
+"""
+
+import collections
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+import zlib
+
+#キャッシュファイルの先頭。マジック、元ファイルのサイズ、元ファイルの更新日時(ナノ秒)
+HEADER=struct.Struct("<4sqq")
+MAGIC=b"FTC1"
+EXTENSION=".z"
+
+class TextCache(object):
+	def __init__(self,directory,maxBytes=256*1024*1024):
+		self.log=logging.getLogger("falcon.textCache")
+		self.directory=directory
+		self.maxBytes=maxBytes
+		self.entries=None		#キャッシュファイル名→サイズ。使われた順。最初に必要になったときに作る
+		self.totalBytes=0
+		self.lock=threading.Lock()
+		self.hits=0
+		self.misses=0
+		self.stores=0
+		self.evictions=0
+
+	def GetText(self,fullpath,extract):
+		"""fullpath のテキストを返す。キャッシュになければ、 extract(fullpath) で取り出して保存する。"""
+		name,text=self.Load(fullpath)
+		if text is not None:
+			self.Record(name,True)
+			return text
+		#end キャッシュにあった
+		text=extract(fullpath)
+		name,size=self.Store(fullpath,text)
+		self.Record(name,False,size)
+		return text
+
+	def Load(self,fullpath):
+		"""
+			キャッシュから読む。(キャッシュファイル名, テキスト) を返す。キャッシュにないか、古くなっていれば、テキストは None 。
+			使用順序と統計は更新しないので、呼び出し側で Record を呼ぶこと。
+		"""
+		name=self._makeName(fullpath)
+		try:
+			st=os.stat(fullpath)
+			with open(os.path.join(self.directory,name),"rb") as f:
+				data=f.read()
+			#end with
+		except OSError:
+			return name,None
+		#end except
+		if len(data)<HEADER.size: return name,None
+		magic,size,mtime=HEADER.unpack_from(data)
+		if magic!=MAGIC or size!=st.st_size or mtime!=st.st_mtime_ns: return name,None
+		try:
+			return name,zlib.decompress(data[HEADER.size:]).decode("UTF-8")
+		except (zlib.error,UnicodeDecodeError):
+			return name,None
+		#end except
+
+	def Store(self,fullpath,text):
+		"""
+			キャッシュに書き込む。(キャッシュファイル名, 書き込んだバイト数) を返す。書き込めなかった場合、バイト数は 0 。
+			使用順序と統計は更新しないので、呼び出し側で Record を呼ぶこと。
+		"""
+		name=self._makeName(fullpath)
+		if self.maxBytes<=0: return name,0
+		try:
+			st=os.stat(fullpath)
+			data=HEADER.pack(MAGIC,st.st_size,st.st_mtime_ns)+zlib.compress(text.encode("UTF-8"))
+			os.makedirs(self.directory,exist_ok=True)
+			fd,tmp=tempfile.mkstemp(".tmp","",self.directory)
+			with os.fdopen(fd,"wb") as f:
+				f.write(data)
+			#end with
+			os.replace(tmp,os.path.join(self.directory,name))#他のプロセスが読んでいても、中途半端な内容が見えないように置き換える
+		except OSError as err:
+			self.log.debug("Cannot store text cache for %s (%s)" % (fullpath,err))
+			return name,0
+		#end except
+		return name,len(data)
+
+	def Record(self,name,hit,size=0):
+		"""Load / Store の結果を記録する。hit はキャッシュにあったかどうか、size は Store で書き込んだバイト数。"""
+		with self.lock:
+			entries=self._getEntries()
+			if hit:
+				self.hits+=1
+				if name in entries:
+					entries.move_to_end(name)
+					self._touch(name)
+				#end 管理している
+				return
+			#end ヒット
+			self.misses+=1
+			if size<=0: return
+			self.stores+=1
+			self.totalBytes+=size-entries.pop(name,0)
+			entries[name]=size
+			while self.totalBytes>self.maxBytes and len(entries)>1:
+				k,v=entries.popitem(last=False)
+				self.totalBytes-=v
+				self.evictions+=1
+				try:
+					os.remove(os.path.join(self.directory,k))
+				except OSError:
+					pass
+				#end except
+			#end 上限を超えたので古いものを消す
+		#end lock
+
+	def _getEntries(self):
+		"""キャッシュフォルダを調べて、使用順序の管理を始める。前回以前に使った順序は、キャッシュファイルの更新日時で判断する。"""
+		if self.entries is not None: return self.entries
+		found=[]
+		try:
+			with os.scandir(self.directory) as it:
+				for entry in it:
+					if not entry.name.endswith(EXTENSION): continue
+					st=entry.stat()
+					found.append((st.st_mtime,entry.name,st.st_size))
+				#end for
+			#end with
+		except OSError:
+			pass
+		#end except
+		found.sort()
+		self.entries=collections.OrderedDict((name,size) for t,name,size in found)
+		self.totalBytes=sum(self.entries.values())
+		return self.entries
+
+	def _touch(self,name):
+		"""次回起動時に使用順序を復元できるように、キャッシュファイルの更新日時を今にする。"""
+		try:
+			os.utime(os.path.join(self.directory,name))
+		except OSError:
+			pass
+		#end except
+
+	def _makeName(self,fullpath):
+		return hashlib.sha1(os.path.normcase(fullpath).encode("UTF-8","surrogatepass")).hexdigest()+EXTENSION
+
+	def Clear(self):
+		"""全てのキャッシュファイルを削除する。"""
+		with self.lock:
+			for name in self._getEntries():
+				try:
+					os.remove(os.path.join(self.directory,name))
+				except OSError:
+					pass
+				#end except
+			#end for
+			self.entries.clear()
+			self.totalBytes=0
+		#end lock
+
+	def GetStatistics(self):
+		"""ヒット数、ミス数、保存数、破棄数、現在のエントリ数と合計バイト数、ヒット率を辞書で返す。"""
+		with self.lock:
+			entries=self._getEntries()
+			total=self.hits+self.misses
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"stores": self.stores,
+				"evictions": self.evictions,
+				"entries": len(entries),
+				"bytes": self.totalBytes,
+				"hitRate": self.hits/total if total>0 else 0.0
+			}
+		#end lock
+
+	def __len__(self):
+		with self.lock:
+			return len(self._getEntries())
+		#end lock
@@ -227,8 +227,13 @@ class ViewCreator():
 		self.AddSpace(self.space)
 		return hRadioBox
 
-	def ListCtrl(self,proportion,sizerFlag,**settings):
-		hListCtrl=wx.ListCtrl()
+	def ListCtrl(self,proportion,sizerFlag,virtual=False,**settings):
+		"""virtual=True の場合、表示する文字列をデータソースから都度取得する仮想リスト(wx.LC_VIRTUAL)を作る。データソースは、SetDataSource で設定する。"""
+		if virtual:
+			hListCtrl=VirtualListCtrl()
+			settings["style"]=settings.get("style",0)|wx.LC_VIRTUAL
+		else:
+			hListCtrl=wx.ListCtrl()
 		hListCtrl.EnableSystemTheme(False)
 		hListCtrl.SetHeaderAttr(wx.ItemAttr("888888","888888",self.font.GetFont()))
 		hListCtrl.Create(self.parent,wx.ID_ANY,**settings)
@@ -353,6 +358,31 @@ class TextCtrl(wx.TextCtrl):
 		return True
 
 
+class VirtualListCtrl(wx.ListCtrl):
+	"""
+		仮想リストコントロール。
+		表示に必要な情報は、SetDataSource で設定したオブジェクトの OnGetItemText / OnGetItemImage / OnGetItemAttr から、画面に見えている行の分だけ取得する。
+	"""
+	def __init__(self,*args,**kwargs):
+		super().__init__(*args,**kwargs)
+		self.dataSource=None
+
+	def SetDataSource(self,source):
+		self.dataSource=source
+
+	def OnGetItemText(self,item,column):
+		if self.dataSource is None: return ""
+		return self.dataSource.OnGetItemText(item,column)
+
+	def OnGetItemImage(self,item):
+		if self.dataSource is None: return -1
+		return self.dataSource.OnGetItemImage(item)
+
+	def OnGetItemAttr(self,item):
+		if self.dataSource is None: return None
+		return self.dataSource.OnGetItemAttr(item)
+
+
 
 
 """
@@ -25,6 +25,7 @@ import globalVars
 import lists
 import tabs.navigator
 import menuItemsStore
+import pathWalker
 import fileSystemManager
 import deviceCtrl
 
@@ -414,7 +415,9 @@ class Menu(BaseMenu):
 		#ツールメニューの中身
 		self.RegisterMenuCommand(self.hToolMenu,(
 			"TOOL_DIRCALC",
+			"TOOL_DIRCALC_REFRESH",
 			"TOOL_HASHCALC",
+			"TOOL_SIZEREPORT",
 			"TOOL_EXEC_PROGRAM",
 			"TOOL_ADDPATH",
 			"TOOL_EJECT_DRIVE",
@@ -743,11 +746,17 @@ class Events(BaseEvents):
 		if selected==menuItemsStore.getRef("TOOL_DIRCALC"):
 			self.parent.activeTab.DirCalc()
 			return
+		if selected==menuItemsStore.getRef("TOOL_DIRCALC_REFRESH"):
+			self.parent.activeTab.DirCalc(refresh=True)
+			return
 		if selected==menuItemsStore.getRef("TOOL_HASHCALC"):
 			d=views.makeHash.Dialog(self.parent.activeTab.GetFocusedElement().fullpath)
 			d.Initialize()
 			d.Show()
 			return
+		if selected==menuItemsStore.getRef("TOOL_SIZEREPORT"):
+			self.Navigate({'action':'sizeReport','basePath':self.parent.activeTab.listObject.rootDirectory},as_new_tab=True)
+			return
 		if selected==menuItemsStore.getRef("TOOL_EXEC_PROGRAM"):
 			self.ExecProgram()
 			return
@@ -909,10 +918,19 @@ class Events(BaseEvents):
 		else:
 			self.parent.Navigate("",as_new_tab=True)
 
+	def _SeedFromNameIndex(self,basePath,out_lst,keyword,isRegularExpression):
+		"""ファイル名の索引があれば、そこから検索した結果を、たどった結果より先に検索させる。"""
+		timer=misc.Timer()
+		index,subdirectory=globalVars.app.nameIndexStore.Find(basePath)
+		if index is None: return
+		hits=index.Query(lists.searchResultBase.MakeKeywordPattern(keyword,isRegularExpression),subdirectory)
+		out_lst.Seed(hits)
+		self.parent.log.debug("File name index answered %d hits from %d paths in %f seconds." % (len(hits),len(index),timer.elapsed))
+
 	def Search(self):
 		basePath=self.parent.activeTab.listObject.rootDirectory
-		out_lst=[]#入力画面が出てるときに、もうファイルリスト取得を開始してしまう
-		task=workerThreads.RegisterTask(workerThreadTasks.GetRecursiveFileList,{'path': basePath, 'out_lst': out_lst,'eol':True})
+		out_lst=pathWalker.PathStream(globalVars.app.config.getint("search","walker_queue_size",10000,100,1000000))#入力画面が出てるときに、もうファイルリスト取得を開始してしまう
+		task=workerThreads.RegisterTask(workerThreadTasks.GetRecursiveFileList,{'path': basePath, 'out_lst': out_lst, 'workers': globalVars.app.config.getint("search","walker_threads",4,1,64)})
 
 		searchHistory=history.History(globalVars.app.config.getint("search","history_count",0,0,100),False)
 		grepHistory=history.History(globalVars.app.config.getint("search","history_count",0,0,100),False)
@@ -948,13 +966,20 @@ class Events(BaseEvents):
 			break
 		#end 入力が正しくなるまで
 		if canceled: return
+		if not val['filter'].IsEmpty():#絞り込み条件をたどる側で判定するため、たどり直す
+			task.Cancel()
+			out_lst=pathWalker.PathStream(globalVars.app.config.getint("search","walker_queue_size",10000,100,1000000))
+			task=workerThreads.RegisterTask(workerThreadTasks.GetRecursiveFileList,{'path': basePath, 'out_lst': out_lst, 'workers': globalVars.app.config.getint("search","walker_threads",4,1,64), 'filter': val['filter']})
+		#end 絞り込みあり
+		if val['type']==0 and globalVars.app.nameIndexStore is not None: self._SeedFromNameIndex(basePath,out_lst,val['keyword'],val['isRegularExpression'])
 		actionstr="search" if val['type']==0 else "grep"
-		target={'action': actionstr, 'basePath': basePath, 'out_lst': out_lst, 'keyword': val['keyword'], 'isRegularExpression': val['isRegularExpression']}
+		keyword=val['keywords'] if val['keywords'] is not None else val['keyword']#キーワードファイルから読み込んだものは、リストで渡す
+		target={'action': actionstr, 'basePath': basePath, 'out_lst': out_lst, 'walkTask': task, 'keyword': keyword, 'isRegularExpression': val['isRegularExpression'], 'filter': val['filter']}
 		self.parent.Navigate(target,as_new_tab=True)
 
 		if val['type']==0:
 			searchHistory.add(val['keyword'])
-		else:
+		elif val['keywords'] is None:#キーワードファイルの中身は、履歴に残さない
 			grepHistory.add(val['keyword'])
 		hist["search"]=searchHistory.getList()
 		hist["grep"]=grepHistory.getList()
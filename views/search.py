@@ -8,8 +8,23 @@ from logging import getLogger, FileHandler, Formatter
 from .baseDialog import *
 import views.ViewCreator
 
+import directoryEnumerator
+import documentText
+import grepEngine
+import searchFilter
 from simpleDialog import dialog
 
+#キーワードファイルとして読み込む最大のバイト数
+KEYWORD_FILE_MAX_BYTES=16*1024*1024
+
+#絞り込みに使う属性。チェックボックスの並び順
+FILTER_ATTRIBUTES=(
+	directoryEnumerator.FILE_ATTRIBUTE_READONLY,
+	directoryEnumerator.FILE_ATTRIBUTE_HIDDEN,
+	directoryEnumerator.FILE_ATTRIBUTE_SYSTEM,
+	directoryEnumerator.FILE_ATTRIBUTE_ARCHIVE
+)
+
 class Dialog(BaseDialog):
 
 	#検索の起点を設定
@@ -18,6 +33,7 @@ class Dialog(BaseDialog):
 		self.basePath=basePath
 		self.searchHistory=searchHistory
 		self.grepHistory=grepHistory
+		self.keywordFileKeywords=None		#キーワードファイルから読み込んだキーワードのリスト
 
 	def Initialize(self):
 		super().Initialize(self.app.hMainView.hFrame,_("検索"))
@@ -32,6 +48,16 @@ class Dialog(BaseDialog):
 		self.creator=views.ViewCreator.ViewCreator(1,self.panel,self.sizer,wx.HORIZONTAL,20,"",wx.EXPAND)
 		self.type=self.creator.radiobox(_("検索方式"),(_("ファイル名"),_("ファイル内容")),self.changeType,1,wx.HORIZONTAL)
 		self.keywordType=self.creator.checkbox(_("正規表現を利用"),None,False)
+		self.bKeywordFile=self.creator.button(_("キーワードをファイルから読み込み"),self.LoadKeywordFile)
+
+		#絞り込み条件
+		self.creator=views.ViewCreator.ViewCreator(1,self.panel,self.sizer,wx.VERTICAL,20,_("絞り込み"),wx.EXPAND)
+		self.kind=self.creator.radiobox(_("対象"),(_("すべて"),_("ファイルのみ"),_("フォルダのみ")),None,1,wx.HORIZONTAL)
+		self.minSize,tmp=self.creator.inputbox(_("最小サイズ(例: 1GB)"),150)
+		self.maxSize,tmp=self.creator.inputbox(_("最大サイズ(例: 500KB)"),150)
+		self.modifiedAfter,tmp=self.creator.inputbox(_("更新日の始め(例: 2020/01/01)"),150)
+		self.modifiedBefore,tmp=self.creator.inputbox(_("更新日の終わり(例: 2020/12/31)"),150)
+		self.attributes=self.creator.checkbox3([_("読み取り専用"),_("隠しファイル"),_("システム"),_("アーカイブ")],None,[wx.CHK_UNDETERMINED]*len(FILTER_ATTRIBUTES))
 
 		#ボタンエリア
 		self.creator=views.ViewCreator.ViewCreator(1,self.panel,self.sizer,wx.HORIZONTAL,20,"",wx.ALIGN_RIGHT)
@@ -44,16 +70,78 @@ class Dialog(BaseDialog):
 		v["keyword"]=self.keyword.GetValue()
 		v["type"]=self.type.GetSelection()
 		v["isRegularExpression"]=self.keywordType.IsChecked()
+		v["keywords"]=self.GetKeywordFileKeywords()
+		v["filter"]=self.MakeFilter()
 		return v
 
+	def MakeFilter(self):
+		"""
+			入力された絞り込み条件から、searchFilter.SearchFilter を作る。サイズか日付が読めなければ、ValueError を送出する。
+			属性のチェックボックスは、チェックありなら付いているもの、チェックなしなら付いていないもの、どちらでもない状態なら問わない。
+		"""
+		on=off=0
+		for attribute,checkbox in zip(FILTER_ATTRIBUTES,self.attributes):
+			state=checkbox.Get3StateValue()
+			if state==wx.CHK_CHECKED:
+				on|=attribute
+			elif state==wx.CHK_UNCHECKED:
+				off|=attribute
+			#end 状態
+		#end for
+		return searchFilter.SearchFilter(
+			searchFilter.ParseSize(self.minSize.GetValue()),
+			searchFilter.ParseSize(self.maxSize.GetValue()),
+			searchFilter.ParseDate(self.modifiedAfter.GetValue()),
+			searchFilter.ParseDate(self.modifiedBefore.GetValue(),True),
+			on,
+			off,
+			self.kind.GetSelection()
+		)
+
 	def changeType(self,event):
 		if event.GetSelection()==0:
 			self.keyword.Set(self.searchHistory)
 		else:
 			self.keyword.Set(self.grepHistory)
 
+	def GetKeywordFileKeywords(self):
+		"""キーワードファイルから読み込んだキーワードのリストを返す。読み込んでいないか、読み込んだ後でキーワードや検索方式を変えた場合は None 。"""
+		if self.keywordFileKeywords is None: return None
+		if self.type.GetSelection()!=1 or self.keywordType.IsChecked(): return None
+		if self.keyword.GetValue()!=grepEngine.KEYWORD_SEPARATOR.join(self.keywordFileKeywords): return None
+		return self.keywordFileKeywords
+
+	def LoadKeywordFile(self,event):
+		"""1行に1つずつキーワードを書いたファイルを読み込み、ファイル内容検索のキーワードにする。"""
+		d=wx.FileDialog(self.wnd,_("キーワードファイルの選択"),wildcard=_("テキストファイル")+"(*.txt)|*.txt|"+_("すべてのファイル")+"(*.*)|*.*",style=wx.FD_FILE_MUST_EXIST)
+		if d.ShowModal()==wx.ID_CANCEL: return
+		try:
+			text=documentText.ReadHeadText(d.GetPath(),KEYWORD_FILE_MAX_BYTES)
+		except OSError as err:
+			dialog(_("エラー"),_("ファイルを読み込めませんでした。\nエラー内容: %(error)s") % {'error': str(err)})
+			return
+		#end except
+		keywords=grepEngine.SplitKeywords(text)
+		if not keywords:
+			dialog(_("エラー"),_("ファイルにキーワードが書かれていません。"))
+			return
+		#end キーワードなし
+		if self.type.GetSelection()!=1:
+			self.type.SetSelection(1)
+			self.keyword.Set(self.grepHistory)
+		#end ファイル内容検索にする
+		self.keywordType.SetValue(False)
+		self.keywordFileKeywords=keywords
+		self.keyword.SetValue(grepEngine.KEYWORD_SEPARATOR.join(keywords))
+
 	def OkEvent(self,event):
 		if self.keyword.GetValue()=="":
 			dialog(_("エラー"),"検索キーワードを入力してください。")
 			return
+		try:
+			self.MakeFilter()
+		except ValueError:
+			dialog(_("エラー"),_("絞り込み条件のサイズか日付の書き方が間違っています。\nサイズは「1GB」「500KB」のように、日付は「2020/01/31」のように入力してください。"))
+			return
+		#end except
 		event.Skip()
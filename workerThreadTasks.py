@@ -9,65 +9,117 @@
 定期的に taskState.canceled プロパティをチェックして、 True になっていれば、処理を中断しなければなりません。その際には、 False を返します。処理を最後まで実行したら、 True を返す必要があります。
 """
 
-import pathlib
 import wx
 import win32wnet
 from win32com.shell import shell, shellcon
+import documentText
 import globalVars
 import misc
+import pathWalker
 import time
 import browsableObjects
+import lists
+import sizeTree
 
 def DirCalc(taskState,param):
 	"""
-		計算結果は(インデックス番号,バイト単位のサイズint値)で返る。
+		計算結果は(lst で渡された識別子,(バイト数, ファイル数, サブフォルダ数))のリストで返る。
 		取得失敗時に-1となる場合があるので要注意
+		lst のフォルダは並行して計算し、1つ終わるごとに、その結果だけを callback に渡す。全て終わったら、 finished_callback があれば呼ぶ。
+		refresh が True なら、覚えているフォルダの情報を使わずに計算し直す。
 	"""
 	lst=param['lst']
-	results=[]
-	for elem in lst:
-		if taskState.canceled: return False
-		s=misc.GetDirectorySize(elem[1])
-		results.append((elem[0],s))
-		#end 成功か失敗か
-	#end for
-	if taskState.canceled: return False
-	wx.CallAfter(param['callback'],results,taskState)
+	def onResult(index,result):
+		if not taskState.canceled: wx.CallAfter(param['callback'],[(lst[index][0],result)],taskState)
+	#end onResult
+	if globalVars.app.directorySizeEngine.Calculate([elem[1] for elem in lst],taskState,onResult,param.get('refresh',False)) is None: return False
+	if 'finished_callback' in param: wx.CallAfter(param['finished_callback'],taskState)
 	return True
 
 def GetRecursiveFileList(taskState,param):
 	"""
-		path から全てのフォルダを再帰的にたどって、ファイル名を out のリストに入れていく。なお、入る値は、 path からの相対パス。EOL=True にしておくと、ファイルリストを全部なめた段階で、eol という文字列をリストに追加してから終了する。検索終了の判定に使っている。
+		path から全てのフォルダを再帰的にたどって、見つかったパスを out_lst (pathWalker.PathStream) に流していく。なお、流れる値は、 path からの相対パス。全てたどり終わると、out_lst に終わりが通知される。
+		path にリストを渡すと、それらを並行してたどり、フルパスを流す。workers で、同時に列挙するスレッドの数を指定する。
+		filter に searchFilter.SearchFilter を渡すと、条件に合うパスだけを流す。
 	"""
-	out_lst=param['out_lst']
-	path=param['path']
-	for elem in misc.IteratePaths(path):
-		if taskState.canceled: return False
-		out_lst.append(str(pathlib.Path(elem).relative_to(path)))
-	#end ファイルリストをガンガン入れる
-	if taskState.canceled: return False
-	if param['eol']: out_lst.append('eol')
-	return True
+	walker=pathWalker.ParallelWalker(param['path'],param['out_lst'],param.get('workers',4),param.get('filter'))
+	return walker.Run(taskState)
 
 def PerformSearch(taskState,param):
 	"""
 		検索のバックグラウンド処理。listObject の検索メソッドを実行して、見つかった者を tabObject のほうに通知しながら、リアルタイムな検索結果表示を実現している。
+		パスが届くまでは待機し、届いたらすぐに検索する。ヒットしたものは溜めておき、batch_interval 秒たつか、batch_size 件溜まるごとにまとめて通知する。
 	"""
 	l=param['listObject']
 	t=param['tabObject']
+	batchInterval=param.get('batch_interval',0.05)
+	batchSize=param.get('batch_size',500)
+	timer=misc.Timer()
+	firstHit=None
+	pending=[]
+	lastNotified=-batchInterval#最初のヒットは、すぐに通知する
 	while(True):
 		if taskState.canceled: return False
-		finished,hits=l._performSearchStep(taskState)
+		if pending:
+			timeout=max(0,batchInterval-(timer.elapsed-lastNotified))#次の通知までなら待てる
+		else:
+			timeout=0.1#キャンセルを確認するために、一定時間で戻ってくる
+		#end 待ち時間
+		finished,hits=l._performSearchStep(taskState,batchSize-len(pending),timeout)
 		if hits==-1: return False#検索処理からキャンセルで戻ってきた
-		if len(hits)>0: wx.CallAfter(t._onSearchHitCallback,hits)
+		if hits:
+			if firstHit is None:
+				firstHit=timer.elapsed
+				l.log.debug("First search hit after %f seconds." % firstHit)
+			#end 最初のヒット
+			pending.extend(hits)
+		#end ヒットあり
+		if pending and (finished or len(pending)>=batchSize or timer.elapsed-lastNotified>=batchInterval):
+			wx.CallAfter(t._onSearchHitCallback,pending)
+			pending=[]
+			lastNotified=timer.elapsed
+		#end 通知
 		if finished: break#全て検索した
-		time.sleep(0.1)
 	#end 検索ループ
+	l.log.debug("Search finished in %f seconds (%d hits, %d paths)." % (timer.elapsed,len(l),len(l.searches)))
 	return True
 
 	for elem in misc.IteratePaths(param['path']):
 		if taskState.canceled: return False
 
+def BuildSizeTree(taskState,param):
+	"""
+		path 以下を1回たどって sizeTree.SizeTree を作り、容量の大きいフォルダとファイルを count 個ずつ取り出した lists.SizeReportList を、 callback(リスト, taskState) に渡す。
+		reuse が True で、保存した木があれば、たどらずにそれを使う。作った木は、保存する設定なら保存する。
+	"""
+	store=globalVars.app.sizeTreeStore
+	tree=store.Load(param['path']) if store is not None and param.get('reuse',False) else None
+	if tree is None:
+		tree=sizeTree.SizeTree.Build(param['path'],taskState,param.get('max_files',1000),param.get('count_hardlinks_once',False))
+		if tree is None: return False
+		if store is not None: store.Save(tree)
+	#end たどる
+	lst=lists.SizeReportList()
+	lst.Initialize(tree.root,tree,param.get('count',100))
+	if taskState.canceled: return False
+	wx.CallAfter(param['callback'],lst,taskState)
+	return True
+
+def UpdateFullTextIndex(taskState,param):
+	"""
+		ファイル内容検索の転置索引のうち、 root 以下を、 paths (ドキュメントファイルのフルパスのリスト) に合わせて更新する。
+		変わっていないファイルと、 prepared (検索のついでに作った情報) があるファイルは、テキストを取り出し直さない。
+		RegisterMaintenanceTask で、優先度を下げたスレッドで実行する。
+	"""
+	index=globalVars.app.fullTextIndex
+	cache=globalVars.app.textCache
+	def getText(path):
+		if misc.isPlainTextExt(path.split(".")[-1]): return documentText.ReadHeadText(path,(index.maxTextLength+1)*4)#索引に入らないほど長いことが分かる分だけ読む
+		if cache is not None: return cache.GetText(path,misc.ExtractText)#検索で取り出したテキストが残っていれば使う
+		return misc.ExtractText(path)
+	#end getText
+	return index.Update(param['root'],param['paths'],getText,taskState,prepared=param.get('prepared'))
+
 def DebugBeep(taskState,param):
 	for i in range(10):
 		if taskState.canceled: return False
@@ -98,11 +150,11 @@ def GetNetworkResources(taskState=None,param=None):
 	if taskState and taskState.canceled: return False
 	lst.pop(0)	#先頭はドライブではない者が入るので省く
 	for l in lst:
-		ret, shfileinfo=shell.SHGetFileInfo(l.lpRemoteName,0,shellcon.SHGFI_ICON)
+		hIcon=globalVars.app.filetypes_cach.GetIcon(l.lpRemoteName)
 		if taskState and taskState.canceled: return False
 		addr=misc.ResolveLocalIpAddress(l.lpRemoteName[2:])
 		s=browsableObjects.NetworkResource()
-		s.Initialize(l.lpRemoteName[2:],l.lpRemoteName,addr,shfileinfo[0])
+		s.Initialize(l.lpRemoteName[2:],l.lpRemoteName,addr,hIcon)
 		if taskState and taskState.canceled: return False
 		if taskState:
 			wx.CallAfter(param["onAppend"],s)
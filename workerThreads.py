@@ -5,8 +5,10 @@
 
 """
 Falcon は、ワーカースレッドを提供します。ワーカースレッドに workerThreadTasks で定義しているタスクと引数を渡せば、バックグラウンドで実行してくれます。
+索引の更新のように、急がないのに長くかかる処理は、 RegisterMaintenanceTask で、優先度を下げた専用のスレッドに渡します。共有のワーカースレッドはふさぎません。
 """
 
+import ctypes
 import logging
 from logging import getLogger
 import queue
@@ -15,6 +17,10 @@ import time
 import misc
 
 tasks=queue.Queue()
+maintenance_tasks=queue.Queue()
+
+#SetThreadPriority に渡すと、スレッドの CPU とディスクの優先度を下げる
+THREAD_MODE_BACKGROUND_BEGIN=0x00010000
 
 active_task_states=[]
 
@@ -57,22 +63,26 @@ class TaskState(object):
 		self.working=w
 
 class _workerThreadBody(threading.Thread):
-	def __init__(self,identifier):
+	def __init__(self,name,taskQueue=tasks,background=False):
+		"""taskQueue からタスクを拾って実行する。background=True なら、優先度を下げて動く。"""
 		threading.Thread.__init__(self)
-		self.log=getLogger("falcon.workerThread%d" % identifier)
+		self.log=getLogger("falcon.%s" % name)
+		self.taskQueue=taskQueue
+		self.background=background
 
 	def run(self):
+		if self.background: self._enterBackgroundMode()
 		while(True):
-			item=tasks.get()
+			item=self.taskQueue.get()
 			self.log.debug("picked up job")
 			if isinstance(item,Stop_task):#ワーカースレッド終了
 				self.log.debug("Received stop signal. Exiting thread...")
-				tasks.task_done()
+				self.taskQueue.task_done()
 				break
 			#end 終了
 			if stopped: continue#終了した後にはタスクをもらっても働かない
 			if item.canceled:#出したけどキャンセル済み
-				tasks.task_done()
+				self.taskQueue.task_done()
 				self.log.debug("Already canceled, skipping this task...")
 				continue
 			#end キャンセル済みタスク
@@ -87,13 +97,22 @@ class _workerThreadBody(threading.Thread):
 			else:
 				item.CancelCallback()
 			#end どっちのcallbackを呼ぶか
-			tasks.task_done()
+			self.taskQueue.task_done()
 			self.log.debug("task finished in %f seconds." % (t.elapsed) if ret else "Task canceled.")
 			item.setWorkingState(False)
 			active_task_states.remove(item)
 		#end while
 	#end run
 
+	def _enterBackgroundMode(self):
+		"""このスレッドの優先度を下げる。Windows 以外では何もしない。"""
+		try:
+			kernel32=ctypes.windll.kernel32
+		except AttributeError:
+			return
+		#end Windows 以外
+		if not kernel32.SetThreadPriority(kernel32.GetCurrentThread(),THREAD_MODE_BACKGROUND_BEGIN): self.log.debug("Cannot lower the thread priority.")
+
 initialized=False
 stopped=False
 
@@ -107,13 +126,17 @@ def Start(worker_num=2):
 	log=getLogger("falcon.workerThreads")
 	log.debug("%d worker threads initialized." % worker_num)
 	for  i in range(worker_num):
-		t=_workerThreadBody(i+1)
+		t=_workerThreadBody("workerThread%d" % (i+1))
 		t.start()
 		threads.append(t)
 	#end for
+	t=_workerThreadBody("maintenanceThread",maintenance_tasks,True)
+	t.start()
+	threads.append(t)
 #end Initialize
 
 def Stop():
+	global stopped
 	for elem in active_task_states:
 		if not elem.cancelable: return False
 	#end キャンセルできないタスクが走ってるかどうか
@@ -124,8 +147,8 @@ def Stop():
 	for elem in active_task_states:
 		elem.Cancel()
 	#end 実行中タスクキャンセル
-	for i in range(len(threads)):
-		tasks.put(Stop_task())
+	for elem in threads:
+		elem.taskQueue.put(Stop_task())
 	for elem in threads:
 		elem.join()
 	log.debug("Stopped")
@@ -135,4 +158,11 @@ def RegisterTask(func,param={}):
 	log.debug("register")
 	t=TaskState(func,param)
 	tasks.put(t)
+	return t
+
+def RegisterMaintenanceTask(func,param={}):
+	"""RegisterTask と同じだが、優先度を下げた専用のスレッドで、1つずつ順番に処理する。タスクの状態を表すオブジェクトを返す。"""
+	log.debug("register maintenance task")
+	t=TaskState(func,param)
+	maintenance_tasks.put(t)
 	return t
\ No newline at end of file